@@ -5,7 +5,7 @@ app = Celery(
     'pass_system',
     broker=settings.redis_url,
     backend=settings.redis_url,
-    include=['app.tasks.notifications_tasks']
+    include=['app.tasks.notifications_tasks', 'app.tasks.maintenance_tasks', 'app.tasks.report_tasks', 'app.tasks.qr_tasks']
 )
 
 app.conf.update(
@@ -17,3 +17,26 @@ app.conf.update(
     task_track_started=True,
     task_time_limit=30 * 60,  # 30 minutes
 )
+
+app.conf.beat_schedule = {
+    'sweep-pass-statuses': {
+        'task': 'app.tasks.maintenance_tasks.sweep_pass_statuses_task',
+        'schedule': settings.pass_sweep_interval_seconds,
+    },
+    'rebuild-occupancy': {
+        'task': 'app.tasks.maintenance_tasks.rebuild_occupancy_task',
+        'schedule': settings.occupancy_rebuild_interval_seconds,
+    },
+    'reconcile-stats-rollup': {
+        'task': 'app.tasks.maintenance_tasks.reconcile_stats_rollup_task',
+        'schedule': settings.stats_reconcile_interval_seconds,
+    },
+    'refresh-visit-analytics': {
+        'task': 'app.tasks.maintenance_tasks.refresh_visit_analytics_task',
+        'schedule': settings.analytics_refresh_interval_seconds,
+    },
+    'purge-reports': {
+        'task': 'app.tasks.report_tasks.purge_reports_task',
+        'schedule': settings.report_cache_ttl_seconds,
+    },
+}
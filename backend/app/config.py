@@ -11,12 +11,67 @@ class Settings(BaseSettings):
     
     # Redis
     redis_url: str = os.getenv("REDIS_URL", "redis://localhost:6379")
+    redis_timeout_seconds: float = 0.5
     
     # Security
     secret_key: str = os.getenv("SECRET_KEY", "change_me_in_production")
     algorithm: str = "HS256"
     access_token_expire_minutes: int = 30
-    
+    refresh_token_expire_hours: int = 12  # one sign-in per shift; refreshing does not extend it
+    revocation_bloom_capacity: int = 100000  # revoked sessions per worker filter before false positives rise
+    revocation_reload_seconds: int = 600  # rebuild the filter without ended sessions
+    password_hash_workers: int = 0  # bcrypt threads per process; 0 = one per CPU, at most 4
+    password_hash_queue_size: int = 32  # waiting hashes beyond which sign-ins get 503
+
+    # Scan path caching
+    pass_cache_max_size: int = 50000
+    pass_cache_ttl_seconds: int = 60
+
+    # Buffered gate scans (/api/scan/verify-batch)
+    scan_clock_skew_seconds: int = 300  # gate clocks may run this far ahead
+    scan_replay_horizon_hours: int = 72  # older scans are rejected instead of replayed
+
+    # Authenticated users (per process, invalidated through the event bus)
+    user_cache_max_size: int = 10000
+    user_cache_ttl_seconds: int = 60
+
+    # Rendered QR images (memory LRU in front of a disk cache)
+    qr_cache_dir: str = os.getenv("QR_CACHE_DIR", "qr_cache")
+    qr_cache_max_items: int = 2000
+    qr_batch_workers: int = 0  # batch rendering processes; 0 = one per CPU
+    qr_batch_chunk_size: int = 50
+
+    # Signed QR codes (verified without a DB lookup); key defaults to secret_key
+    signed_qr_codes: bool = False
+    qr_signing_key: str = ""
+
+    # Background pass status sweeper (Celery beat)
+    pass_sweep_interval_seconds: int = 60
+    pass_sweep_chunk_size: int = 1000
+    pass_change_retention_days: int = 30  # offline devices further behind reload the snapshot
+
+    # Live occupancy (Redis), periodically reconciled with open visits
+    occupancy_rebuild_interval_seconds: int = 600
+
+    # Write-behind visits: scans are journaled in Redis and flushed in batches
+    visit_write_behind: bool = False
+    visit_journal_flush_interval_seconds: float = 1.0
+    visit_journal_batch_size: int = 500
+
+    # Dashboard statistics: hourly rollup counters behind a short result cache
+    stats_cache_ttl_seconds: float = 5.0
+    stats_flush_interval_seconds: float = 5.0
+    stats_reconcile_interval_seconds: int = 3600
+    stats_reconcile_settle_seconds: int = 300  # hours closed this recently may still have deltas in API workers
+
+    # Visit analytics rollup (Celery): recent hours are recomputed on every run
+    analytics_refresh_interval_seconds: int = 300
+    analytics_refresh_lookback_hours: int = 6
+
+    # Report jobs (Celery): finished files are reused until they expire
+    report_dir: str = os.getenv("REPORT_DIR", "reports")
+    report_cache_ttl_seconds: int = 3600
+
     # Encryption
     encryption_key: str = os.getenv("ENCRYPTION_KEY", "0" * 32)
     
@@ -1,10 +1,13 @@
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from redis.exceptions import RedisError
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.future import select
 
 from app.database import get_db
 from app.models.user import User, UserRole
+from app.services.token_revocation import token_revocations
+from app.services.user_cache import user_cache
+from app.utils.rbac import PERMISSION_BITS, PERMISSIONS_VERSION, Permission
 from app.utils.security import verify_token
 
 security = HTTPBearer()
@@ -15,16 +18,46 @@ async def get_current_user(
 ) -> User:
     """Get current authenticated user from JWT token"""
     
-    token = credentials.credentials
+    return await authenticate_token(credentials.credentials, db)
+
+async def verify_access_token(token: str) -> dict:
+    """Claims of a valid access token whose session was not revoked"""
+    
     payload = verify_token(token)
     
-    if not payload:
+    if not payload or payload.get("typ") == "refresh":
         print(f"[SECURITY] Invalid token used")
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid or expired token"
         )
     
+    if payload.get("sid"):
+        try:
+            revoked = await token_revocations.is_revoked(payload["sid"])
+        except RedisError:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Token revocation check unavailable"
+            )
+        if revoked:
+            print(f"[SECURITY] Token of a revoked session used: {payload.get('sub')}")
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Session revoked, please sign in again"
+            )
+    
+    return payload
+
+async def authenticate_token(token: str, db: AsyncSession) -> User:
+    """
+    Resolve a JWT to an active user; also used where no Authorization header
+    exists (WebSocket). The user comes from the per-process user cache and
+    is not attached to db.
+    """
+    
+    payload = await verify_access_token(token)
+    
     user_id = payload.get("id")
     if not user_id:
         print(f"[SECURITY] Token missing user id")
@@ -33,8 +66,7 @@ async def get_current_user(
             detail="Invalid token"
         )
     
-    result = await db.execute(select(User).where(User.id == user_id))
-    user = result.scalar_one_or_none()
+    user = await user_cache.get(db, user_id)
     
     if not user:
         print(f"[SECURITY] User not found: {user_id}")
@@ -50,8 +82,54 @@ async def get_current_user(
             detail="User is inactive"
         )
     
+    if payload.get("ver", 0) < user.token_version:
+        print(f"[SECURITY] Revoked token used: {user.username}")
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Token revoked, please sign in again"
+        )
+    
     return user
 
+def require_permission(permission: Permission):
+    """
+    Dependency authorizing from the access token alone: its permission
+    bitmask must include permission. Needs no query; the User it returns is
+    not loaded from the database and only carries id, username and role.
+    """
+    bit = PERMISSION_BITS[permission]
+    
+    async def check_token_permission(
+        credentials: HTTPAuthorizationCredentials = Depends(security)
+    ) -> User:
+        payload = await verify_access_token(credentials.credentials)
+        
+        if not payload.get("id") or "perm" not in payload:
+            print(f"[SECURITY] Invalid token used")
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Invalid or expired token"
+            )
+        
+        # Roles changed since the token was issued: the client must get a new one
+        if payload.get("pv") != PERMISSIONS_VERSION or not user_cache.token_is_current(payload["id"], payload.get("ver", 0)):
+            print(f"[SECURITY] Outdated token used: {payload.get('sub')}")
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Token revoked, please sign in again"
+            )
+        
+        if not payload["perm"] & bit:
+            print(f"[SECURITY] User without {permission.value} permission denied: {payload.get('sub')}")
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail=f"Permission required: {permission.value}"
+            )
+        
+        return User(id=payload["id"], username=payload.get("sub"), role=UserRole(payload["role"]))
+    
+    return check_token_permission
+
 async def check_admin_role(user: User = Depends(get_current_user)):
     """Check if user has admin role"""
     
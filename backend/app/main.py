@@ -1,10 +1,24 @@
-from fastapi import FastAPI
+import asyncio
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.openapi.utils import get_openapi
 
 from app.config import settings
-from app.routers import auth, passes, admin, scan, notifications, demo, visits
+from app.database import AsyncSessionLocal
+from app.routers import auth, passes, admin, scan, notifications, demo, visits, events, exports, reports, analytics
 from app.middleware.security import SecurityHeadersMiddleware, RequestLoggingMiddleware, RateLimitMiddleware
+from app.services.event_bus import event_bus
+from app.services.occupancy import OccupancyTracker
+from app.services.password_hasher import HasherBusy, password_hasher
+from app.services.qr_batch import qr_batch
+from app.services.scan_engine import ScanEngine
+from app.services.redis_client import get_redis
+from app.services.statistics import StatsRollup, stats_rollup
+from app.services.token_revocation import token_revocations
+from app.services.user_cache import user_cache
+from app.services.visit_journal import visit_journal
+from app.utils.metrics import registry
 
 app = FastAPI(
     title="Pass System API",
@@ -37,6 +51,10 @@ app.include_router(scan.router)
 app.include_router(notifications.router)
 app.include_router(demo.router)
 app.include_router(visits.router)
+app.include_router(events.router)
+app.include_router(exports.router)
+app.include_router(reports.router)
+app.include_router(analytics.router)
 
 # Custom OpenAPI schema for better Swagger UI
 def custom_openapi():
@@ -56,10 +74,105 @@ def custom_openapi():
 
 app.openapi = custom_openapi
 
+@app.exception_handler(HasherBusy)
+async def password_hasher_busy(request: Request, exc: HasherBusy):
+    """Back-pressure from the bcrypt pool: clients should retry shortly"""
+    return JSONResponse(
+        status_code=503,
+        content={"detail": "Too many sign-in attempts in progress, please retry"},
+        headers={"Retry-After": "1"},
+    )
+
+@app.on_event("startup")
+async def ensure_open_visit_index():
+    """Databases created before the one-open-visit-per-pass index get it here"""
+    try:
+        async with AsyncSessionLocal() as db:
+            closed = await ScanEngine.ensure_open_visit_index(db)
+        if closed:
+            print(f"[VISITS] Closed {closed} duplicate open visits before indexing")
+    except Exception as e:
+        print(f"[VISITS] Creating the open visit index failed: {e}")
+
+@app.on_event("startup")
+async def rebuild_occupancy_on_startup():
+    """Occupancy counters live in Redis; resync them with open visits after a restart"""
+    try:
+        async with AsyncSessionLocal() as db:
+            on_site = await OccupancyTracker.rebuild(db, get_redis())
+        print(f"[OCCUPANCY] Roster rebuilt on startup: {on_site} on site")
+    except Exception as e:
+        print(f"[OCCUPANCY] Rebuild on startup failed: {e}")
+
+@app.on_event("startup")
+async def load_token_versions():
+    """Revoked token versions, so permission checks on tokens need no query"""
+    try:
+        async with AsyncSessionLocal() as db:
+            revoked = await user_cache.load_token_versions(db)
+        print(f"[SECURITY] Token versions loaded: {revoked} users with revoked tokens")
+    except Exception as e:
+        print(f"[SECURITY] Loading token versions failed: {e}")
+
+@app.on_event("startup")
+async def start_token_revocations():
+    """Per-worker filter of revoked sessions, rebuilt periodically to drop ended ones"""
+    try:
+        revoked = await token_revocations.load()
+        print(f"[AUTH] Revocation list loaded: {revoked} revoked sessions")
+    except Exception as e:
+        print(f"[AUTH] Revocation list load failed, checking Redis per request: {e}")
+    app.state.revocation_reloader = asyncio.create_task(token_revocations.run_reloader())
+
+@app.on_event("startup")
+async def start_visit_journal_flusher():
+    if settings.visit_write_behind:
+        app.state.journal_flusher = asyncio.create_task(visit_journal.run_flusher(AsyncSessionLocal))
+    else:
+        # Visits written through from now on make a journal hash left in Redis stale
+        try:
+            await visit_journal.invalidate_seed()
+        except Exception as e:
+            print(f"[JOURNAL] Could not reset the open visit hash: {e}")
+
+@app.on_event("startup")
+async def start_stats_rollup():
+    """Backfill the statistics rollup on first run, then flush counters in the background"""
+    try:
+        async with AsyncSessionLocal() as db:
+            if await StatsRollup.is_empty(db):
+                counters = await stats_rollup.rebuild(db)
+                print(f"[STATS] Rollup backfilled: {counters} counters")
+    except Exception as e:
+        print(f"[STATS] Rollup backfill failed: {e}")
+    app.state.stats_flusher = asyncio.create_task(stats_rollup.run_flusher(AsyncSessionLocal))
+
+@app.on_event("shutdown")
+async def stop_background_tasks():
+    await event_bus.stop()
+    if getattr(app.state, "journal_flusher", None):
+        app.state.journal_flusher.cancel()
+    if getattr(app.state, "revocation_reloader", None):
+        app.state.revocation_reloader.cancel()
+    if getattr(app.state, "stats_flusher", None):
+        app.state.stats_flusher.cancel()
+        try:
+            async with AsyncSessionLocal() as db:
+                await stats_rollup.flush(db)
+        except Exception as e:
+            print(f"[STATS] Final counter flush failed: {e}")
+    qr_batch.shutdown()
+    password_hasher.shutdown()
+
 @app.get("/health")
 async def health_check():
     return {"status": "ok", "version": "0.1.0"}
 
+@app.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+async def metrics():
+    """Prometheus scrape endpoint (values of this worker process)"""
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
+
 @app.get("/")
 async def root():
     return {
@@ -1,5 +1,8 @@
 from .pass_model import Pass, Visit as PassVisit
 from .user import User
 from .audit_log import AuditLog
+from .pass_change import PassChange
+from .stats_counter import StatsCounter
+from .visit_analytics import VisitAnalytics
 
-__all__ = ["Pass", "PassVisit", "User", "AuditLog"]
\ No newline at end of file
+__all__ = ["Pass", "PassVisit", "User", "AuditLog", "PassChange", "StatsCounter", "VisitAnalytics"]
\ No newline at end of file
@@ -0,0 +1,16 @@
+from sqlalchemy import Column, BigInteger, Integer, String, DateTime, func
+
+from app.database import Base
+
+class PassChange(Base):
+    """Append-only change log of passes; the id is the offline feed version"""
+    __tablename__ = "pass_changes"
+    
+    id = Column(BigInteger().with_variant(Integer, "sqlite"), primary_key=True, autoincrement=True)
+    pass_id = Column(Integer, index=True)
+    qr_hash = Column(String(64))
+    op = Column(String(16))  # upsert, delete
+    guest_name = Column(String(255), nullable=True)
+    valid_from = Column(DateTime(timezone=True), nullable=True)
+    valid_until = Column(DateTime(timezone=True), nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Enum, DateTime, Boolean, Text, ForeignKey, func
+from sqlalchemy import Column, Integer, String, Enum, DateTime, Boolean, Text, ForeignKey, Index, DDL, event, func, text
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from enum import Enum as PyEnum
@@ -35,6 +35,34 @@ class Pass(Base):
     user = relationship("User", back_populates="passes")
     visits = relationship("Visit", back_populates="pass_obj")
     
+    __table_args__ = (
+        # Used by the status sweeper to find passes due for expiry
+        Index("ix_passes_status_valid_until", "status", "valid_until"),
+        # Keyset pagination of pass listings
+        Index("ix_passes_created_at_id", "created_at", "id"),
+    )
+    
+# Searchable text of a pass. Queries must use this exact expression for
+# PostgreSQL to match it against the trigram index below.
+PASS_SEARCH_DOCUMENT = (
+    "(coalesce(guest_name, '') || ' ' || coalesce(guest_email, '') || ' ' || "
+    "coalesce(guest_company, '') || ' ' || coalesce(guest_phone, '') || ' ' || coalesce(uuid, ''))"
+)
+
+# Trigram index for ILIKE '%term%' search; PostgreSQL only, so it is
+# created with DDL instead of an Index that SQLite would also get
+event.listen(
+    Pass.__table__, "before_create",
+    DDL("CREATE EXTENSION IF NOT EXISTS pg_trgm").execute_if(dialect="postgresql"),
+)
+event.listen(
+    Pass.__table__, "after_create",
+    DDL(
+        f"CREATE INDEX IF NOT EXISTS ix_passes_search_trgm ON passes "
+        f"USING gin ({PASS_SEARCH_DOCUMENT} gin_trgm_ops)"
+    ).execute_if(dialect="postgresql"),
+)
+
 class Visit(Base):
     __tablename__ = "visits"
     
@@ -42,6 +70,22 @@ class Visit(Base):
     pass_id = Column(Integer, ForeignKey("passes.id"), index=True)
     entry_time = Column(DateTime(timezone=True))
     exit_time = Column(DateTime(timezone=True), nullable=True)
+    entry_gate_id = Column(String(64), nullable=True)
+    exit_gate_id = Column(String(64), nullable=True)
+    journal_id = Column(String(32), unique=True, nullable=True)  # set when written by the visit journal
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     
     pass_obj = relationship("Pass", back_populates="visits")
+    
+    __table_args__ = (
+        # At most one open visit per pass; makes concurrent scans safe
+        Index(
+            "uq_visits_open_pass",
+            "pass_id",
+            unique=True,
+            postgresql_where=text("exit_time IS NULL"),
+            sqlite_where=text("exit_time IS NULL"),
+        ),
+        # Date-range scans (reports, statistics rollup) and keyset pages of the visit log
+        Index("ix_visits_entry_time_id", "entry_time", "id"),
+    )
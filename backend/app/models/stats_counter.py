@@ -0,0 +1,11 @@
+from sqlalchemy import Column, BigInteger, String, DateTime
+
+from app.database import Base
+
+class StatsCounter(Base):
+    """Hourly rollup of dashboard counters (entries, exits, passes created)"""
+    __tablename__ = "stats_counters"
+    
+    bucket = Column(DateTime(timezone=True), primary_key=True)  # start of the hour, UTC
+    metric = Column(String(32), primary_key=True)
+    value = Column(BigInteger, nullable=False, default=0)
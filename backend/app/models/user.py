@@ -27,6 +27,8 @@ class User(Base):
     hashed_password = Column(String(255))
     role = Column(Enum(UserRole), default=UserRole.GUEST)
     is_active = Column(Boolean, default=True)
+    # Bumped when role or status change: tokens issued before are refused
+    token_version = Column(Integer, nullable=False, default=0, server_default="0")
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now(), server_default=func.now())
     
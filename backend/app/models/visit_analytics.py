@@ -0,0 +1,22 @@
+from sqlalchemy import Column, Integer, String, DateTime, JSON, Index
+
+from app.database import Base
+
+# company value of the rows that cover all guests together
+ALL_COMPANIES = "*"
+
+class VisitAnalytics(Base):
+    """Precomputed visit analytics per company and UTC hour or day"""
+    __tablename__ = "visit_analytics"
+    __table_args__ = (
+        Index("ix_visit_analytics_period_bucket", "period", "bucket"),
+    )
+    
+    company = Column(String(255), primary_key=True)  # "" for guests without a company
+    period = Column(String(8), primary_key=True)  # hour, day
+    bucket = Column(DateTime(timezone=True), primary_key=True)  # start of the period, UTC
+    entries = Column(Integer, nullable=False, default=0)
+    exits = Column(Integer, nullable=False, default=0)
+    peak_occupancy = Column(Integer, nullable=False, default=0)
+    # Visits that ended in the period, counted per DWELL_BINS bin (mergeable, unlike percentiles)
+    dwell_histogram = Column(JSON, nullable=False, default=list)
@@ -1,52 +1,33 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy import select, and_
 from sqlalchemy.ext.asyncio import AsyncSession
-from datetime import datetime, timezone
 
 from ..database import get_db
-from ..models import User, Pass
-from ..dependencies import get_current_user, check_admin_role
+from ..models import User
+from ..models.user import UserRole
+from ..dependencies import get_current_user, check_admin_role, require_permission
+from ..services.statistics import statistics
+from ..services.user_cache import user_cache
+from ..utils.rbac import Permission
 
 router = APIRouter(prefix="/api/admin", tags=["admin"])
 
 
 @router.get("/statistics")
 async def get_statistics(
-    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    """Get admin statistics"""
-    now = datetime.now(timezone.utc)
-    
-    # Total passes
-    total_result = await db.execute(select(Pass))
-    total_passes = len(total_result.scalars().all())
-    
-    # Active passes
-    active_result = await db.execute(
-        select(Pass).where(Pass.is_active == True)
-    )
-    active_passes = len(active_result.scalars().all())
-    
-    # Today's visits
-    today_start = now.replace(hour=0, minute=0, second=0, microsecond=0)
-    today_result = await db.execute(
-        select(Pass)
-        .join(PassVisit)
-        .where(PassVisit.entry_time >= today_start)
-    )
-    today_visits = len(today_result.scalars().all())
-    
-    # Total visits (count visits table)
-    total_visits_result = await db.execute(select(PassVisit))
-    total_visits = len(total_visits_result.scalars().all())
-    
-    return {
-        "total_passes": total_passes,
-        "active_passes": active_passes,
-        "today_visits": today_visits,
-        "total_visits": total_visits
-    }
+    """Get admin statistics (SQL aggregates and the hourly rollup, cached for a few seconds)"""
+    return await statistics.overview()
+
+
+@router.get("/statistics/daily")
+async def get_daily_statistics(
+    days: int = Query(30, ge=1, le=366),
+    current_user: User = Depends(get_current_user)
+):
+    """Entries, exits and passes created per day (UTC), oldest first"""
+    return await statistics.daily(days)
 
 
 @router.get("/users")
@@ -93,10 +74,47 @@ async def update_user_status(
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     
-    user.is_active = status_update.get("is_active", user.is_active)
+    is_active = status_update.get("is_active", user.is_active)
+    if is_active != user.is_active:
+        user.is_active = is_active
+        user.token_version += 1
     
     await db.commit()
     await db.refresh(user)
+    # A deactivated user is locked out of every worker right away
+    await user_cache.publish_change(user)
+    
+    return user
+
+
+@router.patch("/users/{user_id}/role")
+async def update_user_role(
+    user_id: int,
+    role_update: dict,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(require_permission(Permission.MANAGE_USERS))
+):
+    """Change a user's role; tokens issued under the old role stop working"""
+    try:
+        role = UserRole(role_update.get("role"))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid role")
+    
+    result = await db.execute(
+        select(User).where(User.id == user_id)
+    )
+    user = result.scalar_one_or_none()
+    
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found")
+    
+    if user.role != role:
+        user.role = role
+        user.token_version += 1
+        await db.commit()
+        await db.refresh(user)
+        await user_cache.publish_change(user)
+        print(f"[SECURITY] Role of {user.username} changed to {role.value} by {current_user.username}")
     
     return user
 
@@ -110,7 +128,3 @@ async def get_audit_log(
     """Get audit log (use /visits/log instead)"""
     # This is kept for compatibility, but /visits/log is the main endpoint
     return []
-
-
-# Import PassVisit at the end to avoid circular imports
-from ..models import PassVisit
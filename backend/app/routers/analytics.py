@@ -0,0 +1,54 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import JSONResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from datetime import date, timedelta
+from typing import Literal, Optional
+
+from ..database import get_db
+from ..models import User
+from ..dependencies import require_permission
+from ..utils.rbac import Permission
+from ..services.visit_analytics import VisitAnalyticsRollup
+
+router = APIRouter(prefix="/api/analytics", tags=["analytics"])
+
+MAX_RANGE_DAYS = 366
+
+
+def _check_range(date_from: date, date_to: date):
+    if date_to < date_from:
+        raise HTTPException(status_code=400, detail="date_to must not be before date_from")
+    if date_to - date_from >= timedelta(days=MAX_RANGE_DAYS):
+        raise HTTPException(status_code=400, detail=f"Date range is limited to {MAX_RANGE_DAYS} days")
+
+
+@router.get("/visits")
+async def get_visit_series(
+    date_from: date,
+    date_to: date,
+    granularity: Literal["hour", "day"] = "day",
+    company: Optional[str] = Query(None, description="Guest company; all companies if omitted"),
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(require_permission(Permission.EXPORT_REPORT))
+):
+    """
+    Entries, exits, peak concurrent occupancy and dwell time percentiles
+    (minutes, of visits that ended in the period) per UTC hour or day.
+    Served from the precomputed rollup, refreshed every few minutes.
+    """
+    _check_range(date_from, date_to)
+    series = await VisitAnalyticsRollup.series(db, date_from, date_to, granularity, company)
+    # Plain JSON values already; skips the generic encoder, slow on a year of hours
+    return JSONResponse(series)
+
+
+@router.get("/companies")
+async def get_company_summary(
+    date_from: date,
+    date_to: date,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(require_permission(Permission.EXPORT_REPORT))
+):
+    """Visit totals, peak occupancy and dwell time percentiles per guest company, busiest first"""
+    _check_range(date_from, date_to)
+    return await VisitAnalyticsRollup.companies(db, date_from, date_to)
@@ -1,12 +1,19 @@
 from fastapi import APIRouter, Depends, HTTPException, status, Body
+from redis.exceptions import RedisError
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
-from datetime import timedelta
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+import uuid
 
+from app.config import settings
 from app.database import get_db
 from app.models.user import User, UserRole
 from app.schemas.user_schema import UserCreate, TokenResponse, UserResponse, LoginRequest
-from app.utils.security import hash_password, verify_password, create_access_token
+from app.services.password_hasher import password_hasher
+from app.services.token_revocation import token_revocations
+from app.services.user_cache import user_cache
+from app.utils.security import create_access_token, access_token_claims, create_refresh_token, verify_token
 
 router = APIRouter(prefix="/api/auth", tags=["authentication"])
 
@@ -29,7 +36,7 @@ async def register(user_data: UserCreate, db: AsyncSession = Depends(get_db)):
         phone=user_data.phone,
         username=user_data.username,
         full_name=user_data.full_name,
-        hashed_password=hash_password(user_data.password),
+        hashed_password=await password_hasher.hash(user_data.password),
         role=user_data.role
     )
     
@@ -37,16 +44,7 @@ async def register(user_data: UserCreate, db: AsyncSession = Depends(get_db)):
     await db.commit()
     await db.refresh(user)
     
-    # Create token
-    access_token = create_access_token(
-        data={"sub": user.username, "id": user.id, "role": user.role}
-    )
-    
-    return {
-        "access_token": access_token,
-        "token_type": "bearer",
-        "user": UserResponse.from_orm(user)
-    }
+    return _issue_tokens(user)
 
 @router.post("/login", response_model=TokenResponse)
 async def login(username: str = Body(...), password: str = Body(...), db: AsyncSession = Depends(get_db)):
@@ -54,7 +52,7 @@ async def login(username: str = Body(...), password: str = Body(...), db: AsyncS
     result = await db.execute(select(User).where(User.username == username))
     user = result.scalar_one_or_none()
     
-    if not user or not verify_password(password, user.hashed_password):
+    if not user or not await password_hasher.verify(password, user.hashed_password):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid credentials"
@@ -66,12 +64,78 @@ async def login(username: str = Body(...), password: str = Body(...), db: AsyncS
             detail="User is inactive"
         )
     
-    access_token = create_access_token(
-        data={"sub": user.username, "id": user.id, "role": user.role}
-    )
+    return _issue_tokens(user)
+
+
+@router.post("/refresh", response_model=TokenResponse)
+async def refresh(refresh_token: str = Body(..., embed=True), db: AsyncSession = Depends(get_db)):
+    """
+    Exchange a refresh token for a new access token and refresh token. Each
+    refresh token works once; presenting a used one again ends its session.
+    """
+    payload = verify_token(refresh_token)
+    if not payload or payload.get("typ") != "refresh":
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid or expired refresh token"
+        )
+    
+    session_id, session_end = payload["sid"], payload["exp"]
+    try:
+        revoked = await token_revocations.is_revoked(session_id)
+        replayed = not revoked and not await token_revocations.claim_refresh(payload["jti"], session_end)
+        if replayed:
+            # Two holders of one refresh token: it leaked, so nobody keeps the session
+            await token_revocations.revoke(session_id, session_end)
+            print(f"[SECURITY] Refresh token reused, session revoked for user {payload['id']}")
+    except RedisError:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Token store unavailable"
+        )
+    
+    if revoked or replayed:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Session revoked, please sign in again"
+        )
+    
+    user = await user_cache.get(db, payload["id"])
+    if not user or not user.is_active:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="User is inactive"
+        )
+    
+    return _issue_tokens(user, session_id, datetime.fromtimestamp(session_end, timezone.utc))
+
+
+@router.post("/logout")
+async def logout(refresh_token: str = Body(..., embed=True)):
+    """End the session of a refresh token: its access tokens stop working too"""
+    payload = verify_token(refresh_token)
+    if payload and payload.get("typ") == "refresh":
+        try:
+            await token_revocations.revoke(payload["sid"], payload["exp"])
+        except RedisError:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Token store unavailable"
+            )
+    return {"status": "success"}
+
+
+def _issue_tokens(user: User, session_id: Optional[str] = None, session_end: Optional[datetime] = None) -> dict:
+    """Access and refresh token of a new session, or the next pair of an existing one"""
+    now = datetime.now(timezone.utc)
+    if session_id is None:
+        session_id = uuid.uuid4().hex
+        session_end = now + timedelta(hours=settings.refresh_token_expire_hours)
     
+    access_lifetime = min(timedelta(minutes=settings.access_token_expire_minutes), session_end - now)
     return {
-        "access_token": access_token,
+        "access_token": create_access_token(access_token_claims(user, session_id), access_lifetime),
+        "refresh_token": create_refresh_token(user.id, session_id, session_end),
         "token_type": "bearer",
         "user": UserResponse.from_orm(user)
     }
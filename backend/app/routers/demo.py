@@ -4,7 +4,7 @@ from sqlalchemy.future import select
 
 from app.database import get_db
 from app.models.user import User, UserRole
-from app.utils.security import hash_password
+from app.services.password_hasher import password_hasher
 
 router = APIRouter(prefix="/api/demo", tags=["demo"])
 
@@ -62,7 +62,7 @@ async def create_demo_users(db: AsyncSession = Depends(get_db)):
             username=user_data["username"],
             full_name=user_data["full_name"],
             email=user_data["email"],
-            hashed_password=hash_password(user_data["password"]),
+            hashed_password=await password_hasher.hash(user_data["password"]),
             role=user_data["role"],
             is_active=True
         )
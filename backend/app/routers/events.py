@@ -0,0 +1,65 @@
+import asyncio
+from fastapi import APIRouter, HTTPException, WebSocket, WebSocketDisconnect, status
+from redis.exceptions import RedisError
+from starlette.websockets import WebSocketState
+
+from app.database import AsyncSessionLocal
+from app.dependencies import authenticate_token, check_admin_role
+from app.services.event_bus import event_bus
+from app.services.occupancy import occupancy
+from app.services.scan_events import SCAN_CHANNEL
+
+router = APIRouter(prefix="/api/events", tags=["events"])
+
+HEARTBEAT_SECONDS = 25
+
+@router.websocket("/ws")
+async def scan_events_ws(websocket: WebSocket, token: str = ""):
+    """
+    Push check-in/check-out/denied scan events to the admin dashboard.
+    Browsers cannot set headers on a WebSocket, so the JWT comes as ?token=
+    """
+    try:
+        async with AsyncSessionLocal() as db:
+            user = await authenticate_token(token, db)
+        await check_admin_role(user)
+    except HTTPException as e:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION, reason=e.detail)
+        return
+
+    await websocket.accept()
+    queue = event_bus.subscribe(SCAN_CHANNEL)
+    receive = asyncio.create_task(_wait_for_disconnect(websocket))
+    forward = asyncio.create_task(_forward_events(websocket, queue))
+    try:
+        # The dashboard left or sending to it failed
+        await asyncio.wait((receive, forward), return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        receive.cancel()
+        forward.cancel()
+        # Retrieve what ended both tasks so no exception goes unobserved
+        _, error = await asyncio.gather(receive, forward, return_exceptions=True)
+        event_bus.unsubscribe(SCAN_CHANNEL, queue)
+
+    if isinstance(error, Exception) and not isinstance(error, WebSocketDisconnect):
+        print(f"[EVENTS] Forwarding scan events failed: {error!r}")
+        if websocket.client_state == WebSocketState.CONNECTED:
+            await websocket.close(code=status.WS_1011_INTERNAL_ERROR)
+
+async def _wait_for_disconnect(websocket: WebSocket):
+    # Dashboards never send anything; reading only notices the disconnect
+    while (await websocket.receive())["type"] != "websocket.disconnect":
+        pass
+
+async def _forward_events(websocket: WebSocket, queue: asyncio.Queue):
+    try:
+        await websocket.send_json({"type": "occupancy", **await occupancy.get_counts()})
+    except RedisError:
+        pass
+
+    while True:
+        try:
+            event = await asyncio.wait_for(queue.get(), timeout=HEARTBEAT_SECONDS)
+        except asyncio.TimeoutError:
+            event = {"type": "ping"}
+        await websocket.send_json(event)
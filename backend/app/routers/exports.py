@@ -0,0 +1,62 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from datetime import datetime, timedelta, timezone
+from typing import Literal, Optional
+
+from ..models import User
+from ..models.pass_model import PassStatus
+from ..dependencies import require_permission
+from ..services.data_export import MEDIA_TYPES, export_stream, passes_query, visits_query
+from ..utils.rbac import Permission, check_permission
+
+router = APIRouter(prefix="/api/exports", tags=["exports"])
+
+
+def _export_response(query, name: str, fmt: str, gzip: bool) -> StreamingResponse:
+    filename = f"{name}-{datetime.now(timezone.utc):%Y%m%d-%H%M%S}.{fmt}"
+    if gzip:
+        filename += ".gz"
+    return StreamingResponse(
+        export_stream(query, fmt, gzip),
+        media_type="application/gzip" if gzip else MEDIA_TYPES[fmt],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+
+def _parse_date(value: Optional[str], name: str) -> Optional[datetime]:
+    if not value:
+        return None
+    try:
+        return datetime.strptime(value, "%Y-%m-%d").replace(tzinfo=timezone.utc)
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"{name} must be YYYY-MM-DD")
+
+
+@router.get("/passes")
+async def export_passes(
+    format: Literal["csv", "ndjson"] = "csv",
+    gzip: bool = False,
+    status: Optional[PassStatus] = None,
+    current_user: User = Depends(require_permission(Permission.EXPORT_REPORT))
+):
+    """Stream every pass (optionally only one status) as CSV or NDJSON"""
+    sensitive = check_permission(current_user.role, Permission.VIEW_SENSITIVE_DATA)
+    print(f"[EXPORT] Passes exported by {current_user.username} ({format})")
+    return _export_response(passes_query(sensitive, status), "passes", format, gzip)
+
+
+@router.get("/visits")
+async def export_visits(
+    format: Literal["csv", "ndjson"] = "csv",
+    gzip: bool = False,
+    date_from: Optional[str] = Query(None, description="First day (YYYY-MM-DD)"),
+    date_to: Optional[str] = Query(None, description="Last day, inclusive (YYYY-MM-DD)"),
+    current_user: User = Depends(require_permission(Permission.EXPORT_REPORT))
+):
+    """Stream visits with guest details, optionally within a range of entry dates"""
+    start = _parse_date(date_from, "date_from")
+    end = _parse_date(date_to, "date_to")
+    if end:
+        end += timedelta(days=1)
+    print(f"[EXPORT] Visits exported by {current_user.username} ({format})")
+    return _export_response(visits_query(start, end), "visits", format, gzip)
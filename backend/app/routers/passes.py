@@ -1,25 +1,52 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy import select, or_
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import datetime, timezone
+from typing import Literal, Optional, Union
 import uuid
 
+from ..config import settings
 from ..database import get_db
 from ..models import Pass, User
-from ..schemas import PassResponse, PassCreate, PassUpdate, SendEmailRequest
+from ..models.pass_model import PassStatus
+from ..schemas import PassResponse, PassPage, PassCreate, PassUpdate, SendEmailRequest
 from ..dependencies import get_current_user
+from ..services.autocomplete import autocomplete, publish_name_changes
+from ..services.pass_cache import pass_cache
+from ..services.pass_import import PassImporter, rows_for
+from ..services.pass_search import search_query
+from ..services.offline_feed import record_pass_change, record_pass_removal
+from ..services.pass_status import status_for
+from ..services.qr_images import MEDIA_TYPES as QR_MEDIA_TYPES, etag_matches, image_key, qr_images
+from ..services.statistics import stats_rollup
+from ..utils.async_tasks import AsyncTaskRunner
+from ..utils.pagination import apply_keyset, split_page
+from ..utils.qr_tokens import issue_qr_token, is_signed_token
 
 router = APIRouter(prefix="/api/passes", tags=["passes"])
 
+# Sort key of pass listings, backed by ix_passes_created_at_id
+PAGE_KEY = (Pass.created_at, Pass.id)
 
-@router.get("/", response_model=list[PassResponse])
-async def get_passes(skip: int = 0, limit: int = 100, db: AsyncSession = Depends(get_db)):
-    """Get all passes"""
-    result = await db.execute(
-        select(Pass).offset(skip).limit(limit)
-    )
-    passes = result.scalars().all()
-    return passes
+
+@router.get("/", response_model=Union[PassPage, list[PassResponse]])
+async def get_passes(
+    skip: int = 0,
+    limit: int = Query(100, ge=1, le=1000),
+    status: Optional[PassStatus] = None,
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Get passes, newest first, optionally only those with the given status.
+    Pass cursor (empty for the first page) to get {items, next_cursor};
+    without it the legacy skip/limit list is returned.
+    """
+    query = select(Pass)
+    if status is not None:
+        query = query.where(Pass.status == status)
+    
+    return await _paginate(db, query, skip, limit, cursor)
 
 
 @router.post("/create", response_model=PassResponse)
@@ -37,10 +64,20 @@ async def create_pass(pass_data: PassCreate, db: AsyncSession = Depends(get_db))
         is_active=True,
         created_at=datetime.now(timezone.utc)
     )
+    new_pass.status = status_for(new_pass, new_pass.created_at)
     
     db.add(new_pass)
+    await db.flush()
+    
+    if settings.signed_qr_codes:
+        # The signed code embeds the pass id, so it is issued after the INSERT
+        new_pass.qr_code = issue_qr_token(new_pass.id, new_pass.valid_from, new_pass.valid_until)
+    
+    record_pass_change(db, new_pass)
     await db.commit()
     await db.refresh(new_pass)
+    await publish_name_changes(added=[new_pass])
+    stats_rollup.add("passes_created", new_pass.created_at)
     
     # TODO: Send SMS and Email notifications
     print(f"[NOTIFICATION] Pass created and sent to email")
@@ -49,6 +86,37 @@ async def create_pass(pass_data: PassCreate, db: AsyncSession = Depends(get_db))
     return new_pass
 
 
+@router.post("/import")
+async def import_passes(
+    request: Request,
+    format: Optional[Literal["csv", "ndjson"]] = None,
+    render_qr: bool = False,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Bulk-create passes from a CSV (with header) or NDJSON request body.
+    The body is streamed; rows are validated like /create and inserted in
+    chunks, and invalid rows are reported by line without stopping the import.
+    With render_qr, QR images are rendered in the background per chunk.
+    """
+    rows = rows_for(request.headers.get("content-type"), format, request.stream())
+    on_created = AsyncTaskRunner.prerender_qr_codes if render_qr else None
+    return await PassImporter(db, on_created=on_created).run(rows)
+
+
+@router.get("/autocomplete")
+async def autocomplete_passes(
+    q: str,
+    field: Literal["guest_name", "guest_company"] = "guest_name",
+    limit: int = Query(10, ge=1, le=50),
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Distinct guest names or companies with a word starting with q (type-ahead)"""
+    return {"field": field, "suggestions": await autocomplete.complete(db, field, q, limit)}
+
+
 @router.put("/{pass_id}", response_model=PassResponse)
 async def update_pass(
     pass_id: int,
@@ -65,6 +133,8 @@ async def update_pass(
     if not pass_obj:
         raise HTTPException(status_code=404, detail="Pass not found")
     
+    old_names = {"guest_name": pass_obj.guest_name, "guest_company": pass_obj.guest_company}
+    
     # Update fields if provided
     if pass_update.guest_name is not None:
         pass_obj.guest_name = pass_update.guest_name
@@ -79,8 +149,20 @@ async def update_pass(
     if pass_update.is_active is not None:
         pass_obj.is_active = pass_update.is_active
     
+    pass_obj.status = status_for(pass_obj, datetime.now(timezone.utc))
+    
+    old_qr_code = pass_obj.qr_code
+    if pass_update.valid_until is not None and is_signed_token(old_qr_code):
+        # Signed codes carry the validity window, so they must be re-issued
+        pass_obj.qr_code = issue_qr_token(pass_obj.id, pass_obj.valid_from, pass_obj.valid_until)
+        record_pass_removal(db, pass_obj.id, old_qr_code)
+    
+    record_pass_change(db, pass_obj)
     await db.commit()
     await db.refresh(pass_obj)
+    await pass_cache.publish_change(old_qr_code)
+    if old_names != {"guest_name": pass_obj.guest_name, "guest_company": pass_obj.guest_company}:
+        await publish_name_changes(added=[pass_obj], removed=[old_names])
     
     return pass_obj
 
@@ -100,36 +182,64 @@ async def delete_pass(
         raise HTTPException(status_code=404, detail="Pass not found")
     
     await db.delete(pass_obj)
+    record_pass_removal(db, pass_obj.id, pass_obj.qr_code)
     await db.commit()
+    await pass_cache.publish_change(pass_obj.qr_code)
+    await publish_name_changes(removed=[pass_obj])
     
     return {"status": "success", "message": "Pass deleted"}
 
 
-@router.get("/search")
+@router.get("/search", response_model=Union[PassPage, list[PassResponse]])
 async def search_passes(
     name: str = "",
     skip: int = 0,
-    limit: int = 100,
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: Optional[str] = None,
     db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    """Search passes by name (admin only)"""
-    result = await db.execute(
-        select(Pass)
-        .where(
-            or_(
-                Pass.guest_name.ilike(f"%{name}%"),
-                Pass.guest_email.ilike(f"%{name}%"),
-                Pass.guest_company.ilike(f"%{name}%"),
-                Pass.guest_phone.ilike(f"%{name}%"),
-                Pass.uuid.ilike(f"%{name}%")  # Поиск по ID пропуска
-            )
+    """
+    Search passes by name, email, company, phone or pass ID (admin only),
+    best matches first; paginated like GET /api/passes/
+    """
+    if not name.strip():
+        return await _paginate(db, select(Pass), skip, limit, cursor)
+    
+    query, rank = search_query(name, db.get_bind().dialect.name)
+    
+    if cursor is None:
+        result = await db.execute(query.order_by(rank.desc(), Pass.id.desc()).offset(skip).limit(limit))
+        return result.scalars().all()
+    
+    try:
+        query = apply_keyset(query, (rank, Pass.id), cursor, limit)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    
+    result = await db.execute(query)
+    rows, next_cursor = split_page(result.all(), limit, lambda row: (row.rank, row.Pass.id))
+    return {"items": [row.Pass for row in rows], "next_cursor": next_cursor}
+
+
+async def _paginate(db: AsyncSession, query, skip: int, limit: int, cursor: Optional[str]):
+    """Keyset page over (created_at, id) when a cursor is given, else a legacy offset page"""
+    if cursor is None:
+        result = await db.execute(
+            query.order_by(Pass.created_at.desc(), Pass.id.desc()).offset(skip).limit(limit)
         )
-        .offset(skip)
-        .limit(limit)
+        return result.scalars().all()
+    
+    try:
+        query = apply_keyset(query, PAGE_KEY, cursor, limit)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    
+    result = await db.execute(query)
+    items, next_cursor = split_page(
+        result.scalars().all(), limit, lambda pass_obj: (pass_obj.created_at, pass_obj.id)
     )
-    passes = result.scalars().all()
-    return passes
+    return {"items": items, "next_cursor": next_cursor}
 
 
 @router.post("/{pass_id}/send-email")
@@ -167,3 +277,32 @@ async def send_email_to_pass(
         "pass_id": pass_id,
         "recipient": recipient_email
     }
+
+
+@router.get("/{pass_uuid}/qr")
+async def get_pass_qr(
+    pass_uuid: str,
+    request: Request,
+    format: Literal["png", "svg"] = "png",
+    size: int = Query(10, ge=2, le=20, description="Pixels (PNG) per QR module"),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    QR image of a pass, addressed by its uuid so it can be linked from guest
+    e-mails. Rendered once per code and served with a strong ETag.
+    """
+    result = await db.execute(
+        select(Pass.qr_code).where(Pass.uuid == pass_uuid, Pass.is_active.is_(True))
+    )
+    qr_code = result.scalar_one_or_none()
+    if qr_code is None:
+        raise HTTPException(status_code=404, detail="Pass not found")
+
+    etag = f'"{image_key(qr_code, format, size)}"'
+    # Revalidate on every use: the code changes when a signed pass is extended
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+
+    _, image = await qr_images.get(qr_code, format, size)
+    return Response(content=image, media_type=QR_MEDIA_TYPES[format], headers=headers)
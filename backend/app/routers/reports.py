@@ -0,0 +1,139 @@
+from fastapi import APIRouter, Depends, HTTPException, Path as PathParam, Request
+from fastapi.responses import StreamingResponse
+from redis.exceptions import RedisError
+
+from ..celery_app import app as celery_app
+from ..models import User
+from ..schemas import ReportRequest
+from ..dependencies import require_permission
+from ..utils.rbac import Permission
+from ..services import reports
+from ..services.redis_client import get_redis
+from ..tasks.report_tasks import build_report_task
+from ..utils.byte_range import iter_file, parse_byte_range
+
+router = APIRouter(prefix="/api/reports", tags=["reports"])
+
+REPORT_ID = PathParam(..., pattern="^[0-9a-f]{32}$")
+MEDIA_TYPES = {
+    "csv": "text/csv",
+    "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+}
+
+
+def _job_key(report_id: str) -> str:
+    # Set while a build is queued or running, so identical requests join it
+    return f"reports:job:{report_id}"
+
+
+async def _report_status(report_id: str) -> dict:
+    path = reports.find_report(report_id)
+    if path:
+        return {
+            "report_id": report_id,
+            "status": "ready",
+            "size": path.stat().st_size,
+            "download_url": f"/api/reports/{report_id}/download",
+        }
+
+    result = celery_app.AsyncResult(report_id)
+    if result.state == "FAILURE":
+        return {"report_id": report_id, "status": "failed", "error": str(result.result)}
+    if result.state in ("STARTED", "PROGRESS"):
+        progress = result.info if isinstance(result.info, dict) else {}
+        return {
+            "report_id": report_id,
+            "status": "running",
+            "done": progress.get("done", 0),
+            "total": progress.get("total"),
+        }
+    if result.state == "PENDING" and await get_redis().exists(_job_key(report_id)):
+        return {"report_id": report_id, "status": "queued"}
+    # Never requested, or built so long ago that the file has been purged
+    raise HTTPException(status_code=404, detail="Report not found")
+
+
+@router.post("/", status_code=202)
+async def request_report(
+    report: ReportRequest,
+    current_user: User = Depends(require_permission(Permission.EXPORT_REPORT))
+):
+    """
+    Queue a report build, or join the identical one already queued or
+    finished. Poll GET /api/reports/{report_id} for progress.
+    """
+    if report.format == "xlsx" and reports.Workbook is None:
+        raise HTTPException(status_code=400, detail="XLSX reports are not available (openpyxl not installed)")
+
+    report_id = reports.report_id(report)
+    if reports.find_report(report_id):
+        return await _report_status(report_id)
+
+    try:
+        redis = get_redis()
+        if celery_app.AsyncResult(report_id).state in ("FAILURE", "SUCCESS"):
+            # Failed, or finished but purged since: build it again
+            celery_app.AsyncResult(report_id).forget()
+            await redis.delete(_job_key(report_id))
+
+        if await redis.set(_job_key(report_id), current_user.username, nx=True,
+                           ex=celery_app.conf.task_time_limit):
+            build_report_task.apply_async(args=[report_id, report.model_dump(mode="json")], task_id=report_id)
+            print(f"[REPORTS] Report {report_id} requested by {current_user.username}: {report.report}")
+        return await _report_status(report_id)
+    except RedisError as e:
+        print(f"[REPORTS] Report queue unavailable: {e}")
+        raise HTTPException(status_code=503, detail="Report queue unavailable")
+
+
+@router.get("/{report_id}")
+async def get_report_status(
+    report_id: str = REPORT_ID,
+    current_user: User = Depends(require_permission(Permission.EXPORT_REPORT))
+):
+    """Report state: queued, running (with done/total visits), ready or failed"""
+    try:
+        return await _report_status(report_id)
+    except RedisError as e:
+        print(f"[REPORTS] Report queue unavailable: {e}")
+        raise HTTPException(status_code=503, detail="Report queue unavailable")
+
+
+@router.get("/{report_id}/download")
+async def download_report(
+    request: Request,
+    report_id: str = REPORT_ID,
+    current_user: User = Depends(require_permission(Permission.EXPORT_REPORT))
+):
+    """Download a finished report; supports single Range requests for resuming"""
+    path = reports.find_report(report_id)
+    if not path:
+        raise HTTPException(status_code=404, detail="Report not ready")
+
+    size = path.stat().st_size
+    fmt = path.suffix.lstrip(".")
+    headers = {
+        "Accept-Ranges": "bytes",
+        "Content-Disposition": f'attachment; filename="report-{report_id[:8]}.{fmt}"',
+        "ETag": f'"{report_id}-{int(path.stat().st_mtime)}"',
+    }
+    try:
+        byte_range = parse_byte_range(request.headers.get("range"), size)
+    except ValueError:
+        raise HTTPException(status_code=416, detail="Range not satisfiable",
+                            headers={"Content-Range": f"bytes */{size}"})
+
+    if byte_range and request.headers.get("if-range", headers["ETag"]) != headers["ETag"]:
+        # The file changed since the client's partial download: start over
+        byte_range = None
+
+    first, last = byte_range or (0, size - 1)
+    headers["Content-Length"] = str(last - first + 1)
+    if byte_range:
+        headers["Content-Range"] = f"bytes {first}-{last}/{size}"
+    return StreamingResponse(
+        iter_file(path, first, last),
+        status_code=206 if byte_range else 200,
+        media_type=MEDIA_TYPES[fmt],
+        headers=headers,
+    )
@@ -1,219 +1,189 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Body
+from fastapi import APIRouter, Depends, HTTPException, status, Body, Request, Response
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.future import select
 from datetime import datetime, timezone
 
 from app.database import get_db
-from app.models.pass_model import Pass, PassStatus, Visit
+from app.dependencies import check_guard_role
+from app.models.pass_model import Pass, PassStatus
 from app.models.user import User, UserRole
-from app.schemas.pass_schema import VerifyPassRequest
+from app.schemas.pass_schema import VerifyPassRequest, VerifyBatchRequest
+from app.services.offline_feed import offline_feed, current_version
+from app.services.pass_cache import pass_cache, snapshot_from_row, SNAPSHOT_COLUMNS
+from app.services.scan_events import publish_scan, publish_scans
+from app.services.scan_metrics import track_scan, scan_stage, record_outcome
+from app.services.scan_engine import ScanEngine, check_pass, denied_response, scan_response
+from app.utils.qr_tokens import check_qr_token
 
 router = APIRouter(prefix="/api/scan", tags=["scanning"])
 
 @router.post("/verify")
 async def verify_pass(request: VerifyPassRequest, db: AsyncSession = Depends(get_db)):
     """Verify QR code and check pass validity"""
-    
+
+    with track_scan("verify"):
+        now = datetime.now(timezone.utc)
+        response = await _verify(request, db, now)
+        record_outcome(response)
+
+        with scan_stage("publish"):
+            await publish_scan(response, now, request.gate_id)
+
+    return response
+
+async def _verify(request: VerifyPassRequest, db: AsyncSession, now: datetime) -> dict:
     qr_code = request.qr_code
-    # Find pass by QR code
-    result = await db.execute(select(Pass).where(Pass.qr_code == qr_code))
-    pass_obj = result.scalar_one_or_none()
-    
-    if not pass_obj:
-        return {
-            "status": "DENIED",
-            "reason": "Pass not found",
-            "guest_name": None,
-            "is_valid": False
-        }
-    
-    # Check if pass is active
-    if not pass_obj.is_active:
-        return {
-            "status": "DENIED",
-            "reason": "Pass is inactive",
-            "guest_name": pass_obj.guest_name,
-            "is_valid": False
-        }
-    
-    now = datetime.now(timezone.utc)
-    
-    # Check validity dates
-    if now < pass_obj.valid_from:
-        return {
-            "status": "DENIED",
-            "reason": "Pass not yet valid",
-            "guest_name": pass_obj.guest_name,
-            "is_valid": False
-        }
-    
-    if now > pass_obj.valid_until:
-        # Auto-expire pass
-        pass_obj.is_active = False
-        await db.commit()
-        
-        return {
-            "status": "DENIED",
-            "reason": "Pass expired",
-            "guest_name": pass_obj.guest_name,
-            "is_valid": False
-        }
-    
-    # Check if already entered
-    active_visit_result = await db.execute(
-        select(Visit).where(
-            Visit.pass_id == pass_obj.id,
-            Visit.exit_time == None
-        ).order_by(Visit.id.desc()).limit(1)
-    )
-    active_visit = active_visit_result.scalar_one_or_none()
-    
-    if active_visit:
-        active_visit.exit_time = now
-    
-        await db.commit()
-        await db.refresh(active_visit)
-        
-        duration_minutes = int((now - active_visit.entry_time).total_seconds() / 60)
-        
-        print(f"[AUDIT] Check-out: {pass_obj.guest_name} at {now} (duration: {duration_minutes} min)")
-        
-        return {
-            "status": "EXIT",
-            "reason": "Valid pass",
-            "guest_name": pass_obj.guest_name,
-            "guest_company": pass_obj.guest_company,
-            "guest_photo_url": getattr(pass_obj, 'guest_photo_url', None),
-            "valid_until": pass_obj.valid_until,
-            "pass_id": pass_obj.id,
-            "duration_minutes": duration_minutes
-        }
-    
-    # Record visit
-    visit = Visit(
-        pass_id=pass_obj.id,
-        entry_time=now
+
+    # Reject forged or out-of-window signed codes without touching the database
+    with scan_stage("token"):
+        reason = check_qr_token(qr_code, now)
+    if reason:
+        return denied_response(reason)
+
+    # Find pass by QR code (served from the hot pass cache when possible)
+    with scan_stage("lookup"):
+        pass_obj = await pass_cache.get(db, qr_code)
+
+    # Expired passes are only denied here; the status sweeper deactivates them
+    reason = check_pass(pass_obj, now)
+    if reason:
+        return denied_response(reason, pass_obj["guest_name"] if pass_obj else None)
+
+    # Check-in or check-out in one atomic statement
+    with scan_stage("toggle"):
+        toggle = await ScanEngine.toggle_visit(db, pass_obj["id"], now, request.gate_id)
+    if toggle is None:
+        return denied_response("Duplicate scan in progress", pass_obj["guest_name"])
+
+    if toggle["action"] == "EXIT":
+        print(f"[AUDIT] Check-out: {pass_obj['guest_name']} at {now} (duration: {toggle['duration_minutes']} min)")
+    else:
+        print(f"[AUDIT] Check-in: {pass_obj['guest_name']} at {now}")
+
+    return scan_response(pass_obj, toggle)
+
+@router.post("/verify-batch")
+async def verify_pass_batch(
+    request: VerifyBatchRequest,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(check_guard_role)
+):
+    """Verify buffered scans from a gate controller in one transaction"""
+    with track_scan("verify_batch"):
+        try:
+            with scan_stage("apply"):
+                results = await ScanEngine.apply_batch(db, request.events)
+        except IntegrityError:
+            await db.rollback()
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail="Concurrent scan of a pass in the batch, retry the batch"
+            )
+
+        print(f"[AUDIT] Batch scan: {len(results)} events applied")
+
+        for result in results:
+            record_outcome(result)
+
+        with scan_stage("publish"):
+            await publish_scans(
+                (result, result["scanned_at"], result["gate_id"])
+                for result in sorted(results, key=lambda result: result["scanned_at"])
+            )
+
+    return {"results": results}
+
+@router.get("/offline/snapshot")
+async def get_offline_snapshot(
+    request: Request,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(check_guard_role)
+):
+    """Stream currently valid passes (hashed codes) for offline verification"""
+    version = await current_version(db)
+    etag = f'"snapshot-{version}"'
+
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+
+    return StreamingResponse(
+        offline_feed.stream_snapshot(version),
+        media_type="application/x-ndjson",
+        headers={"ETag": etag, "X-Feed-Version": str(version)}
     )
-    db.add(visit)
-    await db.commit()
-    
-    print(f"[AUDIT] Check-in: {pass_obj.guest_name} at {now}")
-    
-    return {
-        "status": "ALLOWED",
-        "reason": "Valid pass",
-        "guest_name": pass_obj.guest_name,
-        "guest_company": pass_obj.guest_company,
-        "guest_photo_url": getattr(pass_obj, 'guest_photo_url', None),
-        "valid_until": pass_obj.valid_until,
-        "pass_id": pass_obj.id,
-        "is_valid": True
-    }
+
+@router.get("/offline/delta")
+async def get_offline_delta(
+    since: int = 0,
+    limit: int = 1000,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(check_guard_role)
+):
+    """Pass changes after the given feed version"""
+    return await offline_feed.get_delta(db, since, min(limit, 5000))
+
+@router.get("/cache-stats")
+async def get_cache_stats(current_user: User = Depends(check_guard_role)):
+    """Hit/miss counters of the hot pass cache used by /verify"""
+    return pass_cache.stats()
 
 @router.post("/check-in")
 async def check_in(pass_id: int, db: AsyncSession = Depends(get_db)):
     """Check in guest - record entry"""
-    
-    result = await db.execute(select(Pass).where(Pass.id == pass_id))
-    pass_obj = result.scalar_one_or_none()
-    
-    if not pass_obj:
+
+    result = await db.execute(select(*SNAPSHOT_COLUMNS).where(Pass.id == pass_id))
+    row = result.one_or_none()
+
+    if not row:
         raise HTTPException(status_code=404, detail="Pass not found")
-    
-    # Record entry via the existing endpoint logic
+
+    pass_obj = snapshot_from_row(row)
     now = datetime.now(timezone.utc)
-    
-    # Check if already entered
-    active_visit_result = await db.execute(
-        select(Visit).where(
-            Visit.pass_id == pass_id,
-            Visit.exit_time == None
-        ).order_by(Visit.id.desc()).limit(1)
-    )
-    active_visit = active_visit_result.scalar_one_or_none()
-    
-    if active_visit:
-        active_visit.exit_time = now
-    
-        await db.commit()
-        await db.refresh(active_visit)
-        
-        duration_minutes = int((now - active_visit.entry_time).total_seconds() / 60)
-        
-        print(f"[AUDIT] Check-out: {pass_obj.guest_name} at {now} (duration: {duration_minutes} min)")
-        
-        return {
-            "status": "EXIT",
-            "reason": "Valid pass",
-            "guest_name": pass_obj.guest_name,
-            "guest_company": pass_obj.guest_company,
-            "guest_photo_url": getattr(pass_obj, 'guest_photo_url', None),
-            "valid_until": pass_obj.valid_until,
-            "pass_id": pass_obj.id,
-            "duration_minutes": duration_minutes
-        }
-    
-    # Record visit
-    visit = Visit(
-        pass_id=pass_obj.id,
-        entry_time=now
-    )
-    db.add(visit)
-    await db.commit()
-    
-    print(f"[AUDIT] Check-in: {pass_obj.guest_name} at {now}")
-    
-    return {
-        "status": "ALLOWED",
-        "reason": "Valid pass",
-        "guest_name": pass_obj.guest_name,
-        "guest_company": pass_obj.guest_company,
-        "guest_photo_url": getattr(pass_obj, 'guest_photo_url', None),
-        "valid_until": pass_obj.valid_until,
-        "pass_id": pass_obj.id,
-        "is_valid": True
-    }
+
+    toggle = await ScanEngine.toggle_visit(db, pass_id, now)
+    if toggle is None:
+        return denied_response("Duplicate scan in progress", pass_obj["guest_name"])
+
+    if toggle["action"] == "EXIT":
+        print(f"[AUDIT] Check-out: {pass_obj['guest_name']} at {now} (duration: {toggle['duration_minutes']} min)")
+    else:
+        print(f"[AUDIT] Check-in: {pass_obj['guest_name']} at {now}")
+
+    response = scan_response(pass_obj, toggle)
+    await publish_scan(response, now)
+
+    return response
 
 
 @router.post("/check-out")
 async def check_out(pass_id: int, db: AsyncSession = Depends(get_db)):
     """Check out guest - record exit"""
-    
-    result = await db.execute(select(Pass).where(Pass.id == pass_id))
-    pass_obj = result.scalar_one_or_none()
-    
-    if not pass_obj:
+
+    result = await db.execute(select(Pass.guest_name).where(Pass.id == pass_id))
+    guest_name = result.scalar_one_or_none()
+
+    if guest_name is None:
         raise HTTPException(status_code=404, detail="Pass not found")
-    
-    # Find active visit
-    active_visit_result = await db.execute(
-        select(Visit).where(
-            Visit.pass_id == pass_id,
-            Visit.exit_time == None
-        )
-    )
-    active_visit = active_visit_result.scalar_one_or_none()
-    
-    if not active_visit:
+
+    now = datetime.now(timezone.utc)
+    closed = await ScanEngine.close_visit(db, pass_id, now)
+
+    if not closed:
         return {
             "status": "not_checked_in",
-            "message": f"Guest {pass_obj.guest_name} is not checked in"
+            "message": f"Guest {guest_name} is not checked in"
         }
-    
-    now = datetime.now(timezone.utc)
-    active_visit.exit_time = now
-    
-    await db.commit()
-    await db.refresh(active_visit)
-    
-    duration_minutes = int((now - active_visit.entry_time).total_seconds() / 60)
-    
-    print(f"[AUDIT] Check-out: {pass_obj.guest_name} at {now} (duration: {duration_minutes} min)")
-    
+
+    print(f"[AUDIT] Check-out: {guest_name} at {now} (duration: {closed['duration_minutes']} min)")
+
+    await publish_scan({"status": "EXIT", "pass_id": pass_id, "guest_name": guest_name}, now)
+
     return {
         "status": "success",
-        "message": f"Goodbye {pass_obj.guest_name}!",
-        "visit_id": active_visit.id,
-        "exit_time": active_visit.exit_time,
-        "duration_minutes": duration_minutes
+        "message": f"Goodbye {guest_name}!",
+        "visit_id": closed["visit_id"],
+        "exit_time": closed["exit_time"],
+        "duration_minutes": closed["duration_minutes"]
     }
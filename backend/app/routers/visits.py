@@ -1,54 +1,118 @@
-from fastapi import APIRouter, Depends, Query
-from sqlalchemy import select
+from fastapi import APIRouter, Depends, HTTPException, Query
+from redis.exceptions import RedisError
+from sqlalchemy import or_, select
 from sqlalchemy.ext.asyncio import AsyncSession
-from datetime import datetime, timezone, timedelta
+from datetime import date, datetime, timezone, timedelta
+from typing import Optional
 
 from ..database import get_db
 from ..models import PassVisit, Pass, User
-from ..dependencies import get_current_user
+from ..dependencies import get_current_user, require_permission
+from ..services.occupancy import occupancy
+from ..utils.pagination import apply_keyset, split_page
+from ..utils.rbac import Permission
 
 router = APIRouter(prefix="/api/visits", tags=["visits"])
 
 
+# Sort key of the visit log, backed by ix_visits_entry_time_id
+LOG_KEY = (PassVisit.entry_time, PassVisit.id)
+LOG_MAX_LIMIT = 1000
+
+
 @router.get("/log")
 async def get_visits_log(
-    date: str = Query(None),
+    day: Optional[str] = Query(None, alias="date"),
+    date_from: Optional[str] = None,
+    date_to: Optional[str] = None,
+    company: Optional[str] = None,
+    pass_uuid: Optional[str] = None,
+    gate_id: Optional[str] = None,
+    open_only: bool = False,
     skip: int = 0,
     limit: int = 100,
+    cursor: Optional[str] = None,
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: User = Depends(require_permission(Permission.VIEW_AUDIT_LOG))
 ):
-    """Get visits log with guest and pass information"""
-    query = select(PassVisit).join(Pass).offset(skip).limit(limit)
-    print()
-    # Filter by date if provided
-    if date:
-        try:
-            filter_date = datetime.strptime(date, "%Y-%m-%d")
-            start = filter_date.replace(hour=0, minute=0, second=0, microsecond=0)
-            end = start + timedelta(days=1)
-            query = query.where(
-                (PassVisit.entry_time >= start) &
-                (PassVisit.entry_time < end)
-            )
-        except ValueError:
-            pass
-    
-    result = await db.execute(query.order_by(PassVisit.entry_time.desc()))
-    visits = result.scalars().all()
-    
-    # Format response with guest and pass information
-    response = []
-    for visit in visits:
-        pass_obj = await db.get(Pass, visit.pass_id)
-        
-        response.append({
-            "id": visit.id,
-            "entry_time": visit.entry_time,
-            "exit_time": visit.exit_time,
-            "guest_name": pass_obj.guest_name if pass_obj else "Unknown",
-            "guest_company": pass_obj.guest_company if pass_obj else "Unknown",
-            "pass_uuid": pass_obj.uuid if pass_obj else "Unknown",
-        })
-    
-    return response
+    """
+    Get visits with guest and pass information, newest first. date is a
+    single UTC day, date_from/date_to an inclusive range (YYYY-MM-DD;
+    malformed dates are ignored), gate_id matches the entry or exit gate.
+    Pass cursor (empty for the first page) to get {items, next_cursor};
+    without it the legacy skip/limit list is returned.
+    """
+    # Lenient like the original log: out-of-range limits are clamped
+    limit = max(1, min(limit, LOG_MAX_LIMIT))
+    day, date_from, date_to = _parse_day(day), _parse_day(date_from), _parse_day(date_to)
+
+    # One query: visit and pass columns only, no ORM objects
+    query = select(
+        PassVisit.id,
+        PassVisit.entry_time,
+        PassVisit.exit_time,
+        PassVisit.entry_gate_id,
+        PassVisit.exit_gate_id,
+        Pass.guest_name,
+        Pass.guest_company,
+        Pass.uuid.label("pass_uuid"),
+    ).join(Pass, PassVisit.pass_id == Pass.id)
+
+    if day is not None:
+        date_from = date_to = day
+    if date_from is not None:
+        query = query.where(PassVisit.entry_time >= _utc_midnight(date_from))
+    if date_to is not None:
+        query = query.where(PassVisit.entry_time < _utc_midnight(date_to) + timedelta(days=1))
+    if company:
+        query = query.where(Pass.guest_company == company)
+    if pass_uuid:
+        query = query.where(Pass.uuid == pass_uuid)
+    if gate_id:
+        query = query.where(or_(PassVisit.entry_gate_id == gate_id, PassVisit.exit_gate_id == gate_id))
+    if open_only:
+        query = query.where(PassVisit.exit_time == None)
+
+    if cursor is None:
+        result = await db.execute(
+            query.order_by(PassVisit.entry_time.desc(), PassVisit.id.desc()).offset(skip).limit(limit)
+        )
+        return [dict(row._mapping) for row in result]
+
+    try:
+        query = apply_keyset(query, LOG_KEY, cursor, limit)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+    result = await db.execute(query)
+    rows, next_cursor = split_page(result.all(), limit, lambda row: (row.entry_time, row.id))
+    return {"items": [dict(row._mapping) for row in rows], "next_cursor": next_cursor}
+
+
+def _parse_day(value: Optional[str]) -> Optional[date]:
+    try:
+        return date.fromisoformat(value) if value else None
+    except ValueError:
+        return None
+
+
+def _utc_midnight(day: date) -> datetime:
+    return datetime.combine(day, datetime.min.time(), tzinfo=timezone.utc)
+
+
+@router.get("/occupancy")
+async def get_occupancy(current_user: User = Depends(get_current_user)):
+    """Number of people on site right now, total and per entry gate"""
+    try:
+        return await occupancy.get_counts()
+    except RedisError:
+        raise HTTPException(status_code=503, detail="Occupancy data unavailable")
+
+
+@router.get("/occupancy/roster")
+async def get_occupancy_roster(current_user: User = Depends(get_current_user)):
+    """Guests currently on site"""
+    try:
+        return await occupancy.get_roster()
+    except RedisError:
+        raise HTTPException(status_code=503, detail="Occupancy data unavailable")
@@ -1,4 +1,5 @@
-from .pass_schema import PassCreate, PassUpdate, PassResponse, VisitResponse, SendEmailRequest
+from .pass_schema import PassCreate, PassUpdate, PassResponse, PassPage, VisitResponse, SendEmailRequest
 from .user_schema import UserCreate, UserUpdate, UserResponse, TokenResponse, LoginRequest
+from .report_schema import ReportRequest
 
-__all__ = ["PassCreate", "PassUpdate", "PassResponse", "VisitResponse", "UserCreate", "UserUpdate", "UserResponse", "TokenResponse", "LoginRequest", "SendEmailRequest"]
\ No newline at end of file
+__all__ = ["PassCreate", "PassUpdate", "PassResponse", "PassPage", "VisitResponse", "UserCreate", "UserUpdate", "UserResponse", "TokenResponse", "LoginRequest", "SendEmailRequest", "ReportRequest"]
\ No newline at end of file
@@ -1,17 +1,27 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field, field_validator
 from datetime import datetime
-from typing import Optional
+from typing import Optional, List
 from app.models.pass_model import PassStatus
+from app.utils.qr_tokens import fits_qr_token
+
+def _check_validity_bound(value: Optional[datetime]) -> Optional[datetime]:
+    # Validity bounds are signed into QR tokens as 32-bit epoch seconds
+    if value is not None and not fits_qr_token(value):
+        raise ValueError("must be between 1970 and 2106")
+    return value
 
 class PassCreate(BaseModel):
-    guest_name: str
-    guest_company: Optional[str] = None
-    guest_phone: Optional[str] = None
-    guest_email: Optional[str] = None
+    # Lengths of the Pass columns
+    guest_name: str = Field(..., max_length=255)
+    guest_company: Optional[str] = Field(None, max_length=255)
+    guest_phone: Optional[str] = Field(None, max_length=20)
+    guest_email: Optional[str] = Field(None, max_length=255)
     valid_from: datetime
     valid_until: datetime
     notes: Optional[str] = None
 
+    _check_validity = field_validator("valid_from", "valid_until")(_check_validity_bound)
+
 class PassUpdate(BaseModel):
     guest_name: Optional[str] = None
     guest_company: Optional[str] = None
@@ -20,6 +30,8 @@ class PassUpdate(BaseModel):
     valid_until: Optional[datetime] = None
     is_active: Optional[bool] = None
 
+    _check_validity = field_validator("valid_until")(_check_validity_bound)
+
 class PassResponse(BaseModel):
     id: int
     uuid: str
@@ -39,6 +51,10 @@ class PassResponse(BaseModel):
     class Config:
         from_attributes = True
 
+class PassPage(BaseModel):
+    items: List[PassResponse]
+    next_cursor: Optional[str] = None
+
 class VisitResponse(BaseModel):
     id: int
     pass_id: int
@@ -50,7 +66,16 @@ class VisitResponse(BaseModel):
         from_attributes = True
 
 class VerifyPassRequest(BaseModel):
-    qr_code: str
+    qr_code: str = Field(..., max_length=500)
+    gate_id: Optional[str] = Field(None, max_length=64)
+
+class ScanEvent(BaseModel):
+    qr_code: str = Field(..., max_length=500)
+    scanned_at: datetime
+    gate_id: Optional[str] = Field(None, max_length=64)
+
+class VerifyBatchRequest(BaseModel):
+    events: List[ScanEvent] = Field(..., min_length=1, max_length=1000)
 
 class SendEmailRequest(BaseModel):
     message: str
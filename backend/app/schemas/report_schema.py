@@ -0,0 +1,17 @@
+from pydantic import BaseModel, model_validator
+from datetime import date
+from typing import Literal, Optional
+
+class ReportRequest(BaseModel):
+    # visits: one row per visit; company_dwell: visits and dwell times per company
+    report: Literal["visits", "company_dwell"]
+    date_from: date
+    date_to: date
+    company: Optional[str] = None
+    format: Literal["csv", "xlsx"] = "csv"
+
+    @model_validator(mode="after")
+    def check_range(self):
+        if self.date_to < self.date_from:
+            raise ValueError("date_to must not be before date_from")
+        return self
@@ -0,0 +1,167 @@
+import asyncio
+import time
+from bisect import bisect_left, insort
+from collections import Counter
+from typing import Iterable, List
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database import AsyncSessionLocal
+from app.models.pass_model import Pass
+from app.services.event_bus import event_bus
+
+FIELDS = ("guest_name", "guest_company")
+NAMES_CHANNEL = "pass-names"
+
+# Full reload from the database now and then, in case a change event was missed
+REBUILD_SECONDS = 600
+
+
+def _keys(value: str) -> List[str]:
+    """Search keys of a value: the casefolded text from each word start on"""
+    words = value.casefold().split()
+    return [" ".join(words[index:]) for index in range(len(words))]
+
+
+class PrefixIndex:
+    """
+    Sorted array of search keys with a multiset of display values per key.
+    A lookup is a binary search plus a walk over the matching keys.
+    """
+
+    def __init__(self):
+        self._keys = []          # sorted, unique
+        self._values = {}        # key -> Counter of display value -> number of passes
+
+    def __len__(self):
+        return len(self._keys)
+
+    def add_many(self, values: Iterable[str]):
+        new_keys = set()
+        for value in values:
+            if not value or not value.strip():
+                continue
+            value = value.strip()
+            for key in _keys(value):
+                counter = self._values.get(key)
+                if counter is None:
+                    counter = self._values[key] = Counter()
+                    new_keys.add(key)
+                counter[value] += 1
+
+        if len(new_keys) > 64:
+            # Bulk changes re-sort once instead of shifting the array per key
+            self._keys = sorted(self._keys + list(new_keys))
+        else:
+            for key in new_keys:
+                insort(self._keys, key)
+
+    def remove_many(self, values: Iterable[str]):
+        for value in values:
+            if not value or not value.strip():
+                continue
+            value = value.strip()
+            for key in _keys(value):
+                counter = self._values.get(key)
+                if counter is None:
+                    continue
+                counter[value] -= 1
+                if counter[value] <= 0:
+                    del counter[value]
+                if not counter:
+                    del self._values[key]
+                    index = bisect_left(self._keys, key)
+                    if index < len(self._keys) and self._keys[index] == key:
+                        del self._keys[index]
+
+    def complete(self, prefix: str, limit: int) -> List[str]:
+        """Up to limit distinct values with a word starting with prefix, in key order"""
+        prefix = " ".join(prefix.casefold().split())
+        if not prefix:
+            return []
+
+        results = []
+        seen = set()
+        index = bisect_left(self._keys, prefix)
+        while index < len(self._keys) and self._keys[index].startswith(prefix):
+            # Values sharing a key: most used first, then alphabetically
+            counter = self._values[self._keys[index]]
+            for value in sorted(counter, key=lambda value: (-counter[value], value)):
+                if value not in seen:
+                    seen.add(value)
+                    results.append(value)
+                    if len(results) == limit:
+                        return results
+            index += 1
+        return results
+
+
+class Autocomplete:
+    """Type-ahead over guest names and companies, kept in memory by every worker"""
+
+    def __init__(self):
+        self._indexes = {field: PrefixIndex() for field in FIELDS}
+        self._loaded_at = None
+        self._lock = asyncio.Lock()
+        self._reload = None
+        self._subscribed = False
+
+    async def load(self, db: AsyncSession):
+        """Build fresh indexes from the passes table and swap them in"""
+        indexes = {field: PrefixIndex() for field in FIELDS}
+        result = await db.stream(select(Pass.guest_name, Pass.guest_company))
+        async for rows in result.partitions(5000):
+            indexes["guest_name"].add_many(row.guest_name for row in rows)
+            indexes["guest_company"].add_many(row.guest_company for row in rows)
+
+        self._indexes = indexes
+        self._loaded_at = time.monotonic()
+        print(f"[AUTOCOMPLETE] Loaded {len(indexes['guest_name'])} name and {len(indexes['guest_company'])} company keys")
+
+    async def complete(self, db: AsyncSession, field: str, prefix: str, limit: int = 10) -> List[str]:
+        if not self._subscribed:
+            event_bus.add_handler(NAMES_CHANNEL, self._apply)
+            self._subscribed = True
+
+        if self._loaded_at is None:
+            async with self._lock:
+                if self._loaded_at is None:
+                    await self.load(db)
+        elif time.monotonic() - self._loaded_at > REBUILD_SECONDS and (self._reload is None or self._reload.done()):
+            # Keep answering from the current index while the new one is built
+            self._reload = asyncio.create_task(self._reload_in_background())
+
+        return self._indexes[field].complete(prefix, limit)
+
+    async def _reload_in_background(self):
+        try:
+            async with AsyncSessionLocal() as db:
+                await self.load(db)
+        except Exception as e:
+            print(f"[AUTOCOMPLETE] Reload failed: {e}")
+
+    def _apply(self, event: dict):
+        if self._loaded_at is None:
+            return
+        for field in FIELDS:
+            self._indexes[field].remove_many(event.get("removed", {}).get(field, []))
+            self._indexes[field].add_many(event.get("added", {}).get(field, []))
+
+
+def _names(passes: Iterable) -> dict:
+    passes = [
+        pass_obj if isinstance(pass_obj, dict) else {field: getattr(pass_obj, field) for field in FIELDS}
+        for pass_obj in passes
+    ]
+    return {field: [pass_obj[field] for pass_obj in passes] for field in FIELDS}
+
+
+async def publish_name_changes(added: Iterable = (), removed: Iterable = ()):
+    """
+    Tell every worker's autocomplete about created, changed or deleted
+    passes (Pass objects or dicts with guest_name and guest_company)
+    """
+    await event_bus.publish(NAMES_CHANNEL, {"added": _names(added), "removed": _names(removed)})
+
+
+autocomplete = Autocomplete()
@@ -0,0 +1,104 @@
+import csv
+import io
+import json
+import zlib
+from datetime import datetime
+from enum import Enum
+from typing import AsyncIterator, Sequence
+from sqlalchemy import select
+
+from app.database import AsyncSessionLocal
+from app.models.pass_model import Pass, Visit
+
+# Rows fetched per round trip from the server-side cursor and encoded per chunk
+EXPORT_BATCH_ROWS = 1000
+
+PASS_COLUMNS = (
+    Pass.id, Pass.uuid, Pass.guest_name, Pass.guest_company, Pass.status,
+    Pass.valid_from, Pass.valid_until, Pass.is_active, Pass.notes, Pass.created_at,
+)
+# Only exported for roles with Permission.VIEW_SENSITIVE_DATA
+PASS_SENSITIVE_COLUMNS = (Pass.guest_email, Pass.guest_phone)
+
+VISIT_COLUMNS = (
+    Visit.id, Visit.pass_id, Pass.uuid.label("pass_uuid"), Pass.guest_name, Pass.guest_company,
+    Visit.entry_time, Visit.exit_time, Visit.entry_gate_id, Visit.exit_gate_id,
+)
+
+MEDIA_TYPES = {"csv": "text/csv", "ndjson": "application/x-ndjson"}
+
+
+def passes_query(sensitive: bool = False, status=None):
+    query = select(*PASS_COLUMNS, *(PASS_SENSITIVE_COLUMNS if sensitive else ())).order_by(Pass.id)
+    if status:
+        query = query.where(Pass.status == status)
+    return query
+
+
+def visits_query(start: datetime = None, end: datetime = None):
+    query = select(*VISIT_COLUMNS).join(Pass, Visit.pass_id == Pass.id).order_by(Visit.id)
+    if start:
+        query = query.where(Visit.entry_time >= start)
+    if end:
+        query = query.where(Visit.entry_time < end)
+    return query
+
+
+async def stream_rows(query) -> AsyncIterator[list]:
+    """
+    Batches of result rows read through a server-side cursor, so memory use
+    does not grow with the size of the export. Uses its own session because
+    the response outlives the request handler.
+    """
+    async with AsyncSessionLocal() as db:
+        result = await db.stream(query.execution_options(yield_per=EXPORT_BATCH_ROWS))
+        async for rows in result.partitions():
+            yield rows
+
+
+def _value(value):
+    if isinstance(value, Enum):
+        return value.value
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+async def csv_chunks(columns: Sequence[str], batches: AsyncIterator[list]) -> AsyncIterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    async for rows in batches:
+        writer.writerows(
+            ["" if value is None else _value(value) for value in row] for row in rows
+        )
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        # Header only: nothing matched
+        yield buffer.getvalue().encode()
+
+
+async def ndjson_chunks(columns: Sequence[str], batches: AsyncIterator[list]) -> AsyncIterator[bytes]:
+    async for rows in batches:
+        yield "".join(
+            json.dumps(dict(zip(columns, map(_value, row))), ensure_ascii=False) + "\n" for row in rows
+        ).encode()
+
+
+async def gzip_chunks(chunks: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)  # 31: gzip container
+    async for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+
+def export_stream(query, fmt: str, gzip: bool = False) -> AsyncIterator[bytes]:
+    """Encoded (and optionally gzipped) bytes of every row of query"""
+    columns = [column.name for column in query.selected_columns]
+    encoder = ndjson_chunks if fmt == "ndjson" else csv_chunks
+    chunks = encoder(columns, stream_rows(query))
+    return gzip_chunks(chunks) if gzip else chunks
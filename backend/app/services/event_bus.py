@@ -0,0 +1,140 @@
+import asyncio
+import json
+from typing import Awaitable, Callable, Iterable
+from redis.exceptions import RedisError
+
+from app.services.redis_client import create_redis, get_redis, redis_down, mark_redis_down, REDIS_RETRY_SECONDS
+
+CHANNEL_PREFIX = "events:"
+
+# A subscriber that falls this far behind is told to resync instead of
+# holding up delivery to everyone else
+SUBSCRIBER_QUEUE_SIZE = 256
+RESYNC_EVENT = {"type": "resync"}
+
+
+class EventBus:
+    """
+    Fan-out of JSON events to every API worker through Redis pub/sub.
+    Each process keeps one subscription and hands events to its local
+    subscriber queues and handlers. When Redis is unavailable events are
+    delivered inside the publishing process only.
+    """
+
+    def __init__(self):
+        self._queues = {}      # channel -> set of asyncio.Queue
+        self._handlers = {}    # channel -> list of callables
+        self._resync_handlers = []
+        self._listener = None
+
+    def subscribe(self, channel: str) -> asyncio.Queue:
+        queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        self._queues.setdefault(channel, set()).add(queue)
+        self._ensure_listener()
+        return queue
+
+    def unsubscribe(self, channel: str, queue: asyncio.Queue):
+        self._queues.get(channel, set()).discard(queue)
+
+    def add_handler(self, channel: str, handler: Callable[[dict], None]):
+        """Call handler(event) in this process for every event on the channel"""
+        self._handlers.setdefault(channel, []).append(handler)
+        self._ensure_listener()
+
+    def add_resync_handler(self, handler: Callable[[], Awaitable[None]]):
+        """
+        Await handler() whenever the subscription of this process is
+        (re-)established: events published while it was down are lost, so
+        state kept up to date by events has to be reloaded.
+        """
+        self._resync_handlers.append(handler)
+        self._ensure_listener()
+
+    async def publish_many(self, channel: str, events: Iterable[dict]):
+        events = list(events)
+        if not events:
+            return
+
+        if not redis_down():
+            try:
+                async with get_redis().pipeline(transaction=False) as pipe:
+                    for event in events:
+                        self.publish_in(pipe, channel, event)
+                    await pipe.execute()
+                return
+            except RedisError as e:
+                mark_redis_down(e)
+
+        for event in events:
+            self._deliver(channel, event)
+
+    async def publish(self, channel: str, event: dict):
+        await self.publish_many(channel, [event])
+
+    @staticmethod
+    def publish_in(pipe, channel: str, event: dict):
+        """
+        Queue an event on a Redis pipeline, for events that must go out
+        together with the pipeline's writes or not at all. There is no
+        local-only fallback.
+        """
+        pipe.publish(CHANNEL_PREFIX + channel, json.dumps(event, default=str))
+
+    def _deliver(self, channel: str, event: dict):
+        for handler in self._handlers.get(channel, []):
+            try:
+                handler(event)
+            except Exception as e:
+                print(f"[EVENTS] Handler failed on {channel}: {e}")
+
+        for queue in self._queues.get(channel, ()):
+            self._offer(queue, event)
+
+    @staticmethod
+    def _offer(queue: asyncio.Queue, event: dict):
+        try:
+            queue.put_nowait(event)
+        except asyncio.QueueFull:
+            while not queue.empty():
+                queue.get_nowait()
+            queue.put_nowait(RESYNC_EVENT)
+
+    def _ensure_listener(self):
+        if self._listener is None or self._listener.done():
+            self._listener = asyncio.get_running_loop().create_task(self._listen())
+
+    async def _listen(self):
+        while True:
+            # Dedicated connection without a read timeout: it blocks on the channel
+            redis = create_redis(socket_timeout=None)
+            try:
+                async with redis.pubsub(ignore_subscribe_messages=True) as pubsub:
+                    await pubsub.psubscribe(CHANNEL_PREFIX + "*")
+                    await self._resync()
+                    async for message in pubsub.listen():
+                        channel = message["channel"][len(CHANNEL_PREFIX):]
+                        self._deliver(channel, json.loads(message["data"]))
+            except RedisError as e:
+                print(f"[EVENTS] Subscription lost, retrying in {REDIS_RETRY_SECONDS:.0f}s: {e}")
+                # Whatever was published meanwhile is gone; let subscribers reload
+                for queues in self._queues.values():
+                    for queue in queues:
+                        self._offer(queue, RESYNC_EVENT)
+            finally:
+                await redis.aclose()
+            await asyncio.sleep(REDIS_RETRY_SECONDS)
+
+    async def _resync(self):
+        for handler in self._resync_handlers:
+            try:
+                await handler()
+            except Exception as e:
+                print(f"[EVENTS] Resync handler failed: {e}")
+
+    async def stop(self):
+        if self._listener is not None:
+            self._listener.cancel()
+            self._listener = None
+
+
+event_bus = EventBus()
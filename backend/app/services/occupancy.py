@@ -0,0 +1,158 @@
+import json
+from datetime import datetime
+from typing import Iterable, Optional
+from redis.exceptions import RedisError
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.pass_model import Pass, Visit
+from app.services.pass_cache import as_utc
+from app.services.redis_client import get_redis, redis_down, mark_redis_down
+
+ROSTER_KEY = "occupancy:roster"        # pass_id -> JSON of the open visit
+COUNTERS_KEY = "occupancy:counters"    # total, gate:<gate_id> -> people on site
+
+# Entry/exit are Lua scripts so the roster and the counters never diverge,
+# and a repeated entry or exit of the same pass is a no-op
+ENTER_SCRIPT = """
+if redis.call('HSETNX', KEYS[1], ARGV[1], ARGV[2]) == 0 then
+    return 0
+end
+redis.call('HINCRBY', KEYS[2], 'total', 1)
+redis.call('HINCRBY', KEYS[2], 'gate:' .. ARGV[3], 1)
+return 1
+"""
+
+EXIT_SCRIPT = """
+local entry = redis.call('HGET', KEYS[1], ARGV[1])
+if not entry then
+    return 0
+end
+redis.call('HDEL', KEYS[1], ARGV[1])
+redis.call('HINCRBY', KEYS[2], 'total', -1)
+redis.call('HINCRBY', KEYS[2], 'gate:' .. cjson.decode(entry)['gate_id'], -1)
+return 1
+"""
+
+
+def gate_key(gate_id: Optional[str]) -> str:
+    return gate_id or "unknown"
+
+
+def roster_entry(pass_id: int, guest_name, guest_company, entry_time: datetime, gate_id) -> str:
+    return json.dumps({
+        "pass_id": pass_id,
+        "guest_name": guest_name,
+        "guest_company": guest_company,
+        "entry_time": as_utc(entry_time).isoformat(),
+        "gate_id": gate_key(gate_id),
+    }, ensure_ascii=False)
+
+
+class OccupancyTracker:
+    """Live on-site roster and per-gate counters kept in Redis"""
+
+    def __init__(self):
+        self._enter = None
+        self._exit = None
+
+    def _scripts(self, redis):
+        if self._enter is None:
+            self._enter = redis.register_script(ENTER_SCRIPT)
+            self._exit = redis.register_script(EXIT_SCRIPT)
+        return self._enter, self._exit
+
+    async def apply_scans(self, scans: Iterable[tuple]):
+        """
+        Apply (scan_response, scanned_at, gate_id) tuples in order.
+        Failures are logged only: the scan itself is already committed and the
+        reconciliation job repairs any drift.
+        """
+        if redis_down():
+            return
+
+        redis = get_redis()
+        enter, leave = self._scripts(redis)
+        try:
+            async with redis.pipeline(transaction=False) as pipe:
+                for response, scanned_at, gate_id in scans:
+                    pass_id = response.get("pass_id")
+                    if response["status"] == "ALLOWED":
+                        await enter(
+                            keys=[ROSTER_KEY, COUNTERS_KEY],
+                            args=[
+                                pass_id,
+                                roster_entry(pass_id, response["guest_name"], response["guest_company"], scanned_at, gate_id),
+                                gate_key(gate_id),
+                            ],
+                            client=pipe,
+                        )
+                    elif response["status"] == "EXIT":
+                        await leave(keys=[ROSTER_KEY, COUNTERS_KEY], args=[pass_id], client=pipe)
+                await pipe.execute()
+        except RedisError as e:
+            mark_redis_down(e)
+
+    async def apply_scan(self, response: dict, scanned_at: datetime, gate_id: Optional[str] = None):
+        await self.apply_scans([(response, scanned_at, gate_id)])
+
+    async def get_counts(self) -> dict:
+        counters = await get_redis().hgetall(COUNTERS_KEY)
+        return {
+            "total": int(counters.pop("total", 0)),
+            "gates": {
+                name[len("gate:"):]: int(value)
+                for name, value in counters.items()
+                if int(value) > 0
+            },
+        }
+
+    async def get_roster(self) -> list:
+        roster = await get_redis().hgetall(ROSTER_KEY)
+        entries = [json.loads(value) for value in roster.values()]
+        return sorted(entries, key=lambda entry: entry["entry_time"])
+
+    @staticmethod
+    async def rebuild(db: AsyncSession, redis) -> int:
+        """
+        Rebuild roster and counters from open visits, swapping them in
+        atomically. Scans landing between the query and the swap are only
+        picked up by the next rebuild.
+        """
+        result = await db.execute(
+            select(
+                Visit.pass_id, Visit.entry_time, Visit.entry_gate_id,
+                Pass.guest_name, Pass.guest_company
+            )
+            .join(Pass, Pass.id == Visit.pass_id)
+            .where(Visit.exit_time == None)
+        )
+
+        roster = {}
+        counters = {"total": 0}
+        for row in result:
+            roster[row.pass_id] = roster_entry(
+                row.pass_id, row.guest_name, row.guest_company, row.entry_time, row.entry_gate_id
+            )
+            gate = f"gate:{gate_key(row.entry_gate_id)}"
+            counters["total"] += 1
+            counters[gate] = counters.get(gate, 0) + 1
+
+        roster_tmp, counters_tmp = f"{ROSTER_KEY}:rebuild", f"{COUNTERS_KEY}:rebuild"
+        async with redis.pipeline(transaction=True) as pipe:
+            pipe.delete(roster_tmp, counters_tmp)
+            items = list(roster.items())
+            for start in range(0, len(items), 1000):
+                pipe.hset(roster_tmp, mapping=dict(items[start:start + 1000]))
+            pipe.hset(counters_tmp, mapping=counters)
+            if roster:
+                pipe.rename(roster_tmp, ROSTER_KEY)
+            else:
+                pipe.delete(ROSTER_KEY)
+            pipe.rename(counters_tmp, COUNTERS_KEY)
+            await pipe.execute()
+
+        return len(roster)
+
+
+occupancy = OccupancyTracker()
@@ -0,0 +1,175 @@
+import hashlib
+import json
+from datetime import datetime, timedelta, timezone
+from typing import AsyncIterator, Optional
+from sqlalchemy import select, delete, func
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database import AsyncSessionLocal
+from app.models.pass_change import PassChange
+from app.models.pass_model import Pass
+from app.services.pass_cache import as_utc
+
+SNAPSHOT_CHUNK_ROWS = 2000
+GAP_SETTLE_SECONDS = 5
+
+
+def qr_hash(qr_code: str) -> str:
+    """Hash under which guard devices look up a scanned code"""
+    return hashlib.sha256(qr_code.encode()).hexdigest()
+
+
+def _epoch(value: Optional[datetime]) -> Optional[int]:
+    return int(as_utc(value).timestamp()) if value else None
+
+
+def record_pass_change(db: AsyncSession, pass_obj: Pass, qr_code: Optional[str] = None):
+    """
+    Append the current state of a pass to the change log.
+    Inactive passes are published as deletions. The caller commits.
+    """
+    db.add(PassChange(
+        pass_id=pass_obj.id,
+        qr_hash=qr_hash(qr_code or pass_obj.qr_code),
+        op="upsert" if pass_obj.is_active else "delete",
+        guest_name=pass_obj.guest_name,
+        valid_from=pass_obj.valid_from,
+        valid_until=pass_obj.valid_until,
+    ))
+
+
+def record_pass_removal(db: AsyncSession, pass_id: int, qr_code: str):
+    """Publish that a code must no longer be accepted offline. The caller commits."""
+    db.add(PassChange(pass_id=pass_id, qr_hash=qr_hash(qr_code), op="delete"))
+
+
+async def current_version(db: AsyncSession) -> int:
+    result = await db.execute(select(func.max(PassChange.id)))
+    return result.scalar() or 0
+
+
+async def purge_changes(db: AsyncSession, before: datetime, chunk_size: int = 1000) -> int:
+    """
+    Delete changes recorded before `before`, chunk_size rows per transaction.
+    The newest change is always kept so the feed version never goes back;
+    clients whose version was purged get `reset` from the delta feed.
+    """
+    newest = await current_version(db)
+    purged = 0
+    while True:
+        chunk = (
+            select(PassChange.id)
+            .where(PassChange.created_at < before, PassChange.id < newest)
+            .order_by(PassChange.id)
+            .limit(chunk_size)
+            .scalar_subquery()
+        )
+        result = await db.execute(
+            delete(PassChange)
+            .where(PassChange.id.in_(chunk))
+            .execution_options(synchronize_session=False)
+        )
+        await db.commit()
+
+        purged += result.rowcount
+        if result.rowcount < chunk_size:
+            return purged
+
+
+class OfflineFeed:
+    """Snapshot and delta feed of valid passes for offline guard devices"""
+
+    def __init__(self):
+        # Last fully generated snapshot, reused while the version is unchanged
+        self._version = None
+        self._chunks = []
+
+    async def stream_snapshot(self, version: int) -> AsyncIterator[bytes]:
+        """
+        Stream NDJSON: a header line, then one [qr_hash, valid_from, valid_until,
+        guest_name] array per pass. The data is at least as new as `version`,
+        so clients continue with the delta feed from that version.
+        """
+        if self._version == version:
+            for chunk in self._chunks:
+                yield chunk
+            return
+
+        chunks = []
+        header = json.dumps({
+            "version": version,
+            "generated_at": datetime.now(timezone.utc).isoformat(),
+            "hash": "sha256",
+        }) + "\n"
+        chunks.append(header.encode())
+        yield chunks[-1]
+
+        now = datetime.now(timezone.utc)
+        async with AsyncSessionLocal() as session:
+            result = await session.stream(
+                select(Pass.qr_code, Pass.valid_from, Pass.valid_until, Pass.guest_name)
+                .where(Pass.is_active == True, Pass.valid_until >= now)
+                .execution_options(yield_per=SNAPSHOT_CHUNK_ROWS)
+            )
+            async for rows in result.partitions():
+                chunk = "".join(
+                    json.dumps(
+                        [qr_hash(row.qr_code), _epoch(row.valid_from), _epoch(row.valid_until), row.guest_name],
+                        ensure_ascii=False,
+                        separators=(",", ":"),
+                    ) + "\n"
+                    for row in rows
+                ).encode()
+                chunks.append(chunk)
+                yield chunk
+
+        self._version = version
+        self._chunks = chunks
+
+    async def get_delta(self, db: AsyncSession, since: int, limit: int = 1000) -> dict:
+        """Changes after `since`; `reset` tells the client to reload the snapshot"""
+        if since > 0:
+            oldest = (await db.execute(select(func.min(PassChange.id)))).scalar()
+            if oldest is not None and since < oldest - 1:
+                return {"reset": True, "version": since, "changes": [], "has_more": False}
+
+        result = await db.execute(
+            select(PassChange)
+            .where(PassChange.id > since)
+            .order_by(PassChange.id)
+            .limit(limit + 1)
+        )
+        fetched = result.scalars().all()
+        has_more = len(fetched) > limit
+
+        # Versions come from a sequence, so a lower id may commit after a higher
+        # one. Stop before a recent gap rather than let the client skip it.
+        settle_cutoff = datetime.now(timezone.utc) - timedelta(seconds=GAP_SETTLE_SECONDS)
+        changes = []
+        expected = since + 1
+        for change in fetched[:limit]:
+            if change.id != expected and as_utc(change.created_at) > settle_cutoff:
+                has_more = True
+                break
+            changes.append(change)
+            expected = change.id + 1
+
+        return {
+            "reset": False,
+            "version": changes[-1].id if changes else since,
+            "has_more": has_more,
+            "changes": [
+                {
+                    "version": change.id,
+                    "op": change.op,
+                    "qr_hash": change.qr_hash,
+                    "valid_from": _epoch(change.valid_from),
+                    "valid_until": _epoch(change.valid_until),
+                    "guest_name": change.guest_name,
+                }
+                for change in changes
+            ],
+        }
+
+
+offline_feed = OfflineFeed()
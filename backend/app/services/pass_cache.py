@@ -0,0 +1,137 @@
+from datetime import datetime, timezone
+from typing import Iterable, Optional
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.models.pass_model import Pass
+from app.services.event_bus import event_bus
+from app.utils.cache import TTLCache
+
+PASSES_CHANNEL = "passes"
+
+# Columns needed to take a scan decision; kept small so the cache stays cheap
+SNAPSHOT_COLUMNS = (
+    Pass.id,
+    Pass.qr_code,
+    Pass.guest_name,
+    Pass.guest_company,
+    Pass.guest_photo_url,
+    Pass.valid_from,
+    Pass.valid_until,
+    Pass.is_active,
+)
+
+
+def as_utc(value: datetime) -> datetime:
+    """Treat naive datetimes (e.g. from SQLite) as UTC"""
+    if value is not None and value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value
+
+
+def snapshot_from_row(row) -> dict:
+    """Convert a projected pass row into a cacheable dict"""
+    return {
+        "id": row.id,
+        "qr_code": row.qr_code,
+        "guest_name": row.guest_name,
+        "guest_company": row.guest_company,
+        "guest_photo_url": row.guest_photo_url,
+        "valid_from": as_utc(row.valid_from),
+        "valid_until": as_utc(row.valid_until),
+        "is_active": row.is_active,
+    }
+
+
+class PassCache:
+    """
+    Read-through cache of pass validity data keyed by qr_code. Changes to a
+    pass are broadcast to every worker through the event bus; the TTL bounds
+    staleness if a broadcast is lost.
+    """
+
+    def __init__(self, max_size: int, ttl_seconds: float):
+        self._cache = TTLCache(max_size=max_size, ttl_seconds=ttl_seconds)
+        self._subscribed = False
+        # Bumped by every invalidation: a load that overlapped one may have read stale data
+        self._version = 0
+
+    def _subscribe(self):
+        if not self._subscribed:
+            event_bus.add_handler(PASSES_CHANNEL, self._apply)
+            self._subscribed = True
+
+    async def get(self, db: AsyncSession, qr_code: str) -> Optional[dict]:
+        """Return pass snapshot for qr_code, loading it from the DB on a miss"""
+        self._subscribe()
+        snapshot = self._cache.get(qr_code)
+        if snapshot is not None:
+            return snapshot
+
+        version = self._version
+        result = await db.execute(
+            select(*SNAPSHOT_COLUMNS).where(Pass.qr_code == qr_code)
+        )
+        row = result.one_or_none()
+        if row is None:
+            # Unknown codes are not cached: a pass created later must be found
+            return None
+
+        snapshot = snapshot_from_row(row)
+        if version == self._version:
+            self._cache.set(qr_code, snapshot)
+        return snapshot
+
+    async def get_many(self, db: AsyncSession, qr_codes: Iterable[str]) -> dict:
+        """Resolve many qr_codes at once; misses are loaded with a single query"""
+        self._subscribe()
+        found = {}
+        missing = []
+        for qr_code in set(qr_codes):
+            snapshot = self._cache.get(qr_code)
+            if snapshot is not None:
+                found[qr_code] = snapshot
+            else:
+                missing.append(qr_code)
+
+        if missing:
+            version = self._version
+            result = await db.execute(
+                select(*SNAPSHOT_COLUMNS).where(Pass.qr_code.in_(missing))
+            )
+            for row in result:
+                snapshot = snapshot_from_row(row)
+                if version == self._version:
+                    self._cache.set(row.qr_code, snapshot)
+                found[row.qr_code] = snapshot
+
+        return found
+
+    def invalidate(self, qr_code: Optional[str]):
+        """Drop cached data of this process only"""
+        if qr_code:
+            self._version += 1
+            self._cache.invalidate(qr_code)
+
+    async def publish_change(self, qr_code: Optional[str]):
+        """Drop a modified or deleted pass here and in every other worker"""
+        if qr_code:
+            event = {"qr_code": qr_code}
+            self._apply(event)
+            await event_bus.publish(PASSES_CHANNEL, event)
+
+    def _apply(self, event: dict):
+        self.invalidate(event.get("qr_code"))
+
+    def clear(self):
+        self._cache.clear()
+
+    def stats(self) -> dict:
+        return self._cache.stats()
+
+
+pass_cache = PassCache(
+    max_size=settings.pass_cache_max_size,
+    ttl_seconds=settings.pass_cache_ttl_seconds,
+)
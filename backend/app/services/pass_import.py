@@ -0,0 +1,234 @@
+import codecs
+import csv
+import json
+import uuid
+from datetime import datetime, timezone
+from types import SimpleNamespace
+from typing import AsyncIterator, Callable, List, Optional
+from pydantic import ValidationError
+from sqlalchemy import insert, update, bindparam
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.models.pass_change import PassChange
+from app.models.pass_model import Pass
+from app.schemas.pass_schema import PassCreate
+from app.services.autocomplete import publish_name_changes
+from app.services.offline_feed import qr_hash
+from app.services.pass_status import status_for
+from app.services.statistics import stats_rollup
+from app.utils.qr_tokens import issue_qr_token
+
+IMPORT_CHUNK_ROWS = 1000
+MAX_REPORTED_ERRORS = 1000
+
+
+async def iter_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[str]:
+    """Decode a byte stream into lines without holding more than one chunk"""
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    pending = ""
+    async for chunk in chunks:
+        pending += decoder.decode(chunk)
+        *lines, pending = pending.split("\n")
+        for line in lines:
+            yield line.rstrip("\r")
+    pending += decoder.decode(b"", final=True)
+    if pending:
+        yield pending.rstrip("\r")
+
+
+async def iter_csv_rows(lines: AsyncIterator[str]) -> AsyncIterator[tuple]:
+    """
+    Yield (line_number, row dict) from CSV lines with a header row.
+    A record continues over line breaks while it has an open quoted field.
+    """
+    header = None
+    record, first_line, line_number = "", 0, 0
+    async for line in lines:
+        line_number += 1
+        if not record:
+            first_line = line_number
+        record = f"{record}\n{line}" if record else line
+        if record.count('"') % 2:
+            continue
+
+        values = next(csv.reader([record]), [])
+        record = ""
+        if not any(value.strip() for value in values):
+            continue
+        if header is None:
+            header = [name.strip() for name in values]
+            continue
+        yield first_line, dict(zip(header, values))
+
+    if record:
+        yield first_line, ValueError("Unterminated quoted field")
+
+
+async def iter_ndjson_rows(lines: AsyncIterator[str]) -> AsyncIterator[tuple]:
+    """Yield (line_number, row dict or the parse error) from NDJSON lines"""
+    line_number = 0
+    async for line in lines:
+        line_number += 1
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError as e:
+            yield line_number, e
+            continue
+        yield line_number, row if isinstance(row, dict) else ValueError("Expected a JSON object")
+
+
+def _error_message(error: Exception) -> str:
+    if isinstance(error, ValidationError):
+        return "; ".join(
+            f"{'.'.join(str(part) for part in item['loc'])}: {item['msg']}"
+            for item in error.errors()
+        )
+    return str(error)
+
+
+def _pass_values(data: PassCreate, now: datetime) -> dict:
+    values = {
+        "uuid": str(uuid.uuid4()),
+        "qr_code": str(uuid.uuid4()),
+        "guest_name": data.guest_name,
+        "guest_company": data.guest_company,
+        "guest_email": data.guest_email,
+        "guest_phone": data.guest_phone,
+        "valid_from": data.valid_from,
+        "valid_until": data.valid_until,
+        "notes": data.notes,
+        "is_active": True,
+        "created_at": now,
+    }
+    values["status"] = status_for(SimpleNamespace(**values), now)
+    return values
+
+
+class PassImporter:
+    """Bulk pass creation from a streamed upload, one transaction per chunk"""
+
+    def __init__(
+        self,
+        db: AsyncSession,
+        chunk_size: int = IMPORT_CHUNK_ROWS,
+        on_created: Optional[Callable[[List[int]], None]] = None,
+    ):
+        self.db = db
+        self.chunk_size = chunk_size
+        self.on_created = on_created  # called with the ids of each committed chunk
+        self.imported = 0
+        self.failed = 0
+        self.errors = []
+
+    def _fail(self, line: int, message: str):
+        self.failed += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({"line": line, "error": message})
+
+    async def _insert(self, chunk: list) -> List[int]:
+        """Multi-row INSERT of validated rows plus their offline feed entries; returns the new ids"""
+        result = await self.db.execute(
+            insert(Pass).returning(
+                Pass.id, Pass.qr_code, Pass.is_active, Pass.guest_name, Pass.valid_from, Pass.valid_until
+            ),
+            [values for _, values in chunk],
+        )
+        created = result.all()
+
+        qr_codes = {row.id: row.qr_code for row in created}
+        if settings.signed_qr_codes:
+            # Signed codes embed the pass id, so they are issued after the INSERT
+            qr_codes = {
+                row.id: issue_qr_token(row.id, row.valid_from, row.valid_until) for row in created
+            }
+            passes = Pass.__table__
+            await self.db.execute(
+                update(passes).where(passes.c.id == bindparam("pass_id")).values(qr_code=bindparam("code")),
+                [{"pass_id": pass_id, "code": code} for pass_id, code in qr_codes.items()],
+            )
+
+        await self.db.execute(insert(PassChange), [
+            {
+                "pass_id": row.id,
+                "qr_hash": qr_hash(qr_codes[row.id]),
+                "op": "upsert" if row.is_active else "delete",
+                "guest_name": row.guest_name,
+                "valid_from": row.valid_from,
+                "valid_until": row.valid_until,
+            }
+            for row in created
+        ])
+        return [row.id for row in created]
+
+    async def _flush(self, chunk: list):
+        if not chunk:
+            return
+        try:
+            ids = await self._insert(chunk)
+            await self.db.commit()
+            self.imported += len(chunk)
+            await publish_name_changes(added=[values for _, values in chunk])
+        except DBAPIError as e:
+            if e.connection_invalidated:
+                raise
+            # Find the offending rows (constraint violations, values the
+            # columns cannot hold) without giving up the rest of the chunk
+            await self.db.rollback()
+            inserted, ids = [], []
+            for line, values in chunk:
+                try:
+                    async with self.db.begin_nested():
+                        ids += await self._insert([(line, values)])
+                    inserted.append(values)
+                except DBAPIError as e:
+                    if e.connection_invalidated:
+                        raise
+                    self._fail(line, f"Rejected by the database: {e.orig}")
+            await self.db.commit()
+            self.imported += len(inserted)
+            await publish_name_changes(added=inserted)
+        if ids:
+            stats_rollup.add("passes_created", datetime.now(timezone.utc), len(ids))
+        if self.on_created and ids:
+            self.on_created(ids)
+
+    async def run(self, rows: AsyncIterator[tuple]) -> dict:
+        """Validate and insert (line_number, row dict or error) pairs"""
+        chunk = []
+        async for line, row in rows:
+            if isinstance(row, Exception):
+                self._fail(line, _error_message(row))
+                continue
+            try:
+                data = PassCreate.model_validate({
+                    key: value if value != "" else None for key, value in row.items() if key
+                })
+            except ValidationError as e:
+                self._fail(line, _error_message(e))
+                continue
+
+            chunk.append((line, _pass_values(data, datetime.now(timezone.utc))))
+            if len(chunk) >= self.chunk_size:
+                await self._flush(chunk)
+                chunk = []
+
+        await self._flush(chunk)
+
+        print(f"[IMPORT] Passes imported: {self.imported}, rejected: {self.failed}")
+        return {
+            "imported": self.imported,
+            "failed": self.failed,
+            "errors": self.errors,
+            "errors_truncated": self.failed > len(self.errors),
+        }
+
+
+def rows_for(content_type: Optional[str], fmt: Optional[str], chunks: AsyncIterator[bytes]) -> AsyncIterator[tuple]:
+    """Pick the row parser from an explicit format or the upload content type"""
+    fmt = fmt or ("ndjson" if content_type and "json" in content_type else "csv")
+    parser = iter_ndjson_rows if fmt == "ndjson" else iter_csv_rows
+    return parser(iter_lines(chunks))
@@ -0,0 +1,38 @@
+from sqlalchemy import Float, String, case, func, literal_column, select
+
+from app.models.pass_model import Pass, PASS_SEARCH_DOCUMENT
+
+# Literal expression (no bind parameters) so PostgreSQL can use the trigram index
+SEARCH_DOCUMENT = literal_column(PASS_SEARCH_DOCUMENT, String)
+
+
+def _escape_like(term: str) -> str:
+    return term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def search_query(term: str, dialect: str):
+    """
+    Passes matching term in any searchable field, and the relevance of each
+    match (higher is better). Returns (select of Pass and "rank", rank expression).
+
+    PostgreSQL filters through the pg_trgm index and ranks by trigram
+    similarity, favouring the guest name. Other databases (SQLite in tests)
+    scan and rank prefix matches of the name first.
+    """
+    term = term.strip()
+    escaped = _escape_like(term)
+    matches = SEARCH_DOCUMENT.ilike(f"%{escaped}%", escape="\\")
+
+    if dialect == "postgresql":
+        rank = (
+            func.word_similarity(term, SEARCH_DOCUMENT, type_=Float)
+            + func.similarity(func.coalesce(Pass.guest_name, ""), term, type_=Float)
+        )
+    else:
+        rank = case(
+            (Pass.guest_name.ilike(f"{escaped}%", escape="\\"), 3),
+            (Pass.guest_name.ilike(f"%{escaped}%", escape="\\"), 2),
+            else_=1,
+        )
+
+    return select(Pass, rank.label("rank")).where(matches), rank
@@ -0,0 +1,92 @@
+from datetime import datetime
+from sqlalchemy import select, update, insert, func
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.pass_change import PassChange
+from app.models.pass_model import Pass, PassStatus
+from app.services.offline_feed import qr_hash
+from app.services.pass_cache import as_utc
+
+
+def status_for(pass_obj: Pass, now: datetime) -> PassStatus:
+    """Lifecycle status implied by the pass flags and validity window"""
+    if pass_obj.valid_until is not None and as_utc(pass_obj.valid_until) < now:
+        return PassStatus.EXPIRED
+    if not pass_obj.is_active:
+        return PassStatus.REVOKED
+    if pass_obj.valid_from is not None and as_utc(pass_obj.valid_from) > now:
+        return PassStatus.PENDING
+    return PassStatus.ACTIVE
+
+
+class PassStatusService:
+    """Set-based maintenance of Pass.status, run by the sweeper task"""
+
+    @staticmethod
+    async def _update_in_chunks(db: AsyncSession, condition, values: dict, chunk_size: int) -> list:
+        """
+        Apply an UPDATE to the rows matching condition, chunk_size rows per
+        statement and transaction so the sweeper never holds long locks.
+        Returns (id, qr_code) of every updated pass.
+        """
+        updated = []
+        while True:
+            chunk = (
+                select(Pass.id)
+                .where(condition)
+                .order_by(Pass.id)
+                .limit(chunk_size)
+                .with_for_update(skip_locked=True)
+                .scalar_subquery()
+            )
+            result = await db.execute(
+                update(Pass)
+                .where(Pass.id.in_(chunk))
+                .values(**values, updated_at=func.now())
+                .returning(Pass.id, Pass.qr_code)
+                .execution_options(synchronize_session=False)
+            )
+            rows = result.all()
+            if values.get("is_active") is False and rows:
+                # Expired passes disappear from the offline guard feed
+                await db.execute(insert(PassChange), [
+                    {"pass_id": row.id, "qr_hash": qr_hash(row.qr_code), "op": "delete"}
+                    for row in rows
+                ])
+            await db.commit()
+
+            updated.extend(rows)
+            if len(rows) < chunk_size:
+                return updated
+
+    @staticmethod
+    async def sweep(db: AsyncSession, now: datetime, chunk_size: int = 1000) -> dict:
+        """Expire, activate and mark revoked passes in bulk"""
+        expired = await PassStatusService._update_in_chunks(
+            db,
+            (Pass.valid_until < now)
+            & ((Pass.status != PassStatus.EXPIRED) | (Pass.status == None)),
+            {"status": PassStatus.EXPIRED, "is_active": False},
+            chunk_size,
+        )
+        revoked = await PassStatusService._update_in_chunks(
+            db,
+            (Pass.is_active == False) & Pass.status.in_([PassStatus.PENDING, PassStatus.ACTIVE]),
+            {"status": PassStatus.REVOKED},
+            chunk_size,
+        )
+        activated = await PassStatusService._update_in_chunks(
+            db,
+            (Pass.status == PassStatus.PENDING)
+            & (Pass.is_active == True)
+            & (Pass.valid_from <= now)
+            & (Pass.valid_until >= now),
+            {"status": PassStatus.ACTIVE},
+            chunk_size,
+        )
+
+        return {
+            "expired": len(expired),
+            "revoked": len(revoked),
+            "activated": len(activated),
+        }
@@ -0,0 +1,89 @@
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
+from time import perf_counter
+from typing import Optional
+
+from app.config import settings
+from app.utils.metrics import registry
+from app.utils.security import hash_password, verify_password
+
+HASH_SECONDS = registry.histogram(
+    "password_hash_seconds", "Time from submitting a password hash or check to its result", ["operation"],
+    buckets=(0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+)
+REJECTED = registry.counter(
+    "password_hash_rejected_total", "Password hashes and checks refused because the queue was full"
+)
+
+
+class HasherBusy(Exception):
+    """Raised when the password hashing queue of this worker is full"""
+
+
+class PasswordHasher:
+    """
+    bcrypt off the event loop, on a small dedicated thread pool (bcrypt
+    releases the GIL while it works). At most max_workers + max_queue calls
+    are admitted per process; further callers get HasherBusy at once rather
+    than waiting behind a queue they would time out in anyway.
+    """
+
+    def __init__(self, max_workers: int = 0, max_queue: int = 32):
+        self.max_workers = max_workers or min(4, os.cpu_count() or 1)
+        self.max_queue = max_queue
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._admitted = 0
+
+    def _pool(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="bcrypt")
+        return self._executor
+
+    def _release(self):
+        self._admitted -= 1
+
+    def _released_from(self, loop: asyncio.AbstractEventLoop):
+        def callback(_):
+            try:
+                loop.call_soon_threadsafe(self._release)
+            except RuntimeError:
+                pass  # loop already closed on shutdown
+        return callback
+
+    async def _run(self, operation: str, function, *args):
+        if self._admitted >= self.max_workers + self.max_queue:
+            REJECTED.inc()
+            raise HasherBusy()
+
+        loop = asyncio.get_running_loop()
+        started = perf_counter()
+        self._admitted += 1
+        future = self._pool().submit(function, *args)
+        # Released when the thread is done, even if the awaiting request was cancelled
+        future.add_done_callback(self._released_from(loop))
+        try:
+            return await asyncio.wrap_future(future)
+        finally:
+            HASH_SECONDS.observe(perf_counter() - started, operation)
+
+    async def hash(self, password: str) -> str:
+        return await self._run("hash", hash_password, password)
+
+    async def verify(self, password: str, hashed_password: str) -> bool:
+        return await self._run("verify", verify_password, password, hashed_password)
+
+    def in_flight(self) -> int:
+        return self._admitted
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+password_hasher = PasswordHasher(settings.password_hash_workers, settings.password_hash_queue_size)
+
+registry.gauge_function(
+    "password_hash_in_flight", "Password hashes and checks running or queued", password_hasher.in_flight
+)
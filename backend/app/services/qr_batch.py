@@ -0,0 +1,77 @@
+import asyncio
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from itertools import islice
+from typing import AsyncIterator, List, Optional, Sequence, Tuple
+
+from app.config import settings
+from app.utils.qr_generator import render_many
+
+# (data, "png" | "svg", box_size)
+QRItem = Tuple[str, str, int]
+
+
+class QRBatchRenderer:
+    """
+    Renders many QR codes in parallel worker processes. Items are sent in
+    chunks to amortise pickling and inter-process round trips, and results
+    are handed back chunk by chunk as they finish, in no particular order.
+    """
+
+    def __init__(self, max_workers: int = 0, chunk_size: int = 50):
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.chunk_size = chunk_size
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._pool_failed = False
+
+    def _pool(self) -> Optional[ProcessPoolExecutor]:
+        if self._executor is None and not self._pool_failed:
+            # spawn: forking a process with a running event loop and threads is unsafe
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return self._executor
+
+    async def _render_chunk(self, chunk: List[QRItem]) -> Tuple[List[QRItem], List[bytes]]:
+        loop = asyncio.get_running_loop()
+        pool = self._pool()
+        if pool is not None:
+            try:
+                return chunk, await loop.run_in_executor(pool, render_many, chunk)
+            except (BrokenProcessPool, OSError, AssertionError) as e:
+                # AssertionError: a daemonic process (Celery prefork child) may not have children
+                if not self._pool_failed:
+                    print(f"[QR] Process pool unavailable, rendering in a thread: {e!r}")
+                self.shutdown()
+                self._pool_failed = True
+        # Still never on the event loop thread
+        return chunk, await asyncio.to_thread(render_many, chunk)
+
+    async def render(self, items: Sequence[QRItem]) -> AsyncIterator[Tuple[QRItem, bytes]]:
+        """Yield (item, image bytes) for every item, as chunks complete"""
+        chunks = (list(items[start:start + self.chunk_size]) for start in range(0, len(items), self.chunk_size))
+        # Two chunks per worker in flight: busy workers, bounded memory
+        window = 2 * self.max_workers
+        pending = {asyncio.ensure_future(self._render_chunk(chunk)) for chunk in islice(chunks, window)}
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                pending |= {asyncio.ensure_future(self._render_chunk(chunk)) for chunk in islice(chunks, len(done))}
+                for task in done:
+                    chunk, images = task.result()
+                    for item, image in zip(chunk, images):
+                        yield item, image
+        finally:
+            for task in pending:
+                task.cancel()
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+qr_batch = QRBatchRenderer(settings.qr_batch_workers, settings.qr_batch_chunk_size)
@@ -0,0 +1,109 @@
+import asyncio
+import hashlib
+import os
+from pathlib import Path
+from typing import Iterable, Optional, Tuple
+
+from app.config import settings
+from app.services.qr_batch import qr_batch
+from app.utils.cache import SingleFlight, TTLCache
+from app.utils.qr_generator import render_qr_png, render_qr_svg
+
+RENDERERS = {"png": render_qr_png, "svg": render_qr_svg}
+MEDIA_TYPES = {"png": "image/png", "svg": "image/svg+xml"}
+
+# Rendered images never change for a given key, so memory entries only age out by LRU
+MEMORY_TTL_SECONDS = 24 * 3600
+
+
+def image_key(data: str, fmt: str, box_size: int) -> str:
+    """Content address of a rendering: also its strong ETag"""
+    return hashlib.sha256(f"{fmt}:{box_size}:{data}".encode()).hexdigest()
+
+
+class QRImageCache:
+    """
+    Rendered QR images by content address: a memory LRU in front of a disk
+    cache shared by the workers of a host. Rendering happens off the event
+    loop, once per key even when several requests miss at the same time.
+    """
+
+    def __init__(self, directory: str, max_items: int):
+        self.directory = Path(directory)
+        self._memory = TTLCache(max_size=max_items, ttl_seconds=MEMORY_TTL_SECONDS)
+        self._rendering = SingleFlight()
+        self.renders = 0
+
+    def _path(self, key: str, fmt: str) -> Path:
+        return self.directory / key[:2] / f"{key}.{fmt}"
+
+    def _load_or_render(self, key: str, data: str, fmt: str, box_size: int) -> bytes:
+        """Runs in a worker thread"""
+        path = self._path(key, fmt)
+        try:
+            return path.read_bytes()
+        except FileNotFoundError:
+            pass
+
+        image = RENDERERS[fmt](data, box_size)
+        self.renders += 1
+        self._store(path, image)
+        return image
+
+    def _store(self, path: Path, image: bytes):
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            partial = path.with_name(f"{path.name}.{os.getpid()}.part")
+            partial.write_bytes(image)
+            os.replace(partial, path)
+        except OSError as e:
+            # Serving from memory still works without the disk cache
+            print(f"[QR] Disk cache write failed: {e}")
+
+    async def get(self, data: str, fmt: str, box_size: int = 10) -> Tuple[str, bytes]:
+        """(key, image bytes) of data rendered as fmt"""
+        key = image_key(data, fmt, box_size)
+        image = self._memory.get(key)
+        if image is not None:
+            return key, image
+
+        image = await self._rendering.run(
+            key, lambda: asyncio.to_thread(self._load_or_render, key, data, fmt, box_size)
+        )
+        self._memory.set(key, image)
+        return key, image
+
+    async def warm(self, codes: Iterable[str], fmt: str = "png", box_size: int = 10) -> int:
+        """
+        Render the codes not yet in the disk cache in the batch process pool,
+        so later requests for them are served without rendering. Returns how
+        many were rendered.
+        """
+        def missing():
+            return [
+                (code, fmt, box_size) for code in set(codes)
+                if not self._path(image_key(code, fmt, box_size), fmt).exists()
+            ]
+
+        rendered = 0
+        async for (code, _, _), image in qr_batch.render(await asyncio.to_thread(missing)):
+            await asyncio.to_thread(self._store, self._path(image_key(code, fmt, box_size), fmt), image)
+            rendered += 1
+        return rendered
+
+    def stats(self) -> dict:
+        return {**self._memory.stats(), "renders": self.renders}
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Whether an If-None-Match header covers etag (weak comparison, as RFC 9110 asks)"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    return any(
+        candidate.strip().removeprefix("W/") == etag for candidate in if_none_match.split(",")
+    )
+
+
+qr_images = QRImageCache(settings.qr_cache_dir, settings.qr_cache_max_items)
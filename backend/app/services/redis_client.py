@@ -0,0 +1,40 @@
+import time
+import redis.asyncio as aioredis
+
+from app.config import settings
+
+# After a failure Redis is skipped for this long, so an outage costs the scan
+# path one timeout instead of one timeout per request
+REDIS_RETRY_SECONDS = 5.0
+
+_client = None
+_down_until = 0.0
+
+
+def create_redis(**options) -> aioredis.Redis:
+    """New client, for code running in its own event loop (Celery tasks)"""
+    options = {
+        "decode_responses": True,
+        "socket_connect_timeout": settings.redis_timeout_seconds,
+        "socket_timeout": settings.redis_timeout_seconds,
+        **options,
+    }
+    return aioredis.from_url(settings.redis_url, **options)
+
+
+def get_redis() -> aioredis.Redis:
+    """Shared client of the API process"""
+    global _client
+    if _client is None:
+        _client = create_redis()
+    return _client
+
+
+def redis_down() -> bool:
+    return time.monotonic() < _down_until
+
+
+def mark_redis_down(error: Exception):
+    global _down_until
+    _down_until = time.monotonic() + REDIS_RETRY_SECONDS
+    print(f"[REDIS] Unavailable, retrying in {REDIS_RETRY_SECONDS:.0f}s: {error}")
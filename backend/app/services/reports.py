@@ -0,0 +1,196 @@
+import csv
+import hashlib
+import json
+import os
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import AsyncIterator, Callable, Optional
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.models.pass_model import Pass, Visit
+from app.schemas.report_schema import ReportRequest
+
+try:
+    from openpyxl import Workbook
+except ImportError:  # XLSX reports are optional
+    Workbook = None
+
+REPORT_FORMATS = ("csv", "xlsx")
+
+# Visits read per round trip while building a report
+REPORT_BATCH_ROWS = 2000
+
+
+def report_id(request: ReportRequest) -> str:
+    """Identical requests share an id, and with it the Celery task and the result file"""
+    spec = json.dumps(request.model_dump(mode="json"), sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(spec.encode()).hexdigest()[:32]
+
+
+def report_path(report_id: str, fmt: str) -> Path:
+    return Path(settings.report_dir) / f"{report_id}.{fmt}"
+
+
+def find_report(report_id: str) -> Optional[Path]:
+    """The finished file of a report if it is still fresh enough to reuse"""
+    for fmt in REPORT_FORMATS:
+        path = report_path(report_id, fmt)
+        try:
+            age = time.time() - path.stat().st_mtime
+        except FileNotFoundError:
+            continue
+        if age < settings.report_cache_ttl_seconds:
+            return path
+    return None
+
+
+def purge_reports() -> int:
+    """Delete report files older than the cache TTL"""
+    directory = Path(settings.report_dir)
+    if not directory.is_dir():
+        return 0
+    removed = 0
+    cutoff = time.time() - settings.report_cache_ttl_seconds
+    for path in directory.iterdir():
+        try:
+            if path.stat().st_mtime < cutoff:
+                path.unlink()
+                removed += 1
+        except FileNotFoundError:
+            pass
+    return removed
+
+
+class _CsvWriter:
+    def __init__(self, path: Path):
+        self._file = open(path, "w", newline="", encoding="utf-8")
+        self._writer = csv.writer(self._file)
+
+    def write_rows(self, rows):
+        self._writer.writerows(rows)
+
+    def close(self):
+        self._file.close()
+
+
+class _XlsxWriter:
+    def __init__(self, path: Path):
+        self._path = path
+        self._workbook = Workbook(write_only=True)  # streams rows instead of keeping cells
+        self._sheet = self._workbook.create_sheet("Report")
+
+    def write_rows(self, rows):
+        for row in rows:
+            # Excel has no time zones: write UTC
+            self._sheet.append([
+                value.astimezone(timezone.utc).replace(tzinfo=None)
+                if isinstance(value, datetime) and value.tzinfo else value
+                for value in row
+            ])
+
+    def close(self):
+        self._workbook.save(self._path)
+
+
+def _dwell_minutes(entry_time: datetime, exit_time: Optional[datetime]) -> Optional[float]:
+    if entry_time is None or exit_time is None:
+        return None
+    return round((exit_time - entry_time).total_seconds() / 60, 1)
+
+
+class ReportBuilder:
+    """Builds a report into a local file chunk by chunk, reporting progress on the way"""
+
+    HEADERS = {
+        "visits": [
+            "visit_id", "guest_name", "guest_company", "entry_time", "exit_time",
+            "dwell_minutes", "entry_gate", "exit_gate",
+        ],
+        "company_dwell": [
+            "guest_company", "visits", "guests", "completed_visits",
+            "avg_dwell_minutes", "max_dwell_minutes",
+        ],
+    }
+
+    def __init__(self, request: ReportRequest, progress: Callable[[int, int], None] = None):
+        self.request = request
+        self.progress = progress or (lambda done, total: None)
+
+    def _filter(self, query):
+        start = datetime.combine(self.request.date_from, datetime.min.time(), tzinfo=timezone.utc)
+        end = datetime.combine(self.request.date_to + timedelta(days=1), datetime.min.time(), tzinfo=timezone.utc)
+        query = query.join(Pass, Visit.pass_id == Pass.id).where(
+            Visit.entry_time >= start, Visit.entry_time < end
+        )
+        if self.request.company:
+            query = query.where(Pass.guest_company == self.request.company)
+        return query
+
+    async def _stream(self, db: AsyncSession, query) -> AsyncIterator[list]:
+        result = await db.stream(query.execution_options(yield_per=REPORT_BATCH_ROWS))
+        async for rows in result.partitions():
+            yield rows
+
+    async def _visits(self, db: AsyncSession) -> AsyncIterator[tuple]:
+        query = self._filter(select(
+            Visit.id, Pass.guest_name, Pass.guest_company, Visit.entry_time, Visit.exit_time,
+            Visit.entry_gate_id, Visit.exit_gate_id,
+        )).order_by(Visit.entry_time, Visit.id)
+        async for rows in self._stream(db, query):
+            yield [
+                (row.id, row.guest_name, row.guest_company, row.entry_time, row.exit_time,
+                 _dwell_minutes(row.entry_time, row.exit_time), row.entry_gate_id, row.exit_gate_id)
+                for row in rows
+            ], len(rows)
+
+    async def _company_dwell(self, db: AsyncSession) -> AsyncIterator[tuple]:
+        companies = {}
+        query = self._filter(select(Pass.guest_company, Visit.pass_id, Visit.entry_time, Visit.exit_time))
+        async for rows in self._stream(db, query):
+            for row in rows:
+                company = companies.setdefault(row.guest_company or "", {
+                    "visits": 0, "guests": set(), "completed": 0, "dwell_total": 0.0, "dwell_max": None,
+                })
+                company["visits"] += 1
+                company["guests"].add(row.pass_id)
+                dwell = _dwell_minutes(row.entry_time, row.exit_time)
+                if dwell is not None:
+                    company["completed"] += 1
+                    company["dwell_total"] += dwell
+                    company["dwell_max"] = max(dwell, company["dwell_max"] or dwell)
+            yield [], len(rows)
+
+        yield [
+            (name, company["visits"], len(company["guests"]), company["completed"],
+             round(company["dwell_total"] / company["completed"], 1) if company["completed"] else None,
+             company["dwell_max"])
+            for name, company in sorted(companies.items())
+        ], 0
+
+    async def build(self, db: AsyncSession, path: Path) -> int:
+        """Write the report to path (atomically) and return the number of visits read"""
+        total = (await db.execute(self._filter(select(func.count(Visit.id))))).scalar()
+        self.progress(0, total)
+
+        path.parent.mkdir(parents=True, exist_ok=True)
+        partial = path.with_name(f"{path.name}.{os.getpid()}.part")
+        writer = _XlsxWriter(partial) if self.request.format == "xlsx" else _CsvWriter(partial)
+        done = 0
+        try:
+            writer.write_rows([self.HEADERS[self.request.report]])
+            batches = self._visits(db) if self.request.report == "visits" else self._company_dwell(db)
+            async for rows, read in batches:
+                writer.write_rows(rows)
+                if read:
+                    done += read
+                    self.progress(done, total)
+        except BaseException:
+            writer.close()
+            partial.unlink(missing_ok=True)
+            raise
+        writer.close()
+        os.replace(partial, path)
+        return done
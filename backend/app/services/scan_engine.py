@@ -0,0 +1,375 @@
+from collections import namedtuple
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+from sqlalchemy import func, inspect, text, update, insert, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from redis.exceptions import RedisError
+
+from app.config import settings
+from app.models.pass_model import Visit
+from app.services.pass_cache import as_utc, pass_cache
+from app.services.redis_client import redis_down, mark_redis_down
+from app.services.statistics import stats_rollup
+from app.services.visit_journal import JournalNotReady, visit_journal
+from app.utils.qr_tokens import check_qr_token
+
+_ToggleRow = namedtuple("_ToggleRow", "action id entry_time exit_time")
+
+# Entry/exit toggle in a single statement. The partial unique index
+# uq_visits_open_pass guarantees at most one open visit per pass, so when two
+# gates race on the same badge the losing INSERT hits ON CONFLICT and returns
+# no row instead of creating a duplicate open visit.
+TOGGLE_VISIT_SQL = text("""
+WITH closed AS (
+    UPDATE visits
+    SET exit_time = CAST(:now AS TIMESTAMPTZ), exit_gate_id = :gate_id
+    WHERE pass_id = :pass_id AND exit_time IS NULL
+    RETURNING id, entry_time, exit_time
+),
+opened AS (
+    INSERT INTO visits (pass_id, entry_time, entry_gate_id)
+    SELECT CAST(:pass_id AS INTEGER), CAST(:now AS TIMESTAMPTZ), CAST(:gate_id AS VARCHAR)
+    WHERE NOT EXISTS (SELECT 1 FROM closed)
+    ON CONFLICT (pass_id) WHERE exit_time IS NULL DO NOTHING
+    RETURNING id, entry_time, exit_time
+)
+SELECT 'EXIT' AS action, id, entry_time, exit_time FROM closed
+UNION ALL
+SELECT 'ENTRY' AS action, id, entry_time, exit_time FROM opened
+""")
+
+
+def denied_response(reason: str, guest_name: Optional[str] = None) -> dict:
+    return {
+        "status": "DENIED",
+        "reason": reason,
+        "guest_name": guest_name,
+        "is_valid": False
+    }
+
+
+def check_pass(pass_obj: Optional[dict], at: datetime) -> Optional[str]:
+    """Return the denial reason for a scan at the given moment, or None if valid"""
+    if not pass_obj:
+        return "Pass not found"
+    if not pass_obj["is_active"]:
+        return "Pass is inactive"
+    if at < pass_obj["valid_from"]:
+        return "Pass not yet valid"
+    if at > pass_obj["valid_until"]:
+        return "Pass expired"
+    return None
+
+
+def check_scan_time(scanned_at: datetime, now: datetime) -> Optional[str]:
+    """Return the denial reason for a buffered scan stamped by a gate clock, or None"""
+    if scanned_at > now + timedelta(seconds=settings.scan_clock_skew_seconds):
+        return "Scan time is in the future"
+    if scanned_at < now - timedelta(hours=settings.scan_replay_horizon_hours):
+        return "Scan is too old to replay"
+    return None
+
+
+def scan_response(pass_obj: dict, toggle: dict) -> dict:
+    """Build the ALLOWED/EXIT payload returned to the guard scanner"""
+    response = {
+        "status": "EXIT" if toggle["action"] == "EXIT" else "ALLOWED",
+        "reason": "Valid pass",
+        "guest_name": pass_obj["guest_name"],
+        "guest_company": pass_obj["guest_company"],
+        "guest_photo_url": pass_obj["guest_photo_url"],
+        "valid_until": pass_obj["valid_until"],
+        "pass_id": pass_obj["id"],
+    }
+    if toggle["action"] == "EXIT":
+        response["duration_minutes"] = toggle["duration_minutes"]
+    else:
+        response["is_valid"] = True
+    return response
+
+
+def _write_behind() -> bool:
+    if not settings.visit_write_behind:
+        return False
+    if redis_down():
+        # This scan bypasses the open visit hash, which has to be rebuilt
+        visit_journal.mark_diverged()
+        return False
+    return True
+
+
+class ScanEngine:
+    """Atomic check-in/check-out of a pass"""
+
+    @staticmethod
+    async def ensure_open_visit_index(db: AsyncSession) -> int:
+        """
+        Create uq_visits_open_pass if the database predates it, which the
+        toggle's ON CONFLICT needs. Duplicate open visits left by the race it
+        prevents would fail the index, so all but the latest open visit of a
+        pass are closed at their entry time first. Returns how many were closed.
+        """
+        index = next(index for index in Visit.__table__.indexes if index.name == "uq_visits_open_pass")
+        connection = await db.connection()
+        existing = await connection.run_sync(
+            lambda sync_connection: {index["name"] for index in inspect(sync_connection).get_indexes("visits")}
+        )
+        if index.name in existing:
+            return 0
+
+        if connection.dialect.name == "postgresql":
+            # No new duplicates between the cleanup and the index build
+            await db.execute(text("LOCK TABLE visits IN SHARE ROW EXCLUSIVE MODE"))
+        latest = (
+            select(func.max(Visit.id))
+            .where(Visit.exit_time == None)
+            .group_by(Visit.pass_id)
+        )
+        result = await db.execute(
+            update(Visit)
+            .where(Visit.exit_time == None, Visit.id.notin_(latest))
+            .values(exit_time=Visit.entry_time)
+            .execution_options(synchronize_session=False)
+        )
+        await connection.run_sync(lambda sync_connection: index.create(sync_connection, checkfirst=True))
+        await db.commit()
+        return result.rowcount
+
+    @staticmethod
+    async def toggle_visit(
+        db: AsyncSession, pass_id: int, now: datetime, gate_id: Optional[str] = None
+    ) -> Optional[dict]:
+        """
+        Close the open visit of the pass or open a new one.
+        Returns None when a concurrent scan of the same pass won the race.
+        """
+        if _write_behind():
+            try:
+                toggle = await visit_journal.toggle(pass_id, now, gate_id)
+                if toggle["action"] == "STALE":
+                    return None
+                stats_rollup.record_toggle(toggle)
+                return toggle
+            except RedisError as e:
+                mark_redis_down(e)
+                visit_journal.mark_diverged()
+            except JournalNotReady:
+                pass  # open visits are being reloaded into Redis
+
+        if db.get_bind().dialect.name == "postgresql":
+            result = await db.execute(
+                TOGGLE_VISIT_SQL, {"pass_id": pass_id, "now": now, "gate_id": gate_id}
+            )
+            row = result.first()
+            await db.commit()
+        else:
+            row = await ScanEngine._toggle_generic(db, pass_id, now, gate_id)
+
+        if row is None:
+            return None
+
+        toggle = {
+            "action": row.action,
+            "visit_id": row.id,
+            "entry_time": as_utc(row.entry_time),
+            "exit_time": as_utc(row.exit_time),
+        }
+        if row.action == "EXIT":
+            toggle["duration_minutes"] = int(
+                (toggle["exit_time"] - toggle["entry_time"]).total_seconds() / 60
+            )
+        stats_rollup.record_toggle(toggle)
+        return toggle
+
+    @staticmethod
+    async def _toggle_generic(db: AsyncSession, pass_id: int, now: datetime, gate_id: Optional[str]):
+        """Two-statement fallback for databases without data-modifying CTEs"""
+        result = await db.execute(
+            update(Visit)
+            .where(Visit.pass_id == pass_id, Visit.exit_time == None)
+            .values(exit_time=now, exit_gate_id=gate_id)
+            .returning(Visit.id, Visit.entry_time, Visit.exit_time)
+        )
+        closed = result.first()
+        if closed is not None:
+            await db.commit()
+            return _ToggleRow("EXIT", *closed)
+
+        try:
+            result = await db.execute(
+                insert(Visit)
+                .values(pass_id=pass_id, entry_time=now, entry_gate_id=gate_id)
+                .returning(Visit.id, Visit.entry_time, Visit.exit_time)
+            )
+            opened = result.first()
+            await db.commit()
+        except IntegrityError:
+            await db.rollback()
+            return None
+        return _ToggleRow("ENTRY", *opened)
+
+    @staticmethod
+    async def close_visit(
+        db: AsyncSession, pass_id: int, now: datetime, gate_id: Optional[str] = None
+    ) -> Optional[dict]:
+        """Close the open visit of the pass in one statement, if there is one"""
+        if _write_behind():
+            try:
+                closed = await visit_journal.close(pass_id, now, gate_id)
+                stats_rollup.record_toggle(closed)
+                return closed
+            except RedisError as e:
+                mark_redis_down(e)
+                visit_journal.mark_diverged()
+            except JournalNotReady:
+                pass  # open visits are being reloaded into Redis
+
+        result = await db.execute(
+            update(Visit)
+            .where(Visit.pass_id == pass_id, Visit.exit_time == None)
+            .values(exit_time=now, exit_gate_id=gate_id)
+            .returning(Visit.id, Visit.entry_time, Visit.exit_time)
+        )
+        row = result.first()
+        await db.commit()
+        if row is None:
+            return None
+
+        entry_time, exit_time = as_utc(row.entry_time), as_utc(row.exit_time)
+        stats_rollup.add("exits", exit_time)
+        return {
+            "visit_id": row.id,
+            "entry_time": entry_time,
+            "exit_time": exit_time,
+            "duration_minutes": int((exit_time - entry_time).total_seconds() / 60),
+        }
+
+
+    @staticmethod
+    async def apply_batch(db: AsyncSession, events: list) -> list:
+        """
+        Apply buffered scan events using their original timestamps.
+        Passes and open visits are resolved with one query each and all
+        visit writes go out in a single transaction. Results keep the
+        order of the incoming events.
+        """
+        # Implausible scan times and forged or out-of-window signed codes are
+        # decided once and never reach the database
+        now = datetime.now(timezone.utc)
+        token_reasons = [
+            check_scan_time(as_utc(event.scanned_at), now) or check_qr_token(event.qr_code, as_utc(event.scanned_at))
+            for event in events
+        ]
+        passes = await pass_cache.get_many(db, (
+            event.qr_code for event, reason in zip(events, token_reasons) if reason is None
+        ))
+
+        if _write_behind():
+            try:
+                return await ScanEngine._apply_batch_journaled(events, token_reasons, passes)
+            except RedisError as e:
+                mark_redis_down(e)
+                visit_journal.mark_diverged()
+            except JournalNotReady:
+                pass  # open visits are being reloaded into Redis
+
+        pass_ids = {snapshot["id"] for snapshot in passes.values()}
+        open_visits = {}
+        last_exits = {}
+        if pass_ids:
+            result = await db.execute(
+                select(Visit).where(Visit.pass_id.in_(pass_ids), Visit.exit_time == None)
+            )
+            for visit in result.scalars():
+                open_visits[visit.pass_id] = visit
+            result = await db.execute(
+                select(Visit.pass_id, func.max(Visit.exit_time))
+                .where(Visit.pass_id.in_(pass_ids))
+                .group_by(Visit.pass_id)
+            )
+            for pass_id, exit_time in result.all():
+                if exit_time is not None:
+                    last_exits[pass_id] = as_utc(exit_time)
+
+        results = [None] * len(events)
+        counts = []
+        # Replay in scan time order; sorted() is stable for equal timestamps
+        ordered = sorted(enumerate(events), key=lambda item: as_utc(item[1].scanned_at))
+
+        for index, event in ordered:
+            scanned_at = as_utc(event.scanned_at)
+            pass_obj = passes.get(event.qr_code)
+
+            reason = token_reasons[index] or check_pass(pass_obj, scanned_at)
+            if reason:
+                response = denied_response(reason, pass_obj["guest_name"] if pass_obj else None)
+            else:
+                visit = open_visits.get(pass_obj["id"])
+                last_exit = last_exits.get(pass_obj["id"])
+                if visit is not None and scanned_at < as_utc(visit.entry_time):
+                    response = denied_response("Scan predates current visit", pass_obj["guest_name"])
+                elif last_exit is not None and scanned_at < last_exit:
+                    # Would overlap a finished visit
+                    response = denied_response("Scan predates last visit", pass_obj["guest_name"])
+                elif visit is not None:
+                    visit.exit_time = scanned_at
+                    visit.exit_gate_id = event.gate_id
+                    del open_visits[pass_obj["id"]]
+                    last_exits[pass_obj["id"]] = scanned_at
+                    counts.append(("exits", scanned_at))
+                    response = scan_response(pass_obj, {
+                        "action": "EXIT",
+                        "duration_minutes": int(
+                            (scanned_at - as_utc(visit.entry_time)).total_seconds() / 60
+                        ),
+                    })
+                else:
+                    visit = Visit(
+                        pass_id=pass_obj["id"],
+                        entry_time=scanned_at,
+                        entry_gate_id=event.gate_id,
+                    )
+                    db.add(visit)
+                    open_visits[pass_obj["id"]] = visit
+                    counts.append(("entries", scanned_at))
+                    response = scan_response(pass_obj, {"action": "ENTRY"})
+
+            response["scanned_at"] = scanned_at
+            response["gate_id"] = event.gate_id
+            results[index] = response
+
+        await db.commit()
+        for metric, at in counts:
+            stats_rollup.add(metric, at)
+        return results
+
+    @staticmethod
+    async def _apply_batch_journaled(events: list, token_reasons: list, passes: dict) -> list:
+        """apply_batch in write-behind mode: all toggles go to the visit journal in one round trip"""
+        results = [None] * len(events)
+        accepted = []
+        for index, event in sorted(enumerate(events), key=lambda item: as_utc(item[1].scanned_at)):
+            scanned_at = as_utc(event.scanned_at)
+            pass_obj = passes.get(event.qr_code)
+
+            reason = token_reasons[index] or check_pass(pass_obj, scanned_at)
+            if reason:
+                results[index] = denied_response(reason, pass_obj["guest_name"] if pass_obj else None)
+            else:
+                accepted.append((index, pass_obj, scanned_at, event.gate_id))
+
+        toggles = await visit_journal.toggle_many(
+            (pass_obj["id"], scanned_at, gate_id) for _, pass_obj, scanned_at, gate_id in accepted
+        )
+        for (index, pass_obj, _, _), toggle in zip(accepted, toggles):
+            if toggle["action"] == "STALE":
+                results[index] = denied_response(toggle["reason"], pass_obj["guest_name"])
+            else:
+                stats_rollup.record_toggle(toggle)
+                results[index] = scan_response(pass_obj, toggle)
+
+        for result, event in zip(results, events):
+            result["scanned_at"] = as_utc(event.scanned_at)
+            result["gate_id"] = event.gate_id
+        return results
@@ -0,0 +1,42 @@
+from datetime import datetime
+from typing import Iterable, Optional
+
+from app.services.event_bus import event_bus
+from app.services.occupancy import occupancy
+
+SCAN_CHANNEL = "scans"
+
+ACTIONS = {"ALLOWED": "check_in", "EXIT": "check_out", "DENIED": "denied"}
+
+
+def scan_event(response: dict, scanned_at: datetime, gate_id: Optional[str] = None) -> dict:
+    """Dashboard event for a scan result, with the counter changes it implies"""
+    action = ACTIONS.get(response["status"], "denied")
+    return {
+        "type": "scan",
+        "action": action,
+        "pass_id": response.get("pass_id"),
+        "guest_name": response.get("guest_name"),
+        "guest_company": response.get("guest_company"),
+        "gate_id": gate_id,
+        "reason": response.get("reason"),
+        "at": scanned_at.isoformat(),
+        "delta": {
+            "on_site": {"check_in": 1, "check_out": -1}.get(action, 0),
+            "visits": 1 if action == "check_in" else 0,
+        },
+    }
+
+
+async def publish_scans(scans: Iterable[tuple]):
+    """
+    Apply (scan_response, scanned_at, gate_id) tuples, in scan order, to the
+    live occupancy counters and broadcast them to connected dashboards
+    """
+    scans = list(scans)
+    await occupancy.apply_scans(scans)
+    await event_bus.publish_many(SCAN_CHANNEL, (scan_event(*scan) for scan in scans))
+
+
+async def publish_scan(response: dict, scanned_at: datetime, gate_id: Optional[str] = None):
+    await publish_scans([(response, scanned_at, gate_id)])
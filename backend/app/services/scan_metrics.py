@@ -0,0 +1,90 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+from time import perf_counter
+from sqlalchemy import event
+
+from app.database import engine
+from app.services.pass_cache import pass_cache
+from app.utils.metrics import registry
+
+SCAN_SECONDS = registry.histogram(
+    "scan_request_seconds", "Total time spent handling a scan request", ["endpoint"]
+)
+STAGE_SECONDS = registry.histogram(
+    "scan_stage_seconds", "Time spent in each stage of a scan request", ["endpoint", "stage"]
+)
+DB_SECONDS = registry.histogram(
+    "scan_db_seconds", "Database time per scan request", ["endpoint"]
+)
+DB_QUERIES = registry.histogram(
+    "scan_db_queries", "Database statements per scan request", ["endpoint"],
+    buckets=(0, 1, 2, 3, 4, 5, 8, 13, 21),
+)
+OUTCOMES = registry.counter(
+    "scan_outcomes_total", "Scan results by status and denial reason", ["status", "reason"]
+)
+registry.gauge_function("pass_cache_hits", "Scan pass cache hits", lambda: pass_cache.stats()["hits"])
+registry.gauge_function("pass_cache_misses", "Scan pass cache misses", lambda: pass_cache.stats()["misses"])
+registry.gauge_function("pass_cache_hit_ratio", "Scan pass cache hit ratio", lambda: pass_cache.stats()["hit_ratio"])
+registry.gauge_function("pass_cache_size", "Entries in the scan pass cache", lambda: pass_cache.stats()["size"])
+
+
+class ScanTiming:
+    __slots__ = ("endpoint", "db_seconds", "queries")
+
+    def __init__(self, endpoint: str):
+        self.endpoint = endpoint
+        self.db_seconds = 0.0
+        self.queries = 0
+
+
+_current = ContextVar("scan_timing", default=None)
+
+
+@contextmanager
+def track_scan(endpoint: str):
+    """Measure a scan request; database statements run inside are attributed to it"""
+    timing = ScanTiming(endpoint)
+    token = _current.set(timing)
+    started = perf_counter()
+    try:
+        yield timing
+    finally:
+        SCAN_SECONDS.observe(perf_counter() - started, endpoint)
+        DB_SECONDS.observe(timing.db_seconds, endpoint)
+        DB_QUERIES.observe(timing.queries, endpoint)
+        _current.reset(token)
+
+
+@contextmanager
+def scan_stage(stage: str):
+    """Time one stage of the scan currently tracked (no-op outside track_scan)"""
+    timing = _current.get()
+    if timing is None:
+        yield
+        return
+    started = perf_counter()
+    try:
+        yield
+    finally:
+        STAGE_SECONDS.observe(perf_counter() - started, timing.endpoint, stage)
+
+
+def record_outcome(response: dict):
+    status = response["status"]
+    OUTCOMES.inc(status, response["reason"] if status == "DENIED" else "")
+
+
+@event.listens_for(engine.sync_engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if context is not None and _current.get() is not None:
+        context.scan_query_started = perf_counter()
+
+
+@event.listens_for(engine.sync_engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    timing = _current.get()
+    started = getattr(context, "scan_query_started", None)
+    if timing is not None and started is not None:
+        timing.db_seconds += perf_counter() - started
+        timing.queries += 1
@@ -0,0 +1,221 @@
+import asyncio
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+from sqlalchemy import delete, func, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.database import AsyncSessionLocal
+from app.models.pass_model import Pass, PassStatus, Visit
+from app.models.stats_counter import StatsCounter
+from app.services.pass_cache import as_utc
+from app.utils.cache import SingleFlight, TTLCache
+
+METRICS = ("entries", "exits", "passes_created")
+
+# Visits longer than this are missed when exits of a recent window are recounted
+MAX_VISIT_LENGTH = timedelta(days=1)
+
+
+def hour_bucket(at: datetime) -> datetime:
+    return as_utc(at).astimezone(timezone.utc).replace(minute=0, second=0, microsecond=0)
+
+
+def _hour(column, dialect: str):
+    """Start of the UTC hour of a timestamp column, in SQL"""
+    if dialect == "postgresql":
+        return func.date_trunc("hour", func.timezone("UTC", column))
+    return func.strftime("%Y-%m-%d %H:00:00", column)
+
+
+def _as_bucket(value) -> datetime:
+    if isinstance(value, str):  # SQLite
+        value = datetime.fromisoformat(value)
+    return as_utc(value)
+
+
+class StatsRollup:
+    """
+    Hourly counters behind the dashboard. Scans and pass writes only bump
+    an in-memory delta; a background loop adds the deltas of this worker to
+    stats_counters every few seconds with one upsert, so the scan path never
+    waits on (or contends for) the counter rows. rebuild() recounts hours
+    from the source tables and corrects any drift, e.g. deltas lost in a crash.
+    """
+
+    def __init__(self):
+        self._pending = Counter()
+
+    def add(self, metric: str, at: datetime, amount: int = 1):
+        self._pending[(hour_bucket(at), metric)] += amount
+
+    def record_toggle(self, toggle: Optional[dict]):
+        """Count the entry or exit of a ScanEngine toggle result"""
+        if not toggle:
+            return
+        if toggle.get("action") == "ENTRY":
+            self.add("entries", toggle["entry_time"])
+        elif toggle.get("exit_time"):
+            self.add("exits", toggle["exit_time"])
+
+    @staticmethod
+    def _insert(db: AsyncSession):
+        return pg_insert if db.get_bind().dialect.name == "postgresql" else sqlite_insert
+
+    async def flush(self, db: AsyncSession) -> int:
+        """Add the pending deltas to stats_counters; returns how many counters changed"""
+        pending, self._pending = self._pending, Counter()
+        if not pending:
+            return 0
+        # Sorted so concurrent flushes of several workers lock rows in the same order
+        rows = [
+            {"bucket": bucket, "metric": metric, "value": value}
+            for (bucket, metric), value in sorted(pending.items())
+        ]
+        insert = self._insert(db)(StatsCounter)
+        try:
+            await db.execute(insert.values(rows).on_conflict_do_update(
+                index_elements=[StatsCounter.bucket, StatsCounter.metric],
+                set_={"value": StatsCounter.value + insert.excluded.value},
+            ))
+            await db.commit()
+        except Exception:
+            await db.rollback()
+            self._pending.update(pending)
+            raise
+        return len(rows)
+
+    async def run_flusher(self, session_factory):
+        while True:
+            await asyncio.sleep(settings.stats_flush_interval_seconds)
+            try:
+                async with session_factory() as db:
+                    await self.flush(db)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"[STATS] Counter flush failed: {e}")
+
+    async def rebuild(self, db: AsyncSession, start: Optional[datetime] = None, end: Optional[datetime] = None) -> int:
+        """
+        Recount the hours in [start, end) (everything if not given) from
+        visits and passes and replace their counters. Returns the number of
+        counters written.
+        """
+        dialect = db.get_bind().dialect.name
+        start = hour_bucket(start) if start else None
+        end = hour_bucket(end) if end else None
+
+        def window(column, query):
+            if start:
+                query = query.where(column >= start)
+            if end:
+                query = query.where(column < end)
+            return query
+
+        counts = {}
+        sources = (
+            ("entries", Visit.entry_time, None),
+            ("exits", Visit.exit_time, Visit.entry_time),
+            ("passes_created", Pass.created_at, None),
+        )
+        for metric, column, index_column in sources:
+            bucket = _hour(column, dialect)
+            query = window(column, select(bucket, func.count()).where(column != None).group_by(bucket))
+            if start and index_column is not None:
+                # Lets the exit count use the entry_time index
+                query = query.where(index_column >= start - MAX_VISIT_LENGTH)
+            for value, count in (await db.execute(query)).all():
+                counts[(_as_bucket(value), metric)] = count
+
+        await db.execute(window(StatsCounter.bucket, delete(StatsCounter)))
+        if counts:
+            await db.execute(self._insert(db)(StatsCounter).values([
+                {"bucket": bucket, "metric": metric, "value": value}
+                for (bucket, metric), value in sorted(counts.items())
+            ]))
+        await db.commit()
+        return len(counts)
+
+    async def reconcile(self, db: AsyncSession, hours: int = 48) -> int:
+        """
+        Recount recent hours that closed at least stats_reconcile_settle_seconds
+        ago. Runs outside the API workers, so a later hour may still have
+        deltas pending there, which would be added on top of the recount.
+        """
+        end = datetime.now(timezone.utc) - timedelta(seconds=settings.stats_reconcile_settle_seconds)
+        return await self.rebuild(db, end - timedelta(hours=hours), end)
+
+    @staticmethod
+    async def is_empty(db: AsyncSession) -> bool:
+        return (await db.execute(select(StatsCounter.metric).limit(1))).first() is None
+
+
+class StatisticsService:
+    """
+    Dashboard figures from SQL aggregates and the hourly rollup, cached for
+    a few seconds. Concurrent refreshes share one computation.
+    """
+
+    def __init__(self, ttl_seconds: float):
+        self._cache = TTLCache(max_size=64, ttl_seconds=ttl_seconds)
+        self._flight = SingleFlight()
+
+    async def _cached(self, key, compute):
+        value = self._cache.get(key)
+        if value is None:
+            value = await self._flight.run(key, compute)
+            self._cache.set(key, value)
+        return value
+
+    async def overview(self) -> dict:
+        return await self._cached("overview", self._compute_overview)
+
+    async def daily(self, days: int) -> list:
+        return await self._cached(("daily", days), lambda: self._compute_daily(days))
+
+    @staticmethod
+    def _sum(metric: str, since: Optional[datetime] = None):
+        query = select(func.coalesce(func.sum(StatsCounter.value), 0)).where(StatsCounter.metric == metric)
+        if since:
+            query = query.where(StatsCounter.bucket >= since)
+        return query.scalar_subquery()
+
+    async def _compute_overview(self) -> dict:
+        today_start = datetime.now(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
+        # One round trip; pass counts come from the primary key and status indexes
+        query = select(
+            select(func.count()).select_from(Pass).scalar_subquery().label("total_passes"),
+            select(func.count()).select_from(Pass).where(Pass.status == PassStatus.ACTIVE)
+            .scalar_subquery().label("active_passes"),
+            self._sum("entries", today_start).label("today_visits"),
+            self._sum("entries").label("total_visits"),
+        )
+        async with AsyncSessionLocal() as db:
+            row = (await db.execute(query)).one()
+        return {key: int(value) for key, value in row._mapping.items()}
+
+    async def _compute_daily(self, days: int) -> list:
+        today = datetime.now(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
+        start = today - timedelta(days=days - 1)
+        async with AsyncSessionLocal() as db:
+            result = await db.execute(
+                select(StatsCounter.bucket, StatsCounter.metric, StatsCounter.value)
+                .where(StatsCounter.bucket >= start)
+            )
+            series = {
+                (start + timedelta(days=offset)).date(): dict.fromkeys(METRICS, 0)
+                for offset in range(days)
+            }
+            for bucket, metric, value in result.all():
+                day = series.get(as_utc(bucket).astimezone(timezone.utc).date())
+                if day is not None and metric in day:
+                    day[metric] += value
+        return [{"date": day.isoformat(), **values} for day, values in series.items()]
+
+
+stats_rollup = StatsRollup()
+statistics = StatisticsService(settings.stats_cache_ttl_seconds)
@@ -0,0 +1,108 @@
+import asyncio
+import time
+from typing import Optional
+
+from app.config import settings
+from app.services.event_bus import event_bus
+from app.services.redis_client import get_redis
+from app.utils.bloom import BloomFilter
+from app.utils.metrics import registry
+
+REVOKED_KEY = "auth:revoked"  # sorted set: session id -> end of the session (epoch seconds)
+USED_KEY_PREFIX = "auth:refresh-used:"
+REVOCATIONS_CHANNEL = "revocations"
+
+CHECKS = registry.counter(
+    "token_revocation_checks_total", "Token revocation checks by where they were answered", ["source"]
+)
+
+
+class TokenRevocations:
+    """
+    Revoked sign-in sessions: a refresh token family and the access tokens
+    issued with it. Redis holds the authoritative set; every worker keeps a
+    Bloom filter of it, so checking a session that was not revoked (nearly
+    every request) is answered in memory. Only filter hits, i.e. revoked
+    sessions and rare false positives, are confirmed in Redis. The filter is
+    rebuilt whenever the event bus resubscribes, as revocations broadcast
+    meanwhile were missed.
+    """
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self._filter: Optional[BloomFilter] = None  # until loaded every check asks Redis
+        self._loading: Optional[set] = None
+        self._subscribed = False
+
+    async def load(self) -> int:
+        """Rebuild the filter from Redis, leaving out ended sessions; returns its size"""
+        if not self._subscribed:
+            event_bus.add_handler(REVOCATIONS_CHANNEL, self._apply)
+            event_bus.add_resync_handler(self._reload)
+            self._subscribed = True
+
+        # Revocations broadcast while loading are added to the new filter too
+        self._loading = set()
+        try:
+            redis = get_redis()
+            now = time.time()
+            await redis.zremrangebyscore(REVOKED_KEY, "-inf", now)
+            sessions = await redis.zrangebyscore(REVOKED_KEY, now, "+inf")
+            revoked = BloomFilter(max(self.capacity, 2 * len(sessions)))
+            for session_id in [*sessions, *self._loading]:
+                revoked.add(session_id)
+            self._filter = revoked
+        finally:
+            self._loading = None
+        return len(revoked)
+
+    async def _reload(self):
+        print(f"[AUTH] Revocation list reloaded: {await self.load()} revoked sessions")
+
+    async def run_reloader(self):
+        while True:
+            await asyncio.sleep(settings.revocation_reload_seconds)
+            try:
+                await self.load()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"[AUTH] Revocation list reload failed: {e}")
+
+    async def revoke(self, session_id: str, session_end: float):
+        """
+        Revoke a session in every worker until it would have ended anyway.
+        Stored and broadcast in one transaction; raises RedisError if that fails.
+        """
+        event = {"session_id": session_id}
+        async with get_redis().pipeline(transaction=True) as pipe:
+            pipe.zadd(REVOKED_KEY, {session_id: session_end})
+            event_bus.publish_in(pipe, REVOCATIONS_CHANNEL, event)
+            await pipe.execute()
+        self._apply(event)
+
+    async def is_revoked(self, session_id: str) -> bool:
+        """Raises RedisError if a possibly revoked session cannot be confirmed"""
+        if self._filter is not None and session_id not in self._filter:
+            CHECKS.inc("memory")
+            return False
+        CHECKS.inc("redis")
+        session_end = await get_redis().zscore(REVOKED_KEY, session_id)
+        return session_end is not None and session_end > time.time()
+
+    async def claim_refresh(self, token_id: str, session_end: float) -> bool:
+        """Mark a refresh token used; False if it was used before (replayed)"""
+        ttl = max(1, int(session_end - time.time()))
+        return bool(await get_redis().set(USED_KEY_PREFIX + token_id, 1, nx=True, ex=ttl))
+
+    def _apply(self, event: dict):
+        session_id = event.get("session_id")
+        if not session_id:
+            return
+        if self._filter is not None:
+            self._filter.add(session_id)
+        if self._loading is not None:
+            self._loading.add(session_id)
+
+
+token_revocations = TokenRevocations(settings.revocation_bloom_capacity)
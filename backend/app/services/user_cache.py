@@ -0,0 +1,127 @@
+from typing import Optional
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.database import AsyncSessionLocal
+from app.models.user import User
+from app.services.event_bus import event_bus
+from app.utils.cache import TTLCache
+from app.utils.metrics import registry
+
+USERS_CHANNEL = "users"
+
+# Everything a request needs to know about its user; never the password hash
+USER_COLUMNS = (
+    User.id,
+    User.uuid,
+    User.email,
+    User.phone,
+    User.username,
+    User.full_name,
+    User.role,
+    User.is_active,
+    User.token_version,
+    User.created_at,
+    User.updated_at,
+)
+
+
+class UserCache:
+    """
+    Active users by id for authenticating requests, so a valid token costs
+    no query. Changes to a user are broadcast to every worker through the
+    event bus; the TTL bounds staleness if a broadcast is lost.
+
+    Also knows the token_version of every user whose tokens were revoked,
+    so tokens can be checked without loading the user at all. Both are
+    reloaded whenever the event bus subscription was interrupted.
+    """
+
+    def __init__(self, max_size: int, ttl_seconds: float, session_factory=AsyncSessionLocal):
+        self._cache = TTLCache(max_size=max_size, ttl_seconds=ttl_seconds)
+        self._session_factory = session_factory
+        self._subscribed = False
+        # Bumped by every invalidation: a load that overlapped one may have read stale data
+        self._version = 0
+        self._token_versions = {}  # user id -> token_version, only where above 0
+
+    def _subscribe(self):
+        if not self._subscribed:
+            event_bus.add_handler(USERS_CHANNEL, self._apply)
+            event_bus.add_resync_handler(self._resync)
+            self._subscribed = True
+
+    async def _resync(self):
+        """Changes broadcast while this worker was not subscribed were missed"""
+        self.clear()
+        async with self._session_factory() as db:
+            revoked = await self.load_token_versions(db)
+        print(f"[SECURITY] Token versions reloaded: {revoked} users with revoked tokens")
+
+    async def load_token_versions(self, db: AsyncSession) -> int:
+        """Load the token versions of revoked users (on startup); returns how many"""
+        self._subscribe()
+        result = await db.execute(select(User.id, User.token_version).where(User.token_version > 0))
+        for user_id, token_version in result:
+            self._set_token_version(user_id, token_version)
+        return len(self._token_versions)
+
+    def token_is_current(self, user_id: int, token_version: int) -> bool:
+        """Whether a token of user_id minted at token_version was not revoked since"""
+        return token_version >= self._token_versions.get(user_id, 0)
+
+    def _set_token_version(self, user_id: int, token_version: int):
+        if token_version > self._token_versions.get(user_id, 0):
+            self._token_versions[user_id] = token_version
+
+    async def get(self, db: AsyncSession, user_id: int) -> Optional[User]:
+        """
+        The user with user_id as a fresh, session-less User instance, or None
+        if there is no such user. Inactive users are returned but not cached.
+        """
+        self._subscribe()
+
+        snapshot = self._cache.get(user_id)
+        if snapshot is None:
+            version = self._version
+            row = (await db.execute(select(*USER_COLUMNS).where(User.id == user_id))).one_or_none()
+            if row is None:
+                return None
+            snapshot = dict(row._mapping)
+            if snapshot["is_active"] and version == self._version:
+                self._cache.set(user_id, snapshot)
+        return User(**snapshot)
+
+    def invalidate(self, user_id: int):
+        self._version += 1
+        self._cache.invalidate(user_id)
+
+    async def publish_change(self, user: User):
+        """Drop a modified user here and in every other worker"""
+        event = {"user_id": user.id, "token_version": user.token_version or 0}
+        self._apply(event)
+        await event_bus.publish(USERS_CHANNEL, event)
+
+    def _apply(self, event: dict):
+        if event.get("user_id") is not None:
+            self.invalidate(event["user_id"])
+            self._set_token_version(event["user_id"], event.get("token_version", 0))
+
+    def clear(self):
+        self._version += 1
+        self._cache.clear()
+
+    def stats(self) -> dict:
+        return self._cache.stats()
+
+
+user_cache = UserCache(
+    max_size=settings.user_cache_max_size,
+    ttl_seconds=settings.user_cache_ttl_seconds,
+)
+
+registry.gauge_function("user_cache_hits", "Authenticated user cache hits", lambda: user_cache.stats()["hits"])
+registry.gauge_function("user_cache_misses", "Authenticated user cache misses", lambda: user_cache.stats()["misses"])
+registry.gauge_function("user_cache_hit_ratio", "Authenticated user cache hit ratio", lambda: user_cache.stats()["hit_ratio"])
+registry.gauge_function("user_cache_size", "Entries in the authenticated user cache", lambda: user_cache.stats()["size"])
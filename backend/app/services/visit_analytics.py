@@ -0,0 +1,277 @@
+from bisect import bisect_right
+from collections import Counter
+from datetime import date, datetime, timedelta, timezone
+from typing import List, Optional
+from sqlalchemy import delete, func, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.models.pass_model import Pass, Visit
+from app.models.visit_analytics import ALL_COMPANIES, VisitAnalytics
+from app.services.pass_cache import as_utc
+from app.services.statistics import MAX_VISIT_LENGTH, hour_bucket
+
+# Upper edges (minutes) of the dwell time bins; the last bin is open-ended
+DWELL_BINS = (5, 10, 15, 30, 45, 60, 90, 120, 180, 240, 360, 480, 720, 1440)
+PERCENTILES = (50, 90, 95)
+
+# Plain rows load much faster than ORM objects for year-long ranges
+_ROLLUP_COLUMNS = (
+    VisitAnalytics.company, VisitAnalytics.bucket, VisitAnalytics.entries,
+    VisitAnalytics.exits, VisitAnalytics.peak_occupancy, VisitAnalytics.dwell_histogram,
+)
+
+HOUR = timedelta(hours=1)
+DAY = timedelta(days=1)
+
+
+def dwell_bin(minutes: float) -> int:
+    return bisect_right(DWELL_BINS, minutes)
+
+
+def percentile(histogram: list, q: float) -> Optional[float]:
+    """Dwell minutes at quantile q (0-1), interpolated within its bin"""
+    total = sum(histogram)
+    if not total:
+        return None
+    rank = q * total
+    seen = 0
+    for index, count in enumerate(histogram):
+        if count and seen + count >= rank:
+            low = DWELL_BINS[index - 1] if index else 0
+            if index == len(DWELL_BINS):
+                return float(low)
+            return round(low + (DWELL_BINS[index] - low) * (rank - seen) / count, 1)
+        seen += count
+    return float(DWELL_BINS[-1])
+
+
+def _day_start(at: datetime) -> datetime:
+    return at.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+class _Bucket:
+    __slots__ = ("entries", "exits", "peak", "histogram")
+
+    def __init__(self):
+        self.entries = 0
+        self.exits = 0
+        self.peak = 0
+        self.histogram = [0] * (len(DWELL_BINS) + 1)
+
+    def merge(self, row):
+        self.entries += row.entries
+        self.exits += row.exits
+        self.peak = max(self.peak, row.peak_occupancy)
+        for index, count in enumerate(row.dwell_histogram or ()):
+            self.histogram[index] += count
+
+    def as_dict(self) -> dict:
+        completed = sum(self.histogram)
+        summary = {
+            "entries": self.entries,
+            "exits": self.exits,
+            "peak_occupancy": self.peak,
+            "completed_visits": completed,
+        }
+        for q in PERCENTILES:
+            summary[f"dwell_p{q}_minutes"] = percentile(self.histogram, q / 100) if completed else None
+        return summary
+
+
+def sweep_hours(visits, start: datetime, end: datetime) -> dict:
+    """
+    Sweep the entries and exits of (company, entry_time, exit_time) visits
+    over the hours of [start, end) into {(company, hour): _Bucket}. Visits
+    that began before start count as on site when the window opens.
+    """
+    occupancy = Counter()  # on site per company at the current sweep position
+    events = []
+    for company, entry_time, exit_time in visits:
+        entry_time, exit_time = as_utc(entry_time), as_utc(exit_time)
+        if entry_time < start:
+            occupancy[company] += 1
+            occupancy[ALL_COMPANIES] += 1
+        else:
+            events.append((entry_time, 1, company, None))
+        if exit_time is not None and exit_time < end:
+            dwell = max((exit_time - entry_time).total_seconds() / 60, 0)
+            events.append((exit_time, -1, company, dwell_bin(dwell)))
+    # Exits before entries at the same instant, so a hand-over is not a peak
+    events.sort(key=lambda event: (event[0], event[1]))
+
+    buckets = {}
+    index = 0
+    hour = start
+    while hour < end:
+        # Everyone still on site from the previous hour counts towards this hour's peak
+        for company, on_site in occupancy.items():
+            if on_site > 0:
+                buckets.setdefault((company, hour), _Bucket()).peak = on_site
+        buckets.setdefault((ALL_COMPANIES, hour), _Bucket())
+
+        while index < len(events) and events[index][0] < hour + HOUR:
+            _, delta, company, dwell_index = events[index]
+            for key in (company, ALL_COMPANIES):
+                occupancy[key] += delta
+                bucket = buckets.setdefault((key, hour), _Bucket())
+                if delta > 0:
+                    bucket.entries += 1
+                    bucket.peak = max(bucket.peak, occupancy[key])
+                else:
+                    bucket.exits += 1
+                    bucket.histogram[dwell_index] += 1
+            index += 1
+        hour += HOUR
+    return buckets
+
+
+class VisitAnalyticsRollup:
+    """
+    Hourly and daily visit analytics per company, precomputed into the
+    visit_analytics table by a Celery job so that reading a year of data
+    never touches the visits table.
+    """
+
+    @staticmethod
+    async def _compute_hours(db: AsyncSession, start: datetime, end: datetime) -> dict:
+        company = func.coalesce(Pass.guest_company, "")
+        query = (
+            select(company, Visit.entry_time, Visit.exit_time)
+            .join(Pass, Visit.pass_id == Pass.id)
+            .where(
+                Visit.entry_time >= start - MAX_VISIT_LENGTH,
+                Visit.entry_time < end,
+                or_(Visit.exit_time == None, Visit.exit_time >= start),
+            )
+            .execution_options(yield_per=5000)
+        )
+        visits = []
+        async for rows in (await db.stream(query)).partitions():
+            visits.extend(rows)
+        return sweep_hours(visits, start, end)
+
+    @staticmethod
+    def _rows(period: str, buckets: dict) -> list:
+        return [
+            {
+                "company": name,
+                "period": period,
+                "bucket": bucket_start,
+                "entries": bucket.entries,
+                "exits": bucket.exits,
+                "peak_occupancy": bucket.peak,
+                "dwell_histogram": bucket.histogram,
+            }
+            for (name, bucket_start), bucket in buckets.items()
+        ]
+
+    @staticmethod
+    async def _replace(db: AsyncSession, period: str, start: datetime, end: datetime, rows: list):
+        await db.execute(
+            delete(VisitAnalytics)
+            .where(VisitAnalytics.period == period, VisitAnalytics.bucket >= start, VisitAnalytics.bucket < end)
+        )
+        for offset in range(0, len(rows), 1000):
+            await db.execute(VisitAnalytics.__table__.insert(), rows[offset:offset + 1000])
+
+    @staticmethod
+    async def refresh(db: AsyncSession, start: datetime, end: datetime):
+        """Recompute the hours of [start, end) and the days they fall in"""
+        start, end = hour_bucket(start), hour_bucket(end)
+        hours = await VisitAnalyticsRollup._compute_hours(db, start, end)
+        await VisitAnalyticsRollup._replace(db, "hour", start, end, VisitAnalyticsRollup._rows("hour", hours))
+
+        # Days are rolled up from their stored hours, including the ones outside the window
+        day_start, day_end = _day_start(start), _day_start(end - HOUR) + DAY
+        result = await db.execute(
+            select(*_ROLLUP_COLUMNS)
+            .where(VisitAnalytics.period == "hour", VisitAnalytics.bucket >= day_start, VisitAnalytics.bucket < day_end)
+        )
+        days = {}
+        for row in result.all():
+            days.setdefault((row.company, _day_start(as_utc(row.bucket))), _Bucket()).merge(row)
+        await VisitAnalyticsRollup._replace(db, "day", day_start, day_end, VisitAnalyticsRollup._rows("day", days))
+        await db.commit()
+
+    @staticmethod
+    async def refresh_recent(db: AsyncSession) -> int:
+        """
+        Incremental refresh (Celery beat): recompute the last few hours, which
+        late offline scans and the visit journal may still change, or catch up
+        from the last computed hour, or backfill all history on first run.
+        Works a day at a time. Returns the number of hours computed.
+        """
+        now = datetime.now(timezone.utc)
+        end = hour_bucket(now) + HOUR
+        start = hour_bucket(now - timedelta(hours=settings.analytics_refresh_lookback_hours))
+
+        latest = (await db.execute(
+            select(func.max(VisitAnalytics.bucket))
+            .where(VisitAnalytics.company == ALL_COMPANIES, VisitAnalytics.period == "hour")
+        )).scalar()
+        if latest is None:
+            first_visit = (await db.execute(select(func.min(Visit.entry_time)))).scalar()
+            if first_visit is not None:
+                start = min(start, hour_bucket(first_visit))
+        else:
+            start = min(start, hour_bucket(latest))
+
+        chunk_start = start
+        while chunk_start < end:
+            chunk_end = min(chunk_start + DAY, end)
+            await VisitAnalyticsRollup.refresh(db, chunk_start, chunk_end)
+            chunk_start = chunk_end
+        return int((end - start) / HOUR)
+
+    @staticmethod
+    def _range(date_from: date, date_to: date):
+        start = datetime.combine(date_from, datetime.min.time(), tzinfo=timezone.utc)
+        return start, datetime.combine(date_to, datetime.min.time(), tzinfo=timezone.utc) + DAY
+
+    @staticmethod
+    async def series(
+        db: AsyncSession, date_from: date, date_to: date, period: str = "hour", company: Optional[str] = None
+    ) -> List[dict]:
+        """Entries, exits, peak occupancy and dwell percentiles per hour or day, gaps filled with zeros"""
+        start, end = VisitAnalyticsRollup._range(date_from, date_to)
+        result = await db.execute(
+            select(*_ROLLUP_COLUMNS)
+            .where(
+                VisitAnalytics.company == (ALL_COMPANIES if company is None else company),
+                VisitAnalytics.period == period,
+                VisitAnalytics.bucket >= start,
+                VisitAnalytics.bucket < end,
+            )
+        )
+        stored = {as_utc(row.bucket): row for row in result.all()}
+
+        series = []
+        step = HOUR if period == "hour" else DAY
+        bucket_start = start
+        while bucket_start < end:
+            bucket = _Bucket()
+            if bucket_start in stored:
+                bucket.merge(stored[bucket_start])
+            series.append({"bucket": bucket_start.isoformat(), **bucket.as_dict()})
+            bucket_start += step
+        return series
+
+    @staticmethod
+    async def companies(db: AsyncSession, date_from: date, date_to: date) -> List[dict]:
+        """Totals, peak occupancy and dwell percentiles per company over a date range, busiest first"""
+        start, end = VisitAnalyticsRollup._range(date_from, date_to)
+        result = await db.execute(
+            select(*_ROLLUP_COLUMNS)
+            .where(
+                VisitAnalytics.company != ALL_COMPANIES,
+                VisitAnalytics.period == "day",
+                VisitAnalytics.bucket >= start,
+                VisitAnalytics.bucket < end,
+            )
+        )
+        totals = {}
+        for row in result.all():
+            totals.setdefault(row.company, _Bucket()).merge(row)
+        summary = [{"company": name, **bucket.as_dict()} for name, bucket in totals.items()]
+        return sorted(summary, key=lambda item: (-item["entries"], item["company"]))
@@ -0,0 +1,370 @@
+import asyncio
+import json
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Iterable, Optional
+from sqlalchemy import String, cast, func, literal, or_, select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.models.pass_model import Visit
+from app.services.pass_cache import as_utc
+from app.services.redis_client import get_redis
+
+OPEN_VISITS_KEY = "visits:open"            # pass_id -> JSON of the open visit
+JOURNAL_KEY = "visits:journal"             # stream of entry/exit records
+FLUSHED_KEY = "visits:journal:flushed"     # last stream id written to the database
+SEEDED_KEY = "visits:open:seeded"         # set while the open visit hash matches the database
+FLUSH_LOCK_KEY = "visits:journal:lock"
+LAST_EXIT_KEY = "visits:last_exit"         # sorted set of pass_id by last exit (ms) within the replay horizon
+
+# Decide ENTRY/EXIT from the open visit hash and journal the change in one
+# atomic step. An exit record carries the whole visit so the flusher can
+# write it even if the matching entry was never flushed. Nothing is decided
+# from a hash that has not been seeded from the database. A scan older than
+# the open visit or the last exit of the pass is stale.
+TOGGLE_SCRIPT = """
+if redis.call('EXISTS', KEYS[3]) == 0 then
+    return {'UNSEEDED', ''}
+end
+local last_exit = redis.call('ZSCORE', KEYS[4], ARGV[1])
+if last_exit and tonumber(ARGV[2]) < tonumber(last_exit) then
+    return {'STALE_EXIT', ''}
+end
+local open = redis.call('HGET', KEYS[1], ARGV[1])
+if open then
+    local visit = cjson.decode(open)
+    if tonumber(ARGV[2]) < visit.entry_ms then
+        return {'STALE', open}
+    end
+    redis.call('HDEL', KEYS[1], ARGV[1])
+    redis.call('ZADD', KEYS[4], ARGV[2], ARGV[1])
+    redis.call('XADD', KEYS[2], '*',
+        'op', 'exit', 'journal_id', visit.journal_id, 'pass_id', ARGV[1],
+        'entry_time', visit.entry_time, 'entry_gate_id', visit.gate_id,
+        'exit_time', ARGV[3], 'exit_gate_id', ARGV[4])
+    return {'EXIT', open}
+end
+if ARGV[6] == '1' then
+    return {'NONE', ''}
+end
+local visit = cjson.encode({
+    journal_id = ARGV[5], entry_time = ARGV[3], entry_ms = tonumber(ARGV[2]), gate_id = ARGV[4]
+})
+redis.call('HSET', KEYS[1], ARGV[1], visit)
+redis.call('XADD', KEYS[2], '*',
+    'op', 'entry', 'journal_id', ARGV[5], 'pass_id', ARGV[1],
+    'entry_time', ARGV[3], 'entry_gate_id', ARGV[4])
+return {'ENTRY', visit}
+"""
+
+RELEASE_LOCK_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+EXTEND_LOCK_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('PEXPIRE', KEYS[1], ARGV[2])
+end
+return 0
+"""
+
+
+def _horizon_ms() -> int:
+    horizon = datetime.now(timezone.utc) - timedelta(hours=settings.scan_replay_horizon_hours)
+    return int(horizon.timestamp() * 1000)
+
+
+class JournalNotReady(Exception):
+    """Raised while the open visit hash is being rebuilt; write the scan through instead"""
+
+
+def _toggle_result(action: str, visit_json: str, at: datetime) -> Optional[dict]:
+    if action == "NONE":
+        return None
+    if action == "STALE_EXIT":
+        return {"action": "STALE", "reason": "Scan predates last visit"}
+    visit = json.loads(visit_json)
+    entry_time = datetime.fromisoformat(visit["entry_time"])
+    if action == "STALE":
+        return {"action": "STALE", "reason": "Scan predates current visit", "entry_time": entry_time}
+    if action == "ENTRY":
+        return {"action": "ENTRY", "visit_id": None, "entry_time": entry_time, "exit_time": None}
+    return {
+        "action": "EXIT",
+        "visit_id": None,
+        "entry_time": entry_time,
+        "exit_time": at,
+        "duration_minutes": int((at - entry_time).total_seconds() / 60),
+    }
+
+
+def _visit_row(fields: dict) -> dict:
+    exit_time = fields.get("exit_time")
+    return {
+        "journal_id": fields["journal_id"],
+        "pass_id": int(fields["pass_id"]),
+        "entry_time": datetime.fromisoformat(fields["entry_time"]),
+        "entry_gate_id": fields["entry_gate_id"] or None,
+        "exit_time": datetime.fromisoformat(exit_time) if exit_time else None,
+        "exit_gate_id": fields.get("exit_gate_id") or None,
+    }
+
+
+class VisitJournal:
+    """
+    Write-behind visits (settings.visit_write_behind): scans toggle the open
+    visit in Redis and append to a Redis Stream; a background flusher writes
+    the stream to the visits table in batches. Records are keyed by
+    journal_id, so replaying them after a crash is harmless.
+
+    Scans are only journaled while the open visit hash is seeded. Scans
+    written through to the database in the meantime make the hash stale, so
+    the seed marker is dropped and the flusher rebuilds the hash once the
+    journal is drained.
+    """
+
+    def __init__(self):
+        self._toggle = None
+        self._release = None
+        self._extend = None
+        self._seed_stale = False
+
+    def _scripts(self, redis):
+        if self._toggle is None:
+            self._toggle = redis.register_script(TOGGLE_SCRIPT)
+            self._release = redis.register_script(RELEASE_LOCK_SCRIPT)
+            self._extend = redis.register_script(EXTEND_LOCK_SCRIPT)
+        return self._toggle, self._release, self._extend
+
+    def mark_diverged(self):
+        """A scan was written through to the database while Redis was unreachable"""
+        self._seed_stale = True
+
+    async def invalidate_seed(self):
+        """Make every worker write through until the open visit hash is rebuilt"""
+        await get_redis().delete(SEEDED_KEY)
+        self._seed_stale = False
+
+    async def toggle_many(self, scans: Iterable[tuple], exit_only: bool = False) -> list:
+        """
+        Toggle (pass_id, at, gate_id) scans in order in one round trip.
+        Each result is a toggle dict like ScanEngine.toggle_visit returns,
+        {"action": "STALE", "reason": ...} for a scan older than the open
+        visit or the last exit of the pass, or None
+        when exit_only is set and the pass has no open visit. Raises
+        JournalNotReady if the open visit hash is not seeded.
+        """
+        scans = list(scans)
+        redis = get_redis()
+        toggle, _, _ = self._scripts(redis)
+        if self._seed_stale:
+            await self.invalidate_seed()
+        # One transaction, so every scan sees the same seed state
+        async with redis.pipeline(transaction=True) as pipe:
+            for pass_id, at, gate_id in scans:
+                await toggle(
+                    keys=[OPEN_VISITS_KEY, JOURNAL_KEY, SEEDED_KEY, LAST_EXIT_KEY],
+                    args=[
+                        pass_id,
+                        int(at.timestamp() * 1000),
+                        at.isoformat(),
+                        gate_id or "",
+                        uuid.uuid4().hex,
+                        "1" if exit_only else "0",
+                    ],
+                    client=pipe,
+                )
+            replies = await pipe.execute()
+
+        if any(action == "UNSEEDED" for action, _ in replies):
+            raise JournalNotReady()
+        return [
+            _toggle_result(action, visit_json, at)
+            for (action, visit_json), (_, at, _) in zip(replies, scans)
+        ]
+
+    async def toggle(self, pass_id: int, at: datetime, gate_id: Optional[str] = None) -> dict:
+        return (await self.toggle_many([(pass_id, at, gate_id)]))[0]
+
+    async def close(self, pass_id: int, at: datetime, gate_id: Optional[str] = None) -> Optional[dict]:
+        return (await self.toggle_many([(pass_id, at, gate_id)], exit_only=True))[0]
+
+    @staticmethod
+    async def _write(db: AsyncSession, rows: list):
+        """
+        Entries are inserted unless already present; exits insert or complete
+        the visit. Rows go in journal order so the open-visit unique index
+        sees each exit before the next entry of the same pass.
+        """
+        dialect = db.get_bind().dialect.name
+        insert = (pg_insert if dialect == "postgresql" else sqlite_insert)(Visit)
+        statement = insert.on_conflict_do_update(
+            index_elements=[Visit.journal_id],
+            set_={"exit_time": insert.excluded.exit_time, "exit_gate_id": insert.excluded.exit_gate_id},
+            where=insert.excluded.exit_time != None,
+        )
+        await db.execute(statement.values(rows))
+
+    @staticmethod
+    async def _close_superseded(db: AsyncSession, entries: dict, journal_ids: set):
+        """
+        A journaled entry means the pass had no open visit. An open visit the
+        database has besides the journal's own (written through meanwhile) is
+        closed at the first journaled entry of its pass rather than left open.
+        """
+        if not entries:
+            return
+        # SQLite spells greatest() as the scalar max()
+        greatest = func.greatest if db.get_bind().dialect.name == "postgresql" else func.max
+        result = await db.execute(
+            select(Visit.id, Visit.pass_id)
+            .where(
+                Visit.pass_id.in_(entries),
+                Visit.exit_time == None,
+                or_(Visit.journal_id == None, Visit.journal_id.notin_(journal_ids)),
+            )
+        )
+        for visit_id, pass_id in result.all():
+            entry = entries[pass_id]
+            await db.execute(
+                update(Visit)
+                .where(Visit.id == visit_id)
+                .values(
+                    exit_time=greatest(Visit.entry_time, entry["entry_time"]),
+                    exit_gate_id=entry["entry_gate_id"],
+                )
+            )
+            print(f"[JOURNAL] Closed visit {visit_id} of pass {pass_id} opened outside the journal")
+
+    async def flush(self, db: AsyncSession, batch_size: int) -> int:
+        """Write one batch of unflushed journal records; returns how many"""
+        redis = get_redis()
+        flushed = await redis.get(FLUSHED_KEY) or "0"
+        records = await redis.xrange(JOURNAL_KEY, min=f"({flushed}", count=batch_size)
+        if not records:
+            return 0
+
+        # An entry and its exit in the same batch become one complete row,
+        # kept at the position of the entry
+        rows = {}
+        entries = {}  # pass_id -> first entry of the batch
+        for _, fields in records:
+            row = _visit_row(fields)
+            rows[row["journal_id"]] = row
+            if fields["op"] == "entry":
+                entries.setdefault(row["pass_id"], row)
+        journal_ids = set(rows)
+        rows = list(rows.values())
+        try:
+            await self._close_superseded(db, entries, journal_ids)
+            await self._write(db, rows)
+            await db.commit()
+        except IntegrityError:
+            # E.g. the pass was deleted meanwhile: apply the records one by
+            # one and drop only the ones the database rejects
+            await db.rollback()
+            await self._close_superseded(db, entries, journal_ids)
+            for row in rows:
+                try:
+                    async with db.begin_nested():
+                        await self._write(db, [row])
+                except IntegrityError as e:
+                    print(f"[JOURNAL] Skipped record {row['journal_id']} of pass {row['pass_id']}: {e.orig}")
+            await db.commit()
+
+        last_id = records[-1][0]
+        async with redis.pipeline(transaction=True) as pipe:
+            pipe.set(FLUSHED_KEY, last_id)
+            pipe.xtrim(JOURNAL_KEY, minid=last_id)
+            # Scans older than the horizon are rejected before they get here
+            pipe.zremrangebyscore(LAST_EXIT_KEY, "-inf", f"({_horizon_ms()}")
+            await pipe.execute()
+        return len(records)
+
+    async def seed(self, db: AsyncSession):
+        """
+        Rebuild the open visit hash and the recent last exits from the
+        database and let scans be journaled again. The journal must be
+        drained first.
+        """
+        result = await db.execute(
+            update(Visit)
+            .where(Visit.exit_time == None)
+            .values(journal_id=func.coalesce(Visit.journal_id, literal("v") + cast(Visit.id, String)))
+            .returning(Visit.pass_id, Visit.journal_id, Visit.entry_time, Visit.entry_gate_id)
+        )
+        rows = result.all()
+        result = await db.execute(
+            select(Visit.pass_id, func.max(Visit.exit_time))
+            .where(Visit.exit_time >= datetime.fromtimestamp(_horizon_ms() / 1000, timezone.utc))
+            .group_by(Visit.pass_id)
+        )
+        last_exits = {pass_id: int(as_utc(exit_time).timestamp() * 1000) for pass_id, exit_time in result.all()}
+        await db.commit()
+
+        visits = {}
+        for row in rows:
+            entry_time = as_utc(row.entry_time)
+            visits[row.pass_id] = json.dumps({
+                "journal_id": row.journal_id,
+                "entry_time": entry_time.isoformat(),
+                "entry_ms": int(entry_time.timestamp() * 1000),
+                "gate_id": row.entry_gate_id or "",
+            })
+        async with get_redis().pipeline(transaction=True) as pipe:
+            pipe.delete(OPEN_VISITS_KEY, LAST_EXIT_KEY)
+            if visits:
+                pipe.hset(OPEN_VISITS_KEY, mapping=visits)
+            if last_exits:
+                pipe.zadd(LAST_EXIT_KEY, last_exits)
+            pipe.set(SEEDED_KEY, "1")
+            await pipe.execute()
+        print(f"[JOURNAL] Seeded {len(rows)} open visits")
+
+    async def run_flusher(self, session_factory):
+        """
+        Background loop of every API worker. A short Redis lease makes one
+        worker at a time the flusher; if it dies another takes over and
+        resumes from the last flushed stream id. The first run seeds the
+        open visit hash, so scans are written through until then.
+        """
+        interval = settings.visit_journal_flush_interval_seconds
+        batch_size = settings.visit_journal_batch_size
+        lease_ms = int(interval * 10000)
+        owner = uuid.uuid4().hex
+        while True:
+            try:
+                redis = get_redis()
+                _, release, extend = self._scripts(redis)
+                if self._seed_stale:
+                    await self.invalidate_seed()
+                if await redis.set(FLUSH_LOCK_KEY, owner, nx=True, px=lease_ms):
+                    try:
+                        # Unseeded means nothing new is journaled, so once
+                        # drained the journal is in the database for good
+                        seeded = await redis.exists(SEEDED_KEY)
+                        async with session_factory() as db:
+                            drained = True
+                            while await self.flush(db, batch_size) == batch_size:
+                                if not await extend(keys=[FLUSH_LOCK_KEY], args=[owner, lease_ms]):
+                                    drained = False  # lease lost, another worker continues
+                                    break
+                            if drained and not seeded:
+                                await self.seed(db)
+                    finally:
+                        await release(keys=[FLUSH_LOCK_KEY], args=[owner])
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"[JOURNAL] Flush failed: {e}")
+            await asyncio.sleep(interval)
+
+
+visit_journal = VisitJournal()
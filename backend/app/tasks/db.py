@@ -0,0 +1,28 @@
+import asyncio
+from contextlib import asynccontextmanager
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import NullPool
+
+from app.config import settings
+
+
+@asynccontextmanager
+async def task_session():
+    """
+    Database session for Celery tasks.
+    Every task runs in its own event loop, so connections are not pooled
+    across tasks (asyncpg connections are bound to the loop that made them).
+    """
+    engine = create_async_engine(settings.database_url, poolclass=NullPool)
+    SessionLocal = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    try:
+        async with SessionLocal() as session:
+            yield session
+    finally:
+        await engine.dispose()
+
+
+def run_async(coro):
+    """Run a coroutine to completion from synchronous Celery task code"""
+    return asyncio.run(coro)
@@ -0,0 +1,71 @@
+from celery import shared_task
+from datetime import datetime, timedelta, timezone
+
+from app.config import settings
+from app.services.occupancy import OccupancyTracker
+from app.services.offline_feed import purge_changes
+from app.services.pass_status import PassStatusService
+from app.services.redis_client import create_redis
+from app.services.statistics import stats_rollup
+from app.services.visit_analytics import VisitAnalyticsRollup
+from app.tasks.db import task_session, run_async
+
+async def _sweep_pass_statuses():
+    now = datetime.now(timezone.utc)
+    async with task_session() as db:
+        result = await PassStatusService.sweep(
+            db,
+            now=now,
+            chunk_size=settings.pass_sweep_chunk_size
+        )
+        result["purged_changes"] = await purge_changes(
+            db,
+            before=now - timedelta(days=settings.pass_change_retention_days),
+            chunk_size=settings.pass_sweep_chunk_size
+        )
+        return result
+
+@shared_task
+def sweep_pass_statuses_task():
+    """Periodic task: expire, activate and mark revoked passes in bulk, purge the old offline feed"""
+    result = run_async(_sweep_pass_statuses())
+    if any(result.values()):
+        print(f"[SWEEPER] Pass statuses updated: {result}")
+    return result
+
+async def _rebuild_occupancy():
+    redis = create_redis()
+    try:
+        async with task_session() as db:
+            return await OccupancyTracker.rebuild(db, redis)
+    finally:
+        await redis.aclose()
+
+@shared_task
+def rebuild_occupancy_task():
+    """Periodic task: rebuild the live occupancy roster from open visits"""
+    on_site = run_async(_rebuild_occupancy())
+    print(f"[OCCUPANCY] Roster rebuilt: {on_site} on site")
+    return {"on_site": on_site}
+
+async def _reconcile_stats_rollup():
+    async with task_session() as db:
+        return await stats_rollup.reconcile(db)
+
+@shared_task
+def reconcile_stats_rollup_task():
+    """Periodic task: recount the statistics rollup of the last two days"""
+    counters = run_async(_reconcile_stats_rollup())
+    print(f"[STATS] Rollup reconciled: {counters} counters")
+    return {"counters": counters}
+
+async def _refresh_visit_analytics():
+    async with task_session() as db:
+        return await VisitAnalyticsRollup.refresh_recent(db)
+
+@shared_task
+def refresh_visit_analytics_task():
+    """Periodic task: recompute the visit analytics of recent hours"""
+    hours = run_async(_refresh_visit_analytics())
+    print(f"[ANALYTICS] Visit analytics refreshed: {hours} hours")
+    return {"hours": hours}
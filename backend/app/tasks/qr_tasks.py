@@ -0,0 +1,20 @@
+from celery import shared_task
+from typing import List
+from sqlalchemy import select
+
+from app.models.pass_model import Pass
+from app.services.qr_images import qr_images
+from app.tasks.db import task_session, run_async
+
+async def _prerender_qr_codes(pass_ids: List[int], fmt: str, box_size: int):
+    async with task_session() as db:
+        result = await db.execute(select(Pass.qr_code).where(Pass.id.in_(pass_ids)))
+        codes = result.scalars().all()
+    return await qr_images.warm(codes, fmt, box_size)
+
+@shared_task
+def prerender_qr_codes_task(pass_ids: List[int], fmt: str = "png", box_size: int = 10):
+    """Render the QR images of passes into the disk cache ahead of first use"""
+    rendered = run_async(_prerender_qr_codes(pass_ids, fmt, box_size))
+    print(f"[QR] Pre-rendered {rendered} of {len(pass_ids)} QR images")
+    return {"rendered": rendered}
@@ -0,0 +1,30 @@
+from celery import shared_task
+
+from app.schemas.report_schema import ReportRequest
+from app.services.reports import ReportBuilder, purge_reports, report_path
+from app.tasks.db import task_session, run_async
+
+async def _build_report(request: ReportRequest, path, progress):
+    async with task_session() as db:
+        return await ReportBuilder(request, progress).build(db, path)
+
+@shared_task(bind=True)
+def build_report_task(self, report_id: str, spec: dict):
+    """Build a report file; progress is published as the PROGRESS task state"""
+    request = ReportRequest.model_validate(spec)
+    path = report_path(report_id, request.format)
+
+    def progress(done: int, total: int):
+        self.update_state(state="PROGRESS", meta={"done": done, "total": total})
+
+    rows = run_async(_build_report(request, path, progress))
+    print(f"[REPORTS] Report {report_id} built: {request.report}, {rows} visits")
+    return {"file": path.name, "rows": rows}
+
+@shared_task
+def purge_reports_task():
+    """Periodic task: delete expired report files"""
+    removed = purge_reports()
+    if removed:
+        print(f"[REPORTS] Expired report files removed: {removed}")
+    return {"removed": removed}
@@ -1,4 +1,4 @@
-from .security import hash_password, verify_password, create_access_token, verify_token
+from .security import hash_password, verify_password, create_access_token, access_token_claims, create_refresh_token, verify_token
 from .encryption import DataEncryption, encrypt_email, decrypt_email, encrypt_phone, decrypt_phone
 from .audit import AuditLogger, audit_create, audit_update, audit_delete, audit_read
 from .compliance import ComplianceManager
@@ -8,6 +8,8 @@ __all__ = [
     "hash_password",
     "verify_password",
     "create_access_token",
+    "access_token_claims",
+    "create_refresh_token",
     "verify_token",
     "DataEncryption",
     "encrypt_email",
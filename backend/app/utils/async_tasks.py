@@ -5,7 +5,9 @@ from app.tasks.notifications_tasks import (
     send_expiration_reminder_task,
     send_admin_alert_task
 )
+from app.tasks.qr_tasks import prerender_qr_codes_task
 from datetime import datetime
+from typing import List
 
 class AsyncTaskRunner:
     """Wrapper for Celery tasks"""
@@ -45,3 +47,8 @@ class AsyncTaskRunner:
             alert_type=alert_type,
             details=details
         )
+    
+    @staticmethod
+    def prerender_qr_codes(pass_ids: List[int]):
+        """Queue rendering of pass QR images into the disk cache"""
+        prerender_qr_codes_task.delay(pass_ids=pass_ids)
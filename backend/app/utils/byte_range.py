@@ -0,0 +1,41 @@
+from pathlib import Path
+from typing import Iterator, Optional, Tuple
+
+
+def parse_byte_range(header: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+    """
+    First and last byte (inclusive) requested by a Range header, or None to
+    send the whole file. Only single ranges are honoured; a header asking for
+    several (or a malformed one) is answered with the whole file, as RFC 9110
+    allows. Raises ValueError if the range cannot be satisfied.
+    """
+    if not header or not header.startswith("bytes=") or "," in header:
+        return None
+    start, _, end = header[len("bytes="):].strip().partition("-")
+    if not (start or end).isdigit() or (start and end and not end.isdigit()):
+        return None
+    if not start:
+        # Suffix range: the last N bytes
+        if int(end) == 0 or size == 0:
+            raise ValueError("Range not satisfiable")
+        return max(size - int(end), 0), size - 1
+    first = int(start)
+    last = int(end) if end else size - 1
+    if first >= size:
+        raise ValueError("Range not satisfiable")
+    if last < first:
+        return None
+    return first, min(last, size - 1)
+
+
+def iter_file(path: Path, first: int, last: int, chunk_size: int = 64 * 1024) -> Iterator[bytes]:
+    """Bytes first..last (inclusive) of a file, a chunk at a time"""
+    with open(path, "rb") as file:
+        file.seek(first)
+        remaining = last - first + 1
+        while remaining > 0:
+            chunk = file.read(min(chunk_size, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
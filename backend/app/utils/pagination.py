@@ -0,0 +1,50 @@
+import base64
+import json
+from datetime import datetime
+from typing import Callable, Optional, Sequence, Tuple
+from sqlalchemy import tuple_
+
+
+def encode_cursor(*values) -> str:
+    """Opaque cursor for the sort key of the last row of a page"""
+    payload = json.dumps(
+        [value.isoformat() if isinstance(value, datetime) else value for value in values],
+        separators=(",", ":"),
+    )
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, columns: Sequence) -> tuple:
+    """Sort key values of a cursor, typed like columns. Raises ValueError if malformed."""
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except Exception:
+        raise ValueError("Invalid cursor")
+    if not isinstance(values, list) or len(values) != len(columns):
+        raise ValueError("Invalid cursor")
+
+    decoded = []
+    for column, value in zip(columns, values):
+        if value is not None and column.type.python_type is datetime:
+            value = datetime.fromisoformat(value)
+        decoded.append(value)
+    return tuple(decoded)
+
+
+def apply_keyset(query, columns: Sequence, cursor: Optional[str], limit: int):
+    """
+    Order query by columns, newest first, and continue after cursor.
+    One extra row is fetched to tell whether there is a next page.
+    """
+    if cursor:
+        query = query.where(tuple_(*columns) < tuple_(*decode_cursor(cursor, columns)))
+    return query.order_by(*(column.desc() for column in columns)).limit(limit + 1)
+
+
+def split_page(rows: Sequence, limit: int, key: Callable[[object], tuple]) -> Tuple[list, Optional[str]]:
+    """Rows of the page and the cursor of the next one (None on the last page)"""
+    rows = list(rows)
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    return rows, encode_cursor(*key(rows[-1]))
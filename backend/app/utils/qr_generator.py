@@ -1,27 +1,44 @@
 import qrcode
+import qrcode.image.svg
 from io import BytesIO
 import base64
-from typing import Tuple
+from typing import List, Tuple
 
-def generate_qr_code(data: str) -> Tuple[str, bytes]:
-    """Generate QR code and return as base64 string and bytes"""
+def _make_qr(data: str, box_size: int, border: int) -> qrcode.QRCode:
     qr = qrcode.QRCode(
         version=1,
         error_correction=qrcode.constants.ERROR_CORRECT_L,
-        box_size=10,
-        border=4,
+        box_size=box_size,
+        border=border,
     )
     qr.add_data(data)
     qr.make(fit=True)
-    
-    img = qr.make_image(fill_color="black", back_color="white")
-    
-    # Convert to bytes
+    return qr
+
+def render_qr_png(data: str, box_size: int = 10, border: int = 4) -> bytes:
+    """Render a QR code as PNG bytes"""
+    img = _make_qr(data, box_size, border).make_image(fill_color="black", back_color="white")
     buffer = BytesIO()
     img.save(buffer, format="PNG")
-    img_bytes = buffer.getvalue()
-    
+    return buffer.getvalue()
+
+def render_qr_svg(data: str, box_size: int = 10, border: int = 4) -> bytes:
+    """Render a QR code as a single-path SVG document"""
+    img = _make_qr(data, box_size, border).make_image(image_factory=qrcode.image.svg.SvgPathImage)
+    buffer = BytesIO()
+    img.save(buffer)
+    return buffer.getvalue()
+
+def generate_qr_code(data: str) -> Tuple[str, bytes]:
+    """Generate QR code and return as base64 string and bytes"""
+    img_bytes = render_qr_png(data)
+
     # Convert to base64
     img_base64 = base64.b64encode(img_bytes).decode()
-    
+
     return img_base64, img_bytes
+
+def render_many(items: List[Tuple[str, str, int]]) -> List[bytes]:
+    """Render (data, "png"|"svg", box_size) items; entry point of batch worker processes"""
+    renderers = {"png": render_qr_png, "svg": render_qr_svg}
+    return [renderers[fmt](data, box_size) for data, fmt, box_size in items]
@@ -0,0 +1,107 @@
+import base64
+import hashlib
+import hmac
+import math
+import struct
+from datetime import datetime, timezone
+from functools import lru_cache
+from typing import Optional
+
+from app.config import settings
+
+# Signed QR format: "P1." + base64url(pass_id | valid_from | valid_until | signature)
+# Integers are big-endian uint32 (timestamps in epoch seconds), the signature is a
+# truncated HMAC-SHA256 over the prefix and payload.
+TOKEN_PREFIX = "P1."
+SIGNATURE_BYTES = 16
+_PAYLOAD = struct.Struct(">III")
+_TOKEN_BYTES = _PAYLOAD.size + SIGNATURE_BYTES
+_MAX_TIMESTAMP = 2 ** 32 - 1
+
+
+@lru_cache(maxsize=None)
+def _signing_key(secret: str) -> bytes:
+    """Derive a dedicated key so QR signatures never share a key with JWTs"""
+    return hmac.new(secret.encode(), b"pass-system/qr-token/v1", hashlib.sha256).digest()
+
+
+def _key() -> bytes:
+    return _signing_key(settings.qr_signing_key or settings.secret_key)
+
+
+def _sign(payload: bytes) -> bytes:
+    digest = hmac.new(_key(), TOKEN_PREFIX.encode() + payload, hashlib.sha256).digest()
+    return digest[:SIGNATURE_BYTES]
+
+
+def _to_epoch(value: datetime) -> float:
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.timestamp()
+
+
+def fits_qr_token(value: datetime) -> bool:
+    """Whether a validity bound fits the token's uint32 timestamps (1970 to 2106)"""
+    return 0 <= _to_epoch(value) <= _MAX_TIMESTAMP
+
+
+def is_signed_token(qr_code: str) -> bool:
+    """Check whether a scanned code uses the signed format (vs legacy uuid)"""
+    return qr_code.startswith(TOKEN_PREFIX)
+
+
+def issue_qr_token(pass_id: int, valid_from: datetime, valid_until: datetime) -> str:
+    """Create a signed QR token carrying the pass id and validity window"""
+    # Round outwards so the token window always covers the pass window
+    payload = _PAYLOAD.pack(
+        pass_id,
+        math.floor(_to_epoch(valid_from)),
+        math.ceil(_to_epoch(valid_until)),
+    )
+    raw = payload + _sign(payload)
+    return TOKEN_PREFIX + base64.urlsafe_b64encode(raw).rstrip(b"=").decode()
+
+
+def decode_qr_token(qr_code: str) -> Optional[dict]:
+    """Return token claims, or None if the token is malformed or tampered"""
+    if not is_signed_token(qr_code):
+        return None
+
+    body = qr_code[len(TOKEN_PREFIX):]
+    try:
+        raw = base64.urlsafe_b64decode(body + "=" * (-len(body) % 4))
+    except (ValueError, TypeError):
+        return None
+
+    if len(raw) != _TOKEN_BYTES:
+        return None
+
+    payload, signature = raw[:_PAYLOAD.size], raw[_PAYLOAD.size:]
+    if not hmac.compare_digest(signature, _sign(payload)):
+        return None
+
+    pass_id, valid_from, valid_until = _PAYLOAD.unpack(payload)
+    return {
+        "pass_id": pass_id,
+        "valid_from": datetime.fromtimestamp(valid_from, tz=timezone.utc),
+        "valid_until": datetime.fromtimestamp(valid_until, tz=timezone.utc),
+    }
+
+
+def check_qr_token(qr_code: str, at: datetime) -> Optional[str]:
+    """
+    CPU-only pre-check of a signed token. Returns the denial reason, or None
+    if the token may be valid and the pass should be looked up.
+    Legacy (unsigned) codes always pass this check.
+    """
+    if not is_signed_token(qr_code):
+        return None
+
+    claims = decode_qr_token(qr_code)
+    if claims is None:
+        return "Invalid pass signature"
+    if at < claims["valid_from"]:
+        return "Pass not yet valid"
+    if at > claims["valid_until"]:
+        return "Pass expired"
+    return None
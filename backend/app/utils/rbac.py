@@ -1,5 +1,7 @@
+import hashlib
+import json
 from enum import Enum
-from typing import List, Optional
+from typing import Iterable, List, Optional
 from app.models.user import UserRole
 
 class Permission(str, Enum):
@@ -65,6 +67,28 @@ ROLE_PERMISSIONS = {
     ]
 }
 
+# One bit per permission in declaration order (add new permissions at the end)
+PERMISSION_BITS = {permission: 1 << index for index, permission in enumerate(Permission)}
+
+def permissions_mask(permissions: Iterable[Permission]) -> int:
+    mask = 0
+    for permission in permissions:
+        mask |= PERMISSION_BITS[permission]
+    return mask
+
+# Precomputed role bitmasks, embedded in access tokens as the "perm" claim
+ROLE_MASKS = {role: permissions_mask(permissions) for role, permissions in ROLE_PERMISSIONS.items()}
+
+# Changes with the role table or bit order; tokens minted under another one are refused
+PERMISSIONS_VERSION = hashlib.sha256(json.dumps(
+    [[permission.value for permission in Permission], {role.value: mask for role, mask in ROLE_MASKS.items()}],
+    sort_keys=True,
+).encode()).hexdigest()[:8]
+
+def role_mask(role: UserRole) -> int:
+    """Permission bitmask of a role"""
+    return ROLE_MASKS.get(role, 0)
+
 def check_permission(role: UserRole, permission: Permission) -> bool:
     """Check if role has permission"""
     permissions = ROLE_PERMISSIONS.get(role, [])
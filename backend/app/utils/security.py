@@ -1,8 +1,10 @@
+import uuid
 from datetime import datetime, timedelta
 from typing import Optional
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 from app.config import settings
+from app.utils.rbac import PERMISSIONS_VERSION, role_mask
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
@@ -22,6 +24,28 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
     encoded_jwt = jwt.encode(to_encode, settings.secret_key, algorithm=settings.algorithm)
     return encoded_jwt
 
+def access_token_claims(user, session_id: Optional[str] = None) -> dict:
+    """Claims of a user's access token: identity, role, permission bitmask, versions and session"""
+    claims = {
+        "sub": user.username,
+        "id": user.id,
+        "role": user.role,
+        "perm": role_mask(user.role),
+        "pv": PERMISSIONS_VERSION,
+        "ver": user.token_version or 0,
+    }
+    if session_id:
+        claims["sid"] = session_id
+    return claims
+
+def create_refresh_token(user_id: int, session_id: str, session_end: datetime) -> str:
+    """Single-use refresh token of a session; all tokens of a session end with it"""
+    return jwt.encode(
+        {"typ": "refresh", "id": user_id, "sid": session_id, "jti": uuid.uuid4().hex, "exp": session_end},
+        settings.secret_key,
+        algorithm=settings.algorithm,
+    )
+
 def verify_token(token: str) -> Optional[dict]:
     try:
         payload = jwt.decode(token, settings.secret_key, algorithms=[settings.algorithm])
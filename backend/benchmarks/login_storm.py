@@ -0,0 +1,103 @@
+"""
+Scan latency during a login storm, in one API process.
+
+Scans a pass in a loop, first alone and then while concurrent clients keep
+signing in, and prints scan latency percentiles for both phases together
+with login throughput. With --inline bcrypt runs on the event loop again,
+as it did before the password hasher pool, for comparison.
+
+Uses the database of DATABASE_URL (tables are created if missing) and adds
+one user and one pass to it. Run from backend/:
+
+    python -m benchmarks.login_storm --seconds 10 --clients 32
+"""
+import argparse
+import asyncio
+import statistics
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from httpx import AsyncClient
+
+from app.database import Base, engine
+from app.main import app
+from app.middleware.security import RateLimitMiddleware
+from app.services.password_hasher import password_hasher
+
+# All clients share one address here; the per-IP limit would only measure itself
+app.user_middleware = [middleware for middleware in app.user_middleware if middleware.cls is not RateLimitMiddleware]
+
+
+def percentiles(samples: list) -> str:
+    if len(samples) < 2:
+        return "no samples"
+    cuts = statistics.quantiles(samples, n=100)
+    return f"p50 {cuts[49] * 1000:.1f} ms, p95 {cuts[94] * 1000:.1f} ms, p99 {cuts[98] * 1000:.1f} ms, max {max(samples) * 1000:.1f} ms"
+
+
+async def scan_loop(client: AsyncClient, qr_code: str, until: float) -> list:
+    latencies = []
+    while time.perf_counter() < until:
+        started = time.perf_counter()
+        response = await client.post("/api/scan/verify", json={"qr_code": qr_code})
+        response.raise_for_status()
+        latencies.append(time.perf_counter() - started)
+        await asyncio.sleep(0.01)  # a busy gate, not a tight loop
+    return latencies
+
+
+async def login_loop(client: AsyncClient, username: str, password: str, until: float, outcomes: dict):
+    while time.perf_counter() < until:
+        response = await client.post("/api/auth/login", json={"username": username, "password": password})
+        outcomes[response.status_code] = outcomes.get(response.status_code, 0) + 1
+        if response.status_code == 503:
+            await asyncio.sleep(float(response.headers.get("Retry-After", "1")))
+
+
+async def main(seconds: float, clients: int, inline: bool):
+    if inline:
+        async def run_on_loop(operation, function, *args):
+            return function(*args)
+        password_hasher._run = run_on_loop
+
+    async with engine.begin() as connection:
+        await connection.run_sync(Base.metadata.create_all)
+
+    username, password = f"bench-{uuid.uuid4().hex[:8]}", "bench-password"
+    async with AsyncClient(app=app, base_url="http://bench") as client:
+        response = await client.post("/api/auth/register", json={
+            "username": username, "password": password, "full_name": "Login Storm", "role": "guard",
+        })
+        response.raise_for_status()
+        now = datetime.now(timezone.utc)
+        response = await client.post("/api/passes/create", json={
+            "guest_name": "Login Storm",
+            "valid_from": (now - timedelta(hours=1)).isoformat(),
+            "valid_until": (now + timedelta(hours=1)).isoformat(),
+        })
+        response.raise_for_status()
+        qr_code = response.json()["qr_code"]
+
+        baseline = await scan_loop(client, qr_code, time.perf_counter() + seconds)
+
+        outcomes = {}
+        until = time.perf_counter() + seconds
+        storm = [asyncio.create_task(login_loop(client, username, password, until, outcomes)) for _ in range(clients)]
+        during = await scan_loop(client, qr_code, until)
+        await asyncio.gather(*storm)
+
+    mode = "bcrypt on the event loop" if inline else f"bcrypt pool: {password_hasher.max_workers} threads, queue {password_hasher.max_queue}"
+    print(f"[BENCH] {mode}")
+    print(f"[BENCH] Scans alone:        {percentiles(baseline)} ({len(baseline)} scans)")
+    print(f"[BENCH] Scans during storm: {percentiles(during)} ({len(during)} scans)")
+    print(f"[BENCH] Logins: {outcomes.get(200, 0) / seconds:.1f}/s succeeded, {outcomes.get(503, 0)} refused with 503, by {clients} clients")
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--seconds", type=float, default=10.0, help="duration of each phase")
+    parser.add_argument("--clients", type=int, default=32, help="concurrent signing-in clients")
+    parser.add_argument("--inline", action="store_true", help="hash on the event loop, for comparison")
+    args = parser.parse_args()
+    asyncio.run(main(args.seconds, args.clients, args.inline))
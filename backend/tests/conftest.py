@@ -1,7 +1,18 @@
 import pytest
+import pytest_asyncio
+import uuid
+from httpx import ASGITransport, AsyncClient
+from redis.exceptions import RedisError
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
 from sqlalchemy.orm import sessionmaker
-from app.database import Base
+from sqlalchemy.pool import StaticPool
+import app.models
+from app.database import Base, get_db
+from app.dependencies import get_current_user
+from app.main import app
+from app.models.user import User, UserRole
+from app.services import redis_client
+from app.utils.security import access_token_claims, create_access_token
 from app.config import settings
 
 @pytest.fixture
@@ -22,3 +33,70 @@ async def db():
     
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.drop_all)
+
+@pytest_asyncio.fixture
+async def sqlite_sessions():
+    """Session factory over a fresh in-memory SQLite database with the full schema"""
+    pytest.importorskip("aiosqlite")
+    engine = create_async_engine("sqlite+aiosqlite://", poolclass=StaticPool)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+    yield sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+    await engine.dispose()
+
+@pytest_asyncio.fixture
+async def sqlite_db(sqlite_sessions):
+    """Session on the in-memory SQLite database"""
+    async with sqlite_sessions() as session:
+        yield session
+
+@pytest_asyncio.fixture
+async def app_redis(monkeypatch):
+    """
+    The app's shared Redis client, fresh for this test's event loop and on a
+    scratch database emptied around the test. Redis may be unreachable.
+    """
+    client = redis_client.create_redis(db=15)
+    monkeypatch.setattr(redis_client, "_client", client)
+    monkeypatch.setattr(redis_client, "_down_until", 0.0)
+    try:
+        await client.flushdb()
+    except RedisError:
+        pass
+
+    yield client
+
+    try:
+        await client.flushdb()
+    except RedisError:
+        pass
+    await client.aclose()
+
+@pytest_asyncio.fixture
+async def redis(app_redis):
+    """The app's shared Redis client; skips the test without a Redis server"""
+    try:
+        await app_redis.ping()
+    except RedisError:
+        pytest.skip("Redis is not available")
+    return app_redis
+
+@pytest_asyncio.fixture
+async def api(sqlite_sessions, app_redis):
+    """Client of the app on the SQLite database, signed in as an admin"""
+    async def get_sqlite_db():
+        async with sqlite_sessions() as session:
+            yield session
+
+    admin = User(id=1, username="admin", role=UserRole.ADMIN, is_active=True, token_version=0)
+    app.dependency_overrides[get_db] = get_sqlite_db
+    app.dependency_overrides[get_current_user] = lambda: admin
+    # A client address of its own, so tests do not share a rate limit bucket
+    transport = ASGITransport(app=app, client=(uuid.uuid4().hex, 123))
+    headers = {"Authorization": f"Bearer {create_access_token(access_token_claims(admin))}"}
+    async with AsyncClient(transport=transport, base_url="http://test", headers=headers) as client:
+        yield client
+
+    app.dependency_overrides.clear()
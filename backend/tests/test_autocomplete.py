@@ -0,0 +1,32 @@
+from app.services.autocomplete import PrefixIndex
+
+def test_prefix_matches_any_word_once():
+    """Test completions match word starts and are distinct"""
+    index = PrefixIndex()
+    index.add_many(["John Smith", "Anna Smith", "Smithson Ltd", "Bob"])
+
+    assert index.complete("smi", 10) == ["Anna Smith", "John Smith", "Smithson Ltd"]
+    assert index.complete("john s", 10) == ["John Smith"]
+    assert index.complete("mith", 10) == []
+    assert index.complete("smi", 2) == ["Anna Smith", "John Smith"]
+
+def test_removal_keeps_values_still_in_use():
+    """Test a value disappears only when no pass uses it anymore"""
+    index = PrefixIndex()
+    index.add_many(["ACME", "ACME", "Acme"])
+    index.remove_many(["ACME"])
+
+    assert index.complete("ac", 10) == ["ACME", "Acme"]
+
+    index.remove_many(["ACME", "Acme"])
+    assert index.complete("ac", 10) == []
+    assert len(index) == 0
+
+def test_bulk_add_keeps_keys_sorted():
+    """Test large batches are merged into the sorted key array"""
+    index = PrefixIndex()
+    index.add_many([f"Guest {i:03d}" for i in range(200)])
+    index.add_many(["Aaron"])
+
+    assert index.complete("guest 01", 3) == ["Guest 010", "Guest 011", "Guest 012"]
+    assert index.complete("a", 5) == ["Aaron"]
@@ -0,0 +1,13 @@
+from app.utils.bloom import BloomFilter
+
+def test_bloom_filter_has_no_false_negatives():
+    """Test every added item is found and few others are"""
+    revoked = BloomFilter(capacity=1000, error_rate=0.01)
+    sessions = [f"session-{index}" for index in range(1000)]
+    for session_id in sessions:
+        revoked.add(session_id)
+
+    assert all(session_id in revoked for session_id in sessions)
+    false_positives = sum(f"other-{index}" in revoked for index in range(10000))
+    assert false_positives < 300
+    assert len(revoked) == 1000
@@ -0,0 +1,76 @@
+import time
+from datetime import datetime, timezone
+from types import SimpleNamespace
+import pytest
+from app.services.pass_cache import PassCache
+from app.utils.cache import TTLCache
+
+def test_cache_hit_and_miss_counters():
+    """Test hit/miss accounting"""
+    cache = TTLCache(max_size=10, ttl_seconds=60)
+    assert cache.get("qr-1") is None
+    cache.set("qr-1", {"id": 1})
+    assert cache.get("qr-1") == {"id": 1}
+
+    stats = cache.stats()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 1
+    assert stats["hit_ratio"] == 0.5
+
+def test_cache_lru_eviction():
+    """Test least recently used entry is evicted first"""
+    cache = TTLCache(max_size=2, ttl_seconds=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+
+    assert "a" in cache
+    assert "b" not in cache
+    assert cache.stats()["evictions"] == 1
+
+def test_cache_ttl_expiry():
+    """Test expired entries are treated as misses"""
+    cache = TTLCache(max_size=10, ttl_seconds=0.01)
+    cache.set("a", 1)
+    time.sleep(0.02)
+    assert cache.get("a") is None
+
+def test_cache_invalidate():
+    """Test explicit invalidation"""
+    cache = TTLCache(max_size=10, ttl_seconds=60)
+    cache.set("a", 1)
+    assert cache.invalidate("a") is True
+    assert cache.invalidate("a") is False
+    assert cache.get("a") is None
+
+class FakePassSession:
+    """Answers every pass lookup with the current row and counts queries"""
+
+    def __init__(self, row):
+        self.row = row
+        self.queries = 0
+
+    async def execute(self, query):
+        self.queries += 1
+        return SimpleNamespace(one_or_none=lambda: self.row)
+
+@pytest.mark.asyncio
+async def test_pass_cache_drops_passes_changed_by_other_workers():
+    """Test a change broadcast from another worker evicts the cached pass"""
+    now = datetime.now(timezone.utc)
+    row = SimpleNamespace(
+        id=1, qr_code="QR1", guest_name="Guest", guest_company=None, guest_photo_url=None,
+        valid_from=now, valid_until=now, is_active=True,
+    )
+    cache = PassCache(max_size=10, ttl_seconds=60)
+    db = FakePassSession(row)
+
+    assert (await cache.get(db, "QR1"))["is_active"] is True
+    await cache.get(db, "QR1")
+    assert db.queries == 1
+
+    db.row = SimpleNamespace(**{**vars(row), "is_active": False})
+    cache._apply({"qr_code": "QR1"})  # as delivered by the event bus
+    assert (await cache.get(db, "QR1"))["is_active"] is False
+    assert db.queries == 2
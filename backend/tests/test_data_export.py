@@ -0,0 +1,47 @@
+import gzip
+import json
+import pytest
+from datetime import datetime, timezone
+from app.models.pass_model import PassStatus
+from app.services.data_export import csv_chunks, gzip_chunks, ndjson_chunks
+
+async def _batches(*batches):
+    for batch in batches:
+        yield batch
+
+async def _join(chunks):
+    return b"".join([chunk async for chunk in chunks])
+
+@pytest.mark.asyncio
+async def test_csv_export_encodes_each_batch():
+    """Test CSV export writes the header once and formats enums, dates and nulls"""
+    when = datetime(2025, 1, 2, 9, 30, tzinfo=timezone.utc)
+    chunks = [chunk async for chunk in csv_chunks(["id", "status", "created_at", "notes"], _batches(
+        [(1, PassStatus.ACTIVE, when, None)],
+        [(2, PassStatus.EXPIRED, when, "a, b")],
+    ))]
+
+    assert len(chunks) == 2
+    assert b"".join(chunks).decode().splitlines() == [
+        "id,status,created_at,notes",
+        "1,active,2025-01-02T09:30:00+00:00,",
+        '2,expired,2025-01-02T09:30:00+00:00,"a, b"',
+    ]
+
+@pytest.mark.asyncio
+async def test_csv_export_without_rows_has_header():
+    """Test an empty CSV export still carries the header row"""
+    assert await _join(csv_chunks(["id", "guest_name"], _batches())) == b"id,guest_name\r\n"
+
+@pytest.mark.asyncio
+async def test_gzipped_ndjson_export():
+    """Test NDJSON export survives a gzip round trip"""
+    data = await _join(gzip_chunks(ndjson_chunks(["id", "guest_name"], _batches(
+        [(1, "Anna"), (2, None)],
+    ))))
+
+    lines = gzip.decompress(data).decode().splitlines()
+    assert [json.loads(line) for line in lines] == [
+        {"id": 1, "guest_name": "Anna"},
+        {"id": 2, "guest_name": None},
+    ]
@@ -0,0 +1,51 @@
+import pytest
+from datetime import datetime, timezone
+from fastapi.testclient import TestClient
+from starlette.websockets import WebSocketDisconnect
+from app.main import app
+from app.models.user import User, UserRole
+from app.routers import events
+from app.services import redis_client
+from app.services.event_bus import event_bus
+from app.services.occupancy import occupancy
+from app.services.scan_events import publish_scan
+
+@pytest.fixture
+def dashboard(monkeypatch):
+    """WebSocket session of a signed-in admin; events are delivered in-process as when Redis is down"""
+    async def authenticate_token(token, db):
+        return User(id=1, username="admin", role=UserRole.ADMIN, is_active=True, token_version=0)
+
+    async def get_counts():
+        return {"total": 3, "gates": {"north": 3}}
+
+    monkeypatch.setattr(events, "authenticate_token", authenticate_token)
+    monkeypatch.setattr(occupancy, "get_counts", get_counts)
+    monkeypatch.setattr(event_bus, "_ensure_listener", lambda: None)
+    monkeypatch.setattr(redis_client, "_down_until", float("inf"))
+    return TestClient(app).websocket_connect("/api/events/ws?token=t")
+
+def test_published_scans_are_forwarded(dashboard):
+    """Test a dashboard gets the occupancy counts and then every published scan"""
+    with dashboard as websocket:
+        assert websocket.receive_json() == {"type": "occupancy", "total": 3, "gates": {"north": 3}}
+
+        response = {"status": "ALLOWED", "pass_id": 7, "guest_name": "Anna", "guest_company": "ACME"}
+        websocket.portal.call(publish_scan, response, datetime.now(timezone.utc), "north")
+        event = websocket.receive_json()
+
+    assert (event["type"], event["action"], event["pass_id"], event["gate_id"]) == ("scan", "check_in", 7, "north")
+    assert event["delta"] == {"on_site": 1, "visits": 1}
+
+def test_failed_forwarding_ends_the_connection(dashboard, monkeypatch, capsys):
+    """Test an error while forwarding closes the socket and is logged instead of left unretrieved"""
+    async def get_counts():
+        raise ValueError("bad counters")
+
+    monkeypatch.setattr(occupancy, "get_counts", get_counts)
+    with dashboard as websocket:
+        with pytest.raises(WebSocketDisconnect) as closed:
+            websocket.receive_json()
+
+    assert closed.value.code == 1011
+    assert "[EVENTS] Forwarding scan events failed: ValueError('bad counters')" in capsys.readouterr().out
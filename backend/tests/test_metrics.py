@@ -0,0 +1,24 @@
+from app.utils.metrics import Registry
+
+def test_histogram_buckets_are_cumulative():
+    """Histogram exposes cumulative buckets, sum and count per label set"""
+    registry = Registry()
+    histogram = registry.histogram("latency_seconds", "Latency", ["endpoint"], buckets=(0.1, 1.0))
+    histogram.observe(0.05, "verify")
+    histogram.observe(0.1, "verify")
+    histogram.observe(5, "verify")
+
+    lines = registry.render().splitlines()
+    assert 'latency_seconds_bucket{endpoint="verify",le="0.1"} 2' in lines
+    assert 'latency_seconds_bucket{endpoint="verify",le="1.0"} 2' in lines
+    assert 'latency_seconds_bucket{endpoint="verify",le="+Inf"} 3' in lines
+    assert 'latency_seconds_count{endpoint="verify"} 3' in lines
+
+def test_counter_escapes_label_values():
+    """Label values are escaped in the text format"""
+    registry = Registry()
+    counter = registry.counter("outcomes_total", "Outcomes", ["reason"])
+    counter.inc('say "hi"')
+    counter.inc('say "hi"', amount=2)
+
+    assert 'outcomes_total{reason="say \\"hi\\""} 3' in registry.render().splitlines()
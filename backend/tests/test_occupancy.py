@@ -0,0 +1,69 @@
+import pytest
+from datetime import datetime, timedelta, timezone
+from app.models.pass_model import Pass, PassStatus, Visit
+from app.services.occupancy import OccupancyTracker, ROSTER_KEY, COUNTERS_KEY
+
+def scan(status: str, pass_id: int, gate_id: str) -> tuple:
+    response = {"status": status, "pass_id": pass_id, "guest_name": f"Guest {pass_id}", "guest_company": None}
+    return response, datetime.now(timezone.utc), gate_id
+
+@pytest.mark.asyncio
+async def test_repeated_entries_count_once(redis):
+    """Test a pass entering again without leaving is counted once, at its first gate"""
+    occupancy = OccupancyTracker()
+    await occupancy.apply_scans([scan("ALLOWED", 1, "north"), scan("ALLOWED", 1, "north")])
+    await occupancy.apply_scan(*scan("ALLOWED", 1, "south"))
+
+    assert await occupancy.get_counts() == {"total": 1, "gates": {"north": 1}}
+    assert [entry["pass_id"] for entry in await occupancy.get_roster()] == [1]
+
+@pytest.mark.asyncio
+async def test_exits_never_drive_counts_below_zero(redis):
+    """Test repeated exits and exits of passes not on site leave the counters untouched"""
+    occupancy = OccupancyTracker()
+    await occupancy.apply_scans([
+        scan("ALLOWED", 1, "north"),
+        scan("EXIT", 1, "south"),
+        scan("EXIT", 1, "south"),
+        scan("EXIT", 2, "north"),
+    ])
+
+    assert await redis.hgetall(COUNTERS_KEY) == {"total": "0", "gate:north": "0"}
+    assert await occupancy.get_counts() == {"total": 0, "gates": {}}
+    assert await occupancy.get_roster() == []
+
+@pytest.mark.asyncio
+async def test_rebuild_replaces_the_live_roster(redis, sqlite_db):
+    """Test a rebuild swaps in the open visits and drops drifted entries and counters"""
+    now = datetime.now(timezone.utc)
+    visiting, left = (
+        Pass(
+            qr_code=f"OCC-{index}", guest_name=f"Guest {index}", status=PassStatus.ACTIVE, is_active=True,
+            valid_from=now - timedelta(days=1), valid_until=now + timedelta(days=1)
+        )
+        for index in range(2)
+    )
+    sqlite_db.add_all([visiting, left])
+    await sqlite_db.commit()
+    open_visit = Visit(pass_id=visiting.id, entry_time=now, entry_gate_id="north")
+    sqlite_db.add_all([
+        open_visit,
+        Visit(pass_id=left.id, entry_time=now - timedelta(hours=1), exit_time=now, entry_gate_id="south"),
+    ])
+    await sqlite_db.commit()
+
+    # Drift: a missed exit and a counter without a roster entry
+    occupancy = OccupancyTracker()
+    await occupancy.apply_scans([scan("ALLOWED", left.id, "south")])
+    await redis.hincrby(COUNTERS_KEY, "gate:west", 3)
+
+    assert await OccupancyTracker.rebuild(sqlite_db, redis) == 1
+    assert await occupancy.get_counts() == {"total": 1, "gates": {"north": 1}}
+    assert [entry["pass_id"] for entry in await occupancy.get_roster()] == [visiting.id]
+    assert sorted(await redis.keys("occupancy:*")) == [COUNTERS_KEY, ROSTER_KEY]
+
+    open_visit.exit_time = now
+    await sqlite_db.commit()
+    assert await OccupancyTracker.rebuild(sqlite_db, redis) == 0
+    assert await redis.exists(ROSTER_KEY) == 0
+    assert await occupancy.get_counts() == {"total": 0, "gates": {}}
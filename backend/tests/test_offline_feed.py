@@ -0,0 +1,34 @@
+import pytest
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import update
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
+from app.models.pass_change import PassChange
+from app.services.offline_feed import offline_feed, purge_changes
+
+pytest.importorskip("aiosqlite")
+
+@pytest.mark.asyncio
+async def test_purged_versions_get_reset():
+    """Test purging keeps the newest change and sends clients behind the purge to the snapshot"""
+    engine = create_async_engine("sqlite+aiosqlite://")
+    async with engine.begin() as conn:
+        await conn.run_sync(PassChange.__table__.create)
+    feed_db = AsyncSession(engine, expire_on_commit=False)
+
+    now = datetime.now(timezone.utc)
+    feed_db.add_all([PassChange(pass_id=index, qr_hash=f"h{index}", op="upsert") for index in range(1, 6)])
+    await feed_db.commit()
+    await feed_db.execute(update(PassChange).values(created_at=now - timedelta(days=40)))
+    await feed_db.commit()
+
+    assert await purge_changes(feed_db, before=now - timedelta(days=30), chunk_size=2) == 4
+
+    delta = await offline_feed.get_delta(feed_db, since=2)
+    assert delta["reset"] is True
+    delta = await offline_feed.get_delta(feed_db, since=4)
+    assert delta["reset"] is False and [change["version"] for change in delta["changes"]] == [5]
+    delta = await offline_feed.get_delta(feed_db, since=5)
+    assert delta["reset"] is False and delta["changes"] == []
+
+    await feed_db.close()
+    await engine.dispose()
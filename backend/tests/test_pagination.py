@@ -0,0 +1,28 @@
+import pytest
+from datetime import datetime, timezone
+from app.models.pass_model import Pass
+from app.utils.pagination import encode_cursor, decode_cursor, split_page
+
+def test_cursor_roundtrip_restores_types():
+    """Test cursor decodes to the typed sort key it was made from"""
+    created_at = datetime(2026, 5, 1, 12, 30, 15, 123456, tzinfo=timezone.utc)
+    cursor = encode_cursor(created_at, 42)
+
+    assert decode_cursor(cursor, (Pass.created_at, Pass.id)) == (created_at, 42)
+
+def test_malformed_cursor_is_rejected():
+    """Test tampered cursors raise ValueError"""
+    with pytest.raises(ValueError):
+        decode_cursor("not-a-cursor", (Pass.created_at, Pass.id))
+    with pytest.raises(ValueError):
+        decode_cursor(encode_cursor(1), (Pass.created_at, Pass.id))
+
+def test_split_page_only_returns_cursor_when_more_rows():
+    """Test next cursor is set only when the extra row was fetched"""
+    rows = [(3, "c"), (2, "b"), (1, "a")]
+
+    page, cursor = split_page(rows, 2, lambda row: row)
+    assert page == rows[:2]
+    assert decode_cursor(cursor, (Pass.id, Pass.guest_name)) == (2, "b")
+
+    assert split_page(rows, 3, lambda row: row) == (rows, None)
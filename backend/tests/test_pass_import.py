@@ -0,0 +1,60 @@
+import pytest
+from app.services.pass_import import PassImporter, rows_for
+
+async def _chunks(*parts):
+    for part in parts:
+        yield part
+
+async def _collect(rows):
+    return [row async for row in rows]
+
+@pytest.mark.asyncio
+async def test_csv_rows_across_chunk_boundaries():
+    """Test CSV records are rebuilt across chunks and quoted line breaks"""
+    rows = await _collect(rows_for("text/csv", None, _chunks(
+        b"guest_name,notes\r\nAnna,first\nBo", b'b,"two\nlines"\n\n', b"Cid,last"
+    )))
+
+    assert rows == [
+        (2, {"guest_name": "Anna", "notes": "first"}),
+        (3, {"guest_name": "Bob", "notes": "two\nlines"}),
+        (6, {"guest_name": "Cid", "notes": "last"}),
+    ]
+
+@pytest.mark.asyncio
+async def test_ndjson_rows_report_parse_errors():
+    """Test malformed NDJSON lines are reported with their line number"""
+    rows = await _collect(rows_for("application/x-ndjson", None, _chunks(
+        b'{"guest_name": "Anna"}\n{oops\n[1]\n'
+    )))
+
+    assert rows[0] == (1, {"guest_name": "Anna"})
+    assert rows[1][0] == 2 and isinstance(rows[1][1], ValueError)
+    assert rows[2][0] == 3 and isinstance(rows[2][1], ValueError)
+
+@pytest.mark.asyncio
+async def test_values_too_long_for_their_column_fail_their_row():
+    """Test a value longer than its column is reported for its line before reaching the database"""
+    rows = rows_for("text/csv", None, _chunks(
+        b"guest_name,guest_phone,valid_from,valid_until\n"
+        b"Anna,+1 555 0100 ext 12345,2030-01-01T08:00:00Z,2030-01-01T18:00:00Z\n"
+    ))
+    result = await PassImporter(db=None).run(rows)
+
+    assert result["imported"] == 0 and result["failed"] == 1
+    assert result["errors"][0]["line"] == 2 and "guest_phone" in result["errors"][0]["error"]
+
+@pytest.mark.asyncio
+async def test_validity_outside_signed_token_range_fails_its_row():
+    """Test validity bounds a signed QR code cannot carry are reported for their line"""
+    rows = rows_for("text/csv", None, _chunks(
+        b"guest_name,valid_from,valid_until\n"
+        b"Anna,1969-12-31T08:00:00Z,2030-01-01T18:00:00Z\n"
+        b"Bob,2030-01-01T08:00:00Z,2107-01-01T18:00:00Z\n"
+    ))
+    result = await PassImporter(db=None).run(rows)
+
+    assert result["imported"] == 0 and result["failed"] == 2
+    assert [(error["line"], error["error"].split(":")[0]) for error in result["errors"]] == [
+        (2, "valid_from"), (3, "valid_until")
+    ]
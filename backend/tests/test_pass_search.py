@@ -0,0 +1,54 @@
+import pytest
+from datetime import datetime, timedelta, timezone
+from app.models.pass_model import Pass, PassStatus
+
+async def add_passes(db, *guests):
+    now = datetime.now(timezone.utc)
+    db.add_all([
+        Pass(
+            qr_code=f"SEARCH-{index}", guest_name=name, guest_company=company, status=PassStatus.ACTIVE,
+            is_active=True, valid_from=now - timedelta(days=1), valid_until=now + timedelta(days=1)
+        )
+        for index, (name, company) in enumerate(guests)
+    ])
+    await db.commit()
+
+async def search(api, name: str, **params) -> list:
+    response = await api.get("/api/passes/search", params={"name": name, **params})
+    assert response.status_code == 200
+    return response.json()
+
+@pytest.mark.asyncio
+async def test_name_prefix_ranks_above_other_matches(api, sqlite_db):
+    """Test name prefixes come first, then names containing the term, then matches in other fields"""
+    await add_passes(
+        sqlite_db,
+        ("Bob Stone", "Annapolis Ltd"), ("Joanna Lee", None), ("Anna Smith", None), ("Carl Berg", None)
+    )
+
+    assert [item["guest_name"] for item in await search(api, "anna")] == ["Anna Smith", "Joanna Lee", "Bob Stone"]
+
+@pytest.mark.asyncio
+async def test_like_wildcards_match_literally(api, sqlite_db):
+    """Test % and _ in the search term are not LIKE wildcards"""
+    await add_passes(sqlite_db, ("100% Guest", None), ("1000 Guest", None), ("a_b", None), ("axb", None))
+
+    assert [item["guest_name"] for item in await search(api, "100%")] == ["100% Guest"]
+    assert [item["guest_name"] for item in await search(api, "a_b")] == ["a_b"]
+
+@pytest.mark.asyncio
+async def test_keyset_pages_follow_rank_and_id(api, sqlite_db):
+    """Test cursor pages walk the ranked results without gaps or repeats"""
+    guests = [(f"Guest {index}", None) for index in range(5)] + [("My Guest", None), ("Host", "Guest Co")]
+    await add_passes(sqlite_db, *guests)
+    ranked = [item["id"] for item in await search(api, "guest")]
+
+    pages, cursor = [], ""
+    while cursor is not None:
+        page = await search(api, "guest", limit=3, cursor=cursor)
+        pages.append([item["id"] for item in page["items"]])
+        cursor = page["next_cursor"]
+
+    assert ranked == [5, 4, 3, 2, 1, 6, 7]  # rank, then newest id first
+    assert [len(page) for page in pages] == [3, 3, 1]
+    assert sum(pages, []) == ranked
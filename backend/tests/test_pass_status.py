@@ -0,0 +1,52 @@
+import pytest
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import event, select
+from app.models.pass_change import PassChange
+from app.models.pass_model import Pass, PassStatus
+from app.services.offline_feed import qr_hash
+from app.services.pass_status import PassStatusService
+
+@pytest.mark.asyncio
+async def test_sweep_expires_passes_in_chunks(sqlite_db):
+    """Test expired passes are deactivated chunk by chunk and dropped from the offline feed once"""
+    now = datetime.now(timezone.utc)
+    sqlite_db.add_all([
+        Pass(
+            qr_code=f"OLD-{index}", guest_name="Guest", status=PassStatus.ACTIVE, is_active=True,
+            valid_from=now - timedelta(days=2), valid_until=now - timedelta(hours=index + 1)
+        )
+        for index in range(5)
+    ] + [
+        Pass(
+            qr_code="CURRENT", guest_name="Guest", status=PassStatus.ACTIVE, is_active=True,
+            valid_from=now - timedelta(days=1), valid_until=now + timedelta(days=1)
+        )
+    ])
+    await sqlite_db.commit()
+
+    updates = []
+    def count_updates(conn, cursor, statement, parameters, context, executemany):
+        if statement.startswith("UPDATE passes"):
+            updates.append(statement)
+
+    sync_engine = sqlite_db.get_bind()
+    event.listen(sync_engine, "before_cursor_execute", count_updates)
+    try:
+        result = await PassStatusService.sweep(sqlite_db, now, chunk_size=2)
+    finally:
+        event.remove(sync_engine, "before_cursor_execute", count_updates)
+
+    assert result == {"expired": 5, "revoked": 0, "activated": 0}
+    assert len(updates) == 3 + 1 + 1  # 2 + 2 + 1 expired, then one empty chunk each for revoked and activated
+
+    passes = (await sqlite_db.execute(select(Pass).order_by(Pass.id))).scalars().all()
+    assert [(pass_obj.status, pass_obj.is_active) for pass_obj in passes] == (
+        [(PassStatus.EXPIRED, False)] * 5 + [(PassStatus.ACTIVE, True)]
+    )
+    changes = (await sqlite_db.execute(select(PassChange).order_by(PassChange.id))).scalars().all()
+    assert [(change.op, change.qr_hash) for change in changes] == [
+        ("delete", qr_hash(f"OLD-{index}")) for index in range(5)
+    ]
+
+    assert await PassStatusService.sweep(sqlite_db, now, chunk_size=2) == {"expired": 0, "revoked": 0, "activated": 0}
+    assert len((await sqlite_db.execute(select(PassChange))).all()) == 5
@@ -30,3 +30,17 @@ async def test_list_passes():
         response = await ac.get("/api/passes/")
         assert response.status_code == 200
         assert isinstance(response.json(), list)
+
+@pytest.mark.asyncio
+async def test_validity_beyond_signed_token_range_rejected(api):
+    """Test passes valid past what a signed QR code can carry are rejected instead of failing to sign"""
+    response = await api.post(
+        "/api/passes/create",
+        json={
+            "guest_name": "John Doe",
+            "valid_from": "2030-01-01T08:00:00Z",
+            "valid_until": "2200-01-01T18:00:00Z"
+        }
+    )
+    assert response.status_code == 422
+    assert response.json()["detail"][0]["loc"] == ["body", "valid_until"]
@@ -0,0 +1,42 @@
+import asyncio
+import time
+import pytest
+from app.services.password_hasher import HasherBusy, PasswordHasher
+
+@pytest.mark.asyncio
+async def test_hashing_runs_off_the_event_loop():
+    """Test the loop keeps running while a password is hashed"""
+    hasher = PasswordHasher(max_workers=1, max_queue=0)
+    ticks = 0
+
+    async def ticker():
+        nonlocal ticks
+        while True:
+            ticks += 1
+            await asyncio.sleep(0.005)
+
+    task = asyncio.create_task(ticker())
+    hashed = await hasher.hash("s3cret")
+    task.cancel()
+
+    assert ticks > 5
+    assert await hasher.verify("s3cret", hashed)
+    assert not await hasher.verify("wrong", hashed)
+    hasher.shutdown()
+
+@pytest.mark.asyncio
+async def test_full_queue_is_refused_immediately():
+    """Test calls beyond workers + queue raise HasherBusy and capacity comes back"""
+    hasher = PasswordHasher(max_workers=1, max_queue=1)
+    slow = [hasher._run("hash", time.sleep, 0.1) for _ in range(2)]
+    tasks = [asyncio.create_task(call) for call in slow]
+    await asyncio.sleep(0.01)
+
+    with pytest.raises(HasherBusy):
+        await hasher._run("hash", time.sleep, 0)
+    await asyncio.gather(*tasks)
+    await asyncio.sleep(0)
+
+    assert hasher.in_flight() == 0
+    await hasher._run("hash", time.sleep, 0)
+    hasher.shutdown()
@@ -0,0 +1,73 @@
+import pytest
+from types import SimpleNamespace
+from fastapi import HTTPException
+from fastapi.security import HTTPAuthorizationCredentials
+from app.dependencies import require_permission
+from app.models.user import UserRole
+from app.services.user_cache import user_cache
+from app.utils.rbac import PERMISSION_BITS, ROLE_PERMISSIONS, Permission, check_permission, role_mask
+from app.utils.security import access_token_claims, create_access_token
+
+def token_for(role, user_id=7, token_version=0):
+    user = SimpleNamespace(id=user_id, username="sam", role=role, token_version=token_version)
+    return HTTPAuthorizationCredentials(scheme="Bearer", credentials=create_access_token(access_token_claims(user)))
+
+def test_role_masks_match_role_table():
+    """Test precomputed bitmasks grant exactly the role's permissions"""
+    for role in ROLE_PERMISSIONS:
+        mask = role_mask(role)
+        for permission in Permission:
+            assert bool(mask & PERMISSION_BITS[permission]) == check_permission(role, permission)
+
+@pytest.mark.asyncio
+async def test_require_permission_checks_token_without_database():
+    """Test permission is decided from the token claims alone"""
+    export = require_permission(Permission.EXPORT_REPORT)
+
+    user = await export(token_for(UserRole.MANAGEMENT))
+    assert (user.id, user.username, user.role) == (7, "sam", UserRole.MANAGEMENT)
+
+    with pytest.raises(HTTPException) as denied:
+        await export(token_for(UserRole.GUARD))
+    assert denied.value.status_code == 403
+
+@pytest.mark.asyncio
+async def test_revoked_token_versions_are_refused():
+    """Test tokens minted before a role change are rejected"""
+    export = require_permission(Permission.EXPORT_REPORT)
+    user_cache._apply({"user_id": 8, "token_version": 2})
+
+    with pytest.raises(HTTPException) as revoked:
+        await export(token_for(UserRole.ADMIN, user_id=8, token_version=1))
+    assert revoked.value.status_code == 401
+    assert (await export(token_for(UserRole.ADMIN, user_id=8, token_version=2))).id == 8
+
+class FakeVersionSession:
+    """Answers the token version query with (user_id, token_version) rows"""
+
+    def __init__(self, versions):
+        self.versions = versions
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def execute(self, query):
+        return list(self.versions.items())
+
+@pytest.mark.asyncio
+async def test_token_versions_missed_while_unsubscribed_are_reloaded(monkeypatch):
+    """Test a revocation whose broadcast never arrived is picked up when the subscription is back"""
+    export = require_permission(Permission.EXPORT_REPORT)
+    stale = token_for(UserRole.ADMIN, user_id=9, token_version=0)
+    assert (await export(stale)).id == 9
+
+    # The role change was committed, but published while Redis was unreachable
+    monkeypatch.setattr(user_cache, "_session_factory", lambda: FakeVersionSession({9: 1}))
+    await user_cache._resync()
+
+    with pytest.raises(HTTPException) as revoked:
+        await export(stale)
+    assert revoked.value.status_code == 401
@@ -0,0 +1,41 @@
+import asyncio
+import pytest
+from app.services.qr_batch import QRBatchRenderer
+from app.services.qr_images import QRImageCache, etag_matches
+
+@pytest.mark.asyncio
+async def test_qr_images_render_once(tmp_path):
+    """Test concurrent misses share one render and later instances read from disk"""
+    cache = QRImageCache(str(tmp_path), max_items=10)
+    results = await asyncio.gather(*(cache.get("PASS-1", "png") for _ in range(5)))
+
+    assert cache.renders == 1
+    assert len({image for _, image in results}) == 1
+    assert results[0][1].startswith(b"\x89PNG")
+
+    fresh = QRImageCache(str(tmp_path), max_items=10)
+    key, svg = await fresh.get("PASS-1", "svg")
+    assert fresh.renders == 1 and svg.lstrip().startswith(b"<?xml")
+    assert await fresh.get("PASS-1", "png") == results[0]
+    assert fresh.renders == 1
+
+def test_etag_matching():
+    """Test If-None-Match lists, weak validators and wildcards"""
+    assert etag_matches('"abc"', '"abc"')
+    assert etag_matches('"x", W/"abc"', '"abc"')
+    assert etag_matches("*", '"abc"')
+    assert not etag_matches(None, '"abc"')
+    assert not etag_matches('"abd"', '"abc"')
+
+@pytest.mark.asyncio
+async def test_batch_renderer_returns_every_item():
+    """Test batch rendering in worker processes returns each item once"""
+    renderer = QRBatchRenderer(max_workers=2, chunk_size=2)
+    items = [(f"PASS-{i}", "png", 4) for i in range(5)]
+    try:
+        results = {item: image async for item, image in renderer.render(items)}
+    finally:
+        renderer.shutdown()
+
+    assert set(results) == set(items)
+    assert all(image.startswith(b"\x89PNG") for image in results.values())
@@ -0,0 +1,41 @@
+from datetime import datetime, timedelta, timezone
+from app.utils.qr_tokens import issue_qr_token, decode_qr_token, check_qr_token, is_signed_token
+
+def _window():
+    now = datetime.now(timezone.utc)
+    return now, now - timedelta(hours=1), now + timedelta(hours=8)
+
+def test_signed_token_roundtrip():
+    """Test signed token carries pass id and validity window"""
+    now, valid_from, valid_until = _window()
+    token = issue_qr_token(42, valid_from, valid_until)
+
+    assert is_signed_token(token)
+    claims = decode_qr_token(token)
+    assert claims["pass_id"] == 42
+    assert claims["valid_from"] <= valid_from
+    assert claims["valid_until"] >= valid_until
+    assert check_qr_token(token, now) is None
+
+def test_tampered_token_rejected():
+    """Test any modification of the token invalidates the signature"""
+    now, valid_from, valid_until = _window()
+    token = issue_qr_token(42, valid_from, valid_until)
+    tampered = token[:-2] + ("A" if token[-2] != "A" else "B") + token[-1]
+
+    assert decode_qr_token(tampered) is None
+    assert check_qr_token(tampered, now) == "Invalid pass signature"
+    assert check_qr_token("P1.garbage", now) == "Invalid pass signature"
+
+def test_token_window_checked_without_db():
+    """Test expired and not yet valid tokens are rejected"""
+    now, valid_from, valid_until = _window()
+    token = issue_qr_token(7, valid_from, valid_until)
+
+    assert check_qr_token(token, valid_until + timedelta(minutes=1)) == "Pass expired"
+    assert check_qr_token(token, valid_from - timedelta(minutes=1)) == "Pass not yet valid"
+
+def test_legacy_uuid_codes_pass_through():
+    """Test legacy uuid codes are left to the database lookup"""
+    now, _, _ = _window()
+    assert check_qr_token("0b9c5d0e-0f3e-4a77-9c1a-2f7d3b0e6a11", now) is None
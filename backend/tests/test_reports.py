@@ -0,0 +1,54 @@
+import pytest
+from datetime import date, datetime, timedelta, timezone
+from app.models.pass_model import Pass, PassStatus, Visit
+from app.schemas.report_schema import ReportRequest
+from app.services.reports import ReportBuilder, report_id
+from app.utils.byte_range import parse_byte_range
+
+def test_identical_report_requests_share_an_id():
+    """Test report ids depend only on the request contents"""
+    first = ReportRequest(report="visits", date_from=date(2025, 3, 1), date_to=date(2025, 3, 31))
+    same = ReportRequest.model_validate({"date_to": "2025-03-31", "date_from": "2025-03-01", "report": "visits"})
+    other = ReportRequest(report="visits", date_from=date(2025, 3, 1), date_to=date(2025, 3, 31), company="ACME")
+
+    assert report_id(first) == report_id(same)
+    assert report_id(first) != report_id(other)
+
+def test_byte_ranges():
+    """Test Range headers are resolved against the file size"""
+    assert parse_byte_range(None, 100) is None
+    assert parse_byte_range("bytes=0-9", 100) == (0, 9)
+    assert parse_byte_range("bytes=90-", 100) == (90, 99)
+    assert parse_byte_range("bytes=-10", 100) == (90, 99)
+    assert parse_byte_range("bytes=50-500", 100) == (50, 99)
+    # Malformed or multiple ranges fall back to the whole file
+    assert parse_byte_range("bytes=a-b", 100) is None
+    assert parse_byte_range("bytes=0-1,5-6", 100) is None
+
+    with pytest.raises(ValueError):
+        parse_byte_range("bytes=100-", 100)
+
+@pytest.mark.asyncio
+async def test_xlsx_report_opens_as_a_workbook(sqlite_db, tmp_path):
+    """Test the generated XLSX file opens as a workbook with the header, times and dwell minutes"""
+    openpyxl = pytest.importorskip("openpyxl")
+    entry = datetime(2025, 3, 10, 6, 0, tzinfo=timezone.utc)
+    pass_obj = Pass(
+        qr_code="REPORT-1", guest_name="Anna", guest_company="ACME", status=PassStatus.ACTIVE, is_active=True
+    )
+    sqlite_db.add(pass_obj)
+    await sqlite_db.commit()
+    sqlite_db.add(Visit(
+        pass_id=pass_obj.id, entry_time=entry, exit_time=entry + timedelta(minutes=90),
+        entry_gate_id="north", exit_gate_id="south"
+    ))
+    await sqlite_db.commit()
+
+    request = ReportRequest(report="visits", date_from=date(2025, 3, 1), date_to=date(2025, 3, 31), format="xlsx")
+    path = tmp_path / "visits.xlsx"
+    assert await ReportBuilder(request).build(sqlite_db, path) == 1
+
+    sheet = openpyxl.load_workbook(path, read_only=True)["Report"]
+    header, row = sheet.iter_rows(values_only=True)
+    assert list(header) == ReportBuilder.HEADERS["visits"]
+    assert row[1:] == ("Anna", "ACME", datetime(2025, 3, 10, 6, 0), datetime(2025, 3, 10, 7, 30), 90, "north", "south")
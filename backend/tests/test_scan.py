@@ -0,0 +1,192 @@
+import pytest
+from pydantic import ValidationError
+from datetime import datetime, timedelta, timezone
+from httpx import AsyncClient
+from sqlalchemy import event, select, text
+from app.main import app
+from app.models.pass_model import Pass, PassStatus, Visit
+from app.routers.scan import _verify
+from app.schemas.pass_schema import ScanEvent, VerifyPassRequest
+from app.services.scan_engine import ScanEngine
+
+def make_pass(qr_code: str, now: datetime) -> Pass:
+    return Pass(
+        qr_code=qr_code, guest_name="Guest", status=PassStatus.ACTIVE, is_active=True,
+        valid_from=now - timedelta(days=1), valid_until=now + timedelta(days=1)
+    )
+
+@pytest.mark.asyncio
+async def test_cache_stats_require_a_guard():
+    """Test the pass cache counters are not served to anonymous callers"""
+    async with AsyncClient(app=app, base_url="http://test") as ac:
+        response = await ac.get("/api/scan/cache-stats")
+    assert response.status_code == 403
+
+@pytest.mark.asyncio
+async def test_toggle_alternates_entry_and_exit(sqlite_db):
+    """Test consecutive scans of a pass check it in, out and in again"""
+    now = datetime.now(timezone.utc)
+    pass_obj = make_pass("TOGGLE-1", now)
+    sqlite_db.add(pass_obj)
+    await sqlite_db.commit()
+
+    first = await ScanEngine.toggle_visit(sqlite_db, pass_obj.id, now, "gate-1")
+    second = await ScanEngine.toggle_visit(sqlite_db, pass_obj.id, now + timedelta(minutes=30), "gate-2")
+    third = await ScanEngine.toggle_visit(sqlite_db, pass_obj.id, now + timedelta(hours=1), "gate-1")
+
+    assert [first["action"], second["action"], third["action"]] == ["ENTRY", "EXIT", "ENTRY"]
+    assert second["visit_id"] == first["visit_id"] and second["duration_minutes"] == 30
+    assert third["visit_id"] != first["visit_id"]
+
+    visits = (await sqlite_db.execute(select(Visit).order_by(Visit.id))).scalars().all()
+    assert [visit.exit_time is None for visit in visits] == [False, True]
+    assert visits[0].exit_gate_id == "gate-2"
+
+@pytest.mark.asyncio
+async def test_concurrent_entry_loses_as_duplicate_scan(sqlite_db):
+    """Test an entry racing another scan of the pass is denied instead of opening a second visit"""
+    now = datetime.now(timezone.utc)
+    pass_obj = make_pass("RACE-1", now)
+    sqlite_db.add(pass_obj)
+    await sqlite_db.commit()
+
+    def concurrent_entry(conn, cursor, statement, parameters, context, executemany):
+        # The other scan opens its visit between our UPDATE finding none and our INSERT
+        if statement.startswith("INSERT INTO visits"):
+            cursor.execute(
+                "INSERT INTO visits (pass_id, entry_time) VALUES (?, ?)",
+                (pass_obj.id, now.isoformat(sep=" "))
+            )
+
+    sync_engine = sqlite_db.get_bind()
+    event.listen(sync_engine, "before_cursor_execute", concurrent_entry)
+    try:
+        response = await _verify(VerifyPassRequest(qr_code="RACE-1"), sqlite_db, now)
+    finally:
+        event.remove(sync_engine, "before_cursor_execute", concurrent_entry)
+
+    assert response["status"] == "DENIED"
+    assert response["reason"] == "Duplicate scan in progress"
+
+@pytest.mark.asyncio
+async def test_open_visit_index_closes_duplicates(sqlite_db):
+    """Test a database without the open visit index gets it after its duplicate open visits are closed"""
+    now = datetime.now(timezone.utc)
+    pass_obj = make_pass("LEGACY-1", now)
+    sqlite_db.add(pass_obj)
+    await sqlite_db.commit()
+    await sqlite_db.execute(text("DROP INDEX uq_visits_open_pass"))
+    sqlite_db.add_all([
+        Visit(pass_id=pass_obj.id, entry_time=now - timedelta(hours=2)),
+        Visit(pass_id=pass_obj.id, entry_time=now - timedelta(hours=1)),
+    ])
+    await sqlite_db.commit()
+
+    assert await ScanEngine.ensure_open_visit_index(sqlite_db) == 1
+    assert await ScanEngine.ensure_open_visit_index(sqlite_db) == 0
+
+    visits = (await sqlite_db.execute(select(Visit).order_by(Visit.id))).scalars().all()
+    assert visits[0].exit_time == visits[0].entry_time and visits[1].exit_time is None
+    toggle = await ScanEngine.toggle_visit(sqlite_db, pass_obj.id, now, None)
+    assert toggle["action"] == "EXIT" and toggle["visit_id"] == visits[1].id
+
+def test_scan_fields_fit_their_columns():
+    """Test gate ids and QR codes longer than their visit and pass columns are rejected"""
+    now = datetime.now(timezone.utc)
+    ScanEvent(qr_code="Q" * 500, scanned_at=now, gate_id="g" * 64)
+    with pytest.raises(ValidationError):
+        ScanEvent(qr_code="Q", scanned_at=now, gate_id="g" * 65)
+    with pytest.raises(ValidationError):
+        VerifyPassRequest(qr_code="Q" * 501)
+
+def batch_event(qr_code: str, at: datetime, gate_id: str = "gate-1") -> dict:
+    return {"qr_code": qr_code, "scanned_at": at.isoformat(), "gate_id": gate_id}
+
+@pytest.mark.asyncio
+async def test_batch_replays_events_in_time_order(api, sqlite_db):
+    """Test buffered scans sent out of order are applied by scan time and answered in request order"""
+    now = datetime.now(timezone.utc)
+    sqlite_db.add(make_pass("BATCH-1", now))
+    await sqlite_db.commit()
+
+    response = await api.post("/api/scan/verify-batch", json={"events": [
+        batch_event("BATCH-1", now - timedelta(minutes=10), "gate-2"),
+        batch_event("BATCH-1", now - timedelta(minutes=40)),
+        batch_event("BATCH-1", now - timedelta(minutes=5)),
+    ]})
+    assert response.status_code == 200
+    results = response.json()["results"]
+    assert [result["status"] for result in results] == ["EXIT", "ALLOWED", "ALLOWED"]
+    assert results[0]["duration_minutes"] == 30
+
+    visits = (await sqlite_db.execute(select(Visit).order_by(Visit.entry_time))).scalars().all()
+    assert [(visit.entry_gate_id, visit.exit_gate_id) for visit in visits] == [("gate-1", "gate-2"), ("gate-1", None)]
+    assert visits[1].exit_time is None
+
+@pytest.mark.asyncio
+async def test_batch_denies_scans_before_the_current_or_last_visit(api, sqlite_db):
+    """Test a replayed scan cannot overlap the open visit or a finished one"""
+    now = datetime.now(timezone.utc)
+    finished, visiting = make_pass("BATCH-2", now), make_pass("BATCH-5", now)
+    sqlite_db.add_all([finished, visiting])
+    await sqlite_db.commit()
+    sqlite_db.add_all([
+        Visit(pass_id=finished.id, entry_time=now - timedelta(hours=3), exit_time=now - timedelta(hours=2)),
+        Visit(pass_id=visiting.id, entry_time=now - timedelta(hours=1)),
+    ])
+    await sqlite_db.commit()
+
+    response = await api.post("/api/scan/verify-batch", json={"events": [
+        batch_event("BATCH-2", now - timedelta(minutes=150)),
+        batch_event("BATCH-5", now - timedelta(minutes=90)),
+        batch_event("BATCH-2", now - timedelta(minutes=100)),
+        batch_event("BATCH-5", now - timedelta(minutes=30)),
+    ]})
+    assert response.status_code == 200
+    results = response.json()["results"]
+    assert results[0]["reason"] == "Scan predates last visit"
+    assert results[1]["reason"] == "Scan predates current visit"
+    assert results[2]["status"] == "ALLOWED"
+    assert results[3]["status"] == "EXIT" and results[3]["duration_minutes"] == 30
+
+@pytest.mark.asyncio
+async def test_batch_denies_implausible_scan_times(api, sqlite_db):
+    """Test scans stamped in the future or beyond the replay horizon are denied"""
+    now = datetime.now(timezone.utc)
+    sqlite_db.add(make_pass("BATCH-3", now))
+    await sqlite_db.commit()
+
+    response = await api.post("/api/scan/verify-batch", json={"events": [
+        batch_event("BATCH-3", now + timedelta(hours=1)),
+        batch_event("BATCH-3", now - timedelta(days=30)),
+    ]})
+    assert [result["reason"] for result in response.json()["results"]] == [
+        "Scan time is in the future", "Scan is too old to replay"
+    ]
+    assert (await sqlite_db.execute(select(Visit))).first() is None
+
+@pytest.mark.asyncio
+async def test_batch_conflicting_with_a_concurrent_scan_is_retried(api, sqlite_db):
+    """Test a batch whose entry loses to a concurrent scan of the pass is rejected with 409"""
+    now = datetime.now(timezone.utc)
+    pass_obj = make_pass("BATCH-4", now)
+    sqlite_db.add(pass_obj)
+    await sqlite_db.commit()
+
+    def concurrent_entry(conn, cursor, statement, parameters, context, executemany):
+        if statement.startswith("INSERT INTO visits"):
+            cursor.execute(
+                "INSERT INTO visits (pass_id, entry_time) VALUES (?, ?)",
+                (pass_obj.id, now.isoformat(sep=" "))
+            )
+
+    sync_engine = sqlite_db.get_bind()
+    event.listen(sync_engine, "before_cursor_execute", concurrent_entry)
+    try:
+        response = await api.post("/api/scan/verify-batch", json={"events": [
+            batch_event("BATCH-4", now - timedelta(minutes=1))
+        ]})
+    finally:
+        event.remove(sync_engine, "before_cursor_execute", concurrent_entry)
+
+    assert response.status_code == 409
@@ -0,0 +1,61 @@
+import asyncio
+import pytest
+from datetime import datetime, timedelta, timezone
+from app.config import settings
+from app.services.statistics import StatsRollup, hour_bucket
+from app.utils.cache import SingleFlight
+
+@pytest.mark.asyncio
+async def test_single_flight_shares_one_call():
+    """Test concurrent callers of the same key share a single execution"""
+    flight = SingleFlight()
+    calls = 0
+
+    async def compute():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return {"total": 42}
+
+    results = await asyncio.gather(*(flight.run("overview", compute) for _ in range(20)))
+
+    assert calls == 1
+    assert all(result == {"total": 42} for result in results)
+    assert "overview" not in flight
+    await flight.run("overview", compute)
+    assert calls == 2
+
+def test_rollup_counts_toggles_per_hour():
+    """Test scan toggles become hourly entry and exit deltas"""
+    rollup = StatsRollup()
+    entry = datetime(2025, 5, 1, 9, 59, 30, tzinfo=timezone.utc)
+    exit_ = entry + timedelta(minutes=1)
+
+    rollup.record_toggle({"action": "ENTRY", "entry_time": entry, "exit_time": None})
+    rollup.record_toggle({"action": "EXIT", "entry_time": entry, "exit_time": exit_})
+    rollup.record_toggle({"visit_id": 1, "entry_time": entry, "exit_time": exit_})  # close_visit result
+    rollup.record_toggle(None)
+
+    assert hour_bucket(entry) == datetime(2025, 5, 1, 9, tzinfo=timezone.utc)
+    assert dict(rollup._pending) == {
+        (datetime(2025, 5, 1, 9, tzinfo=timezone.utc), "entries"): 1,
+        (datetime(2025, 5, 1, 10, tzinfo=timezone.utc), "exits"): 2,
+    }
+
+@pytest.mark.asyncio
+async def test_reconcile_skips_hours_that_may_have_pending_deltas(monkeypatch):
+    """Test reconciling stops at the last hour that closed before the settle period"""
+    monkeypatch.setattr(settings, "stats_reconcile_settle_seconds", 300)
+    rollup = StatsRollup()
+    windows = []
+
+    async def rebuild(db, start, end):
+        windows.append((start, end))
+        return 0
+    rollup.rebuild = rebuild
+
+    await rollup.reconcile(db=None)
+    start, end = windows[0]
+    settled = datetime.now(timezone.utc) - timedelta(seconds=300)
+    assert end <= settled  # rebuild() stops at the start of the hour of end
+    assert end - start == timedelta(hours=48)
@@ -0,0 +1,36 @@
+import time
+import pytest
+from app.services import token_revocation
+from app.services.token_revocation import TokenRevocations
+
+class FakeRedis:
+    """The revoked session sorted set as a dict of session id -> end"""
+
+    def __init__(self, revoked):
+        self.revoked = revoked
+
+    async def zremrangebyscore(self, key, low, high):
+        self.revoked = {session: end for session, end in self.revoked.items() if end > high}
+
+    async def zrangebyscore(self, key, low, high):
+        return [session for session, end in self.revoked.items() if end >= low]
+
+    async def zscore(self, key, session_id):
+        return self.revoked.get(session_id)
+
+@pytest.mark.asyncio
+async def test_revocations_missed_while_unsubscribed_are_reloaded(monkeypatch):
+    """Test a revocation whose broadcast never arrived is caught once the subscription is back"""
+    redis = FakeRedis({"ended": time.time() - 1})
+    monkeypatch.setattr(token_revocation, "get_redis", lambda: redis)
+    revocations = TokenRevocations(capacity=100)
+    monkeypatch.setattr(revocations, "_subscribed", True)
+
+    assert await revocations.load() == 0
+    assert await revocations.is_revoked("s1") is False
+
+    # Revoked by another worker while this one was not subscribed
+    redis.revoked["s1"] = time.time() + 3600
+    assert await revocations.is_revoked("s1") is False  # answered by the stale filter
+    await revocations._reload()
+    assert await revocations.is_revoked("s1") is True
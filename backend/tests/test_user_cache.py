@@ -0,0 +1,56 @@
+import pytest
+from app.models.user import UserRole
+from app.services.user_cache import UserCache
+
+class FakeSession:
+    """Answers the user lookup from a dict and counts queries"""
+
+    def __init__(self, users):
+        self.users = users
+        self.queries = 0
+
+    async def execute(self, query):
+        self.queries += 1
+        user_id = query.whereclause.right.value
+        return FakeResult(self.users.get(user_id))
+
+class FakeResult:
+    def __init__(self, values):
+        self.values = values
+
+    def one_or_none(self):
+        return None if self.values is None else type("Row", (), {"_mapping": self.values})()
+
+def user(user_id, is_active=True):
+    return {
+        "id": user_id, "uuid": f"u{user_id}", "email": None, "phone": None, "username": f"user{user_id}",
+        "full_name": "Test", "role": UserRole.ADMIN, "is_active": is_active, "token_version": 0, "created_at": None, "updated_at": None,
+    }
+
+@pytest.mark.asyncio
+async def test_active_users_are_served_from_cache_until_changed():
+    """Test repeated lookups hit the cache and a change broadcast evicts the user"""
+    cache = UserCache(max_size=10, ttl_seconds=60)
+    db = FakeSession({1: user(1)})
+
+    first = await cache.get(db, 1)
+    second = await cache.get(db, 1)
+    assert db.queries == 1
+    assert first is not second and second.username == "user1"
+    assert cache.stats()["hit_ratio"] == 0.5
+
+    db.users[1] = user(1, is_active=False)
+    cache._apply({"user_id": 1})
+    assert (await cache.get(db, 1)).is_active is False
+    await cache.get(db, 1)
+    assert db.queries == 3  # inactive users are never cached
+
+@pytest.mark.asyncio
+async def test_unknown_users_are_not_cached():
+    """Test a missing user returns None and is looked up again next time"""
+    cache = UserCache(max_size=10, ttl_seconds=60)
+    db = FakeSession({})
+
+    assert await cache.get(db, 7) is None
+    assert await cache.get(db, 7) is None
+    assert db.queries == 2
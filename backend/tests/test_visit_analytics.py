@@ -0,0 +1,35 @@
+from datetime import datetime, timedelta, timezone
+from app.models.visit_analytics import ALL_COMPANIES
+from app.services.visit_analytics import DWELL_BINS, dwell_bin, percentile, sweep_hours
+
+def test_dwell_percentiles_interpolate_within_bins():
+    """Test dwell time percentiles from a histogram"""
+    histogram = [0] * (len(DWELL_BINS) + 1)
+    for minutes in (12, 13, 14, 20):
+        histogram[dwell_bin(minutes)] += 1
+
+    assert percentile([0] * len(histogram), 0.5) is None
+    assert percentile(histogram, 0.5) == 13.3
+    assert percentile(histogram, 0.95) == 27.0
+    histogram[-1] += 100
+    assert percentile(histogram, 0.95) == DWELL_BINS[-1]
+
+def test_sweep_tracks_peak_occupancy_across_hours():
+    """Test entries, exits, peaks and dwell bins per company and hour"""
+    start = datetime(2025, 5, 1, 9, tzinfo=timezone.utc)
+    visits = [
+        ("Acme", start - timedelta(hours=1), start + timedelta(minutes=30)),  # already on site
+        ("Acme", start + timedelta(minutes=10), start + timedelta(minutes=70)),
+        ("", start + timedelta(minutes=30), None),  # hand-over: enters as the first one leaves
+    ]
+
+    buckets = sweep_hours(visits, start, start + timedelta(hours=2))
+    nine, ten = start, start + timedelta(hours=1)
+
+    assert buckets[(ALL_COMPANIES, nine)].peak == 2
+    assert (buckets[("Acme", nine)].entries, buckets[("Acme", nine)].exits) == (1, 1)
+    assert buckets[("Acme", nine)].histogram[dwell_bin(90)] == 1
+    assert buckets[("Acme", ten)].peak == 1
+    assert buckets[("Acme", ten)].histogram[dwell_bin(60)] == 1
+    assert buckets[(ALL_COMPANIES, ten)].peak == 2
+    assert buckets[("", ten)].peak == 1
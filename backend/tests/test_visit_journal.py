@@ -0,0 +1,108 @@
+import pytest
+from datetime import datetime, timedelta, timezone
+from redis.exceptions import RedisError
+from sqlalchemy import select
+from app.config import settings
+from app.models.pass_model import Pass, PassStatus, Visit
+from app.services.scan_engine import ScanEngine
+from app.services.visit_journal import FLUSHED_KEY, VisitJournal, visit_journal
+
+async def add_pass(db, qr_code: str, now: datetime) -> Pass:
+    pass_obj = Pass(
+        qr_code=qr_code, guest_name="Guest", status=PassStatus.ACTIVE, is_active=True,
+        valid_from=now - timedelta(days=1), valid_until=now + timedelta(days=1)
+    )
+    db.add(pass_obj)
+    await db.commit()
+    return pass_obj
+
+async def visits_of(db, pass_id: int) -> list:
+    result = await db.execute(select(Visit).where(Visit.pass_id == pass_id).order_by(Visit.entry_time))
+    return result.scalars().all()
+
+@pytest.mark.asyncio
+async def test_replayed_records_are_written_once(redis, sqlite_db):
+    """Test flushing the same journal records again, as after a crash, does not duplicate visits"""
+    now = datetime.now(timezone.utc)
+    pass_obj = await add_pass(sqlite_db, "JOURNAL-1", now)
+    journal = VisitJournal()
+    await journal.seed(sqlite_db)
+
+    assert (await journal.toggle(pass_obj.id, now, "north"))["action"] == "ENTRY"
+    assert await journal.flush(sqlite_db, batch_size=100) == 1
+    await redis.delete(FLUSHED_KEY)  # the flusher died before recording its progress
+    assert await journal.flush(sqlite_db, batch_size=100) == 1
+
+    visits = await visits_of(sqlite_db, pass_obj.id)
+    assert [(visit.entry_gate_id, visit.exit_time) for visit in visits] == [("north", None)]
+
+@pytest.mark.asyncio
+async def test_entry_and_exit_in_one_flush_make_one_visit(redis, sqlite_db):
+    """Test an entry and its exit flushed together are written as one complete visit"""
+    now = datetime.now(timezone.utc)
+    pass_obj = await add_pass(sqlite_db, "JOURNAL-2", now)
+    journal = VisitJournal()
+    await journal.seed(sqlite_db)
+
+    toggles = await journal.toggle_many([
+        (pass_obj.id, now - timedelta(minutes=45), "north"),
+        (pass_obj.id, now, "south"),
+    ])
+    assert [toggle["action"] for toggle in toggles] == ["ENTRY", "EXIT"]
+    assert toggles[1]["duration_minutes"] == 45
+    assert await journal.flush(sqlite_db, batch_size=100) == 2
+
+    visits = await visits_of(sqlite_db, pass_obj.id)
+    assert [(visit.entry_gate_id, visit.exit_gate_id) for visit in visits] == [("north", "south")]
+    assert visits[0].exit_time is not None
+
+@pytest.mark.asyncio
+async def test_superseded_open_visits_are_closed(redis, sqlite_db):
+    """Test an open visit written around the journal is closed at the pass's next journaled entry"""
+    now = datetime.now(timezone.utc)
+    pass_obj = await add_pass(sqlite_db, "JOURNAL-3", now)
+    journal = VisitJournal()
+    await journal.seed(sqlite_db)
+
+    # Written through while the hash was believed to be in sync
+    sqlite_db.add(Visit(pass_id=pass_obj.id, entry_time=now - timedelta(hours=2), entry_gate_id="west"))
+    await sqlite_db.commit()
+    assert (await journal.toggle(pass_obj.id, now, "north"))["action"] == "ENTRY"
+    await journal.flush(sqlite_db, batch_size=100)
+
+    visits = await visits_of(sqlite_db, pass_obj.id)
+    for visit in visits:
+        await sqlite_db.refresh(visit)
+    assert [(visit.entry_gate_id, visit.exit_gate_id) for visit in visits] == [("west", "north"), ("north", None)]
+    assert visits[0].exit_time is not None and visits[1].exit_time is None
+
+@pytest.mark.asyncio
+async def test_unseeded_journal_falls_back_to_the_database(redis, sqlite_db, monkeypatch):
+    """Test scans are written through while the open visit hash is not seeded"""
+    monkeypatch.setattr(settings, "visit_write_behind", True)
+    now = datetime.now(timezone.utc)
+    pass_obj = await add_pass(sqlite_db, "JOURNAL-4", now)
+
+    toggle = await ScanEngine.toggle_visit(sqlite_db, pass_obj.id, now, "north")
+
+    assert toggle["action"] == "ENTRY" and toggle["visit_id"] is not None
+    assert [visit.id for visit in await visits_of(sqlite_db, pass_obj.id)] == [toggle["visit_id"]]
+    assert await redis.xlen("visits:journal") == 0
+
+@pytest.mark.asyncio
+async def test_redis_failure_falls_back_to_the_database(app_redis, sqlite_db, monkeypatch):
+    """Test a scan is written through when Redis fails and the hash is marked for a rebuild"""
+    async def toggle_many(scans, exit_only=False):
+        raise RedisError("connection lost")
+
+    monkeypatch.setattr(settings, "visit_write_behind", True)
+    monkeypatch.setattr(visit_journal, "toggle_many", toggle_many)
+    monkeypatch.setattr(visit_journal, "_seed_stale", False)
+    now = datetime.now(timezone.utc)
+    pass_obj = await add_pass(sqlite_db, "JOURNAL-5", now)
+
+    toggle = await ScanEngine.toggle_visit(sqlite_db, pass_obj.id, now, "north")
+
+    assert toggle["action"] == "ENTRY"
+    assert [visit.id for visit in await visits_of(sqlite_db, pass_obj.id)] == [toggle["visit_id"]]
+    assert visit_journal._seed_stale is True
@@ -0,0 +1,74 @@
+import pytest
+from datetime import datetime, timedelta, timezone
+from app.models.pass_model import Pass, PassStatus, Visit
+
+async def add_visits(db, *visits) -> list:
+    """Visits as (entry_time, entry_gate_id, exit_gate_id), each of its own pass"""
+    passes = [
+        Pass(qr_code=f"LOG-{index}", guest_name="Anna", guest_company="ACME", status=PassStatus.ACTIVE, is_active=True)
+        for index in range(len(visits))
+    ]
+    db.add_all(passes)
+    await db.commit()
+    rows = [
+        Visit(
+            pass_id=pass_obj.id, entry_time=entry_time, entry_gate_id=entry_gate,
+            exit_time=entry_time + timedelta(hours=1) if exit_gate else None, exit_gate_id=exit_gate
+        )
+        for pass_obj, (entry_time, entry_gate, exit_gate) in zip(passes, visits)
+    ]
+    db.add_all(rows)
+    await db.commit()
+    return [row.id for row in rows]
+
+async def log(api, **params):
+    response = await api.get("/api/visits/log", params=params)
+    assert response.status_code == 200
+    return response.json()
+
+@pytest.mark.asyncio
+async def test_log_filters_by_day_range_and_gate(api, sqlite_db):
+    """Test the visit log filters by UTC day, inclusive day range and entry or exit gate"""
+    day = datetime(2025, 3, 10, tzinfo=timezone.utc)
+    before, morning, evening, after = await add_visits(
+        sqlite_db,
+        (day - timedelta(hours=1), "north", "north"),
+        (day + timedelta(hours=8), "north", "south"),
+        (day + timedelta(hours=18), "west", None),
+        (day + timedelta(days=1, hours=8), "south", "south"),
+    )
+
+    assert [visit["id"] for visit in await log(api, date="2025-03-10")] == [evening, morning]
+    two_days = await log(api, date_from="2025-03-10", date_to="2025-03-11")
+    assert [visit["id"] for visit in two_days] == [after, evening, morning]
+    assert [visit["id"] for visit in await log(api, date="2025-03-10", gate_id="south")] == [morning]
+    assert [visit["id"] for visit in await log(api, gate_id="north")] == [morning, before]
+    assert [visit["id"] for visit in await log(api, open_only=True)] == [evening]
+    assert (await log(api, gate_id="south"))[0]["exit_gate_id"] == "south"
+
+@pytest.mark.asyncio
+async def test_log_stays_lenient_with_bad_dates_and_limits(api, sqlite_db):
+    """Test a malformed date is ignored and a limit beyond the maximum is clamped, as before"""
+    day = datetime(2025, 3, 10, tzinfo=timezone.utc)
+    ids = await add_visits(sqlite_db, *[(day + timedelta(hours=hour), "north", None) for hour in range(3)])
+
+    assert len(await log(api, date="10.03.2025")) == 3
+    assert len(await log(api, limit=5000)) == 3
+    assert [visit["id"] for visit in await log(api, limit=0)] == [ids[-1]]
+
+@pytest.mark.asyncio
+async def test_log_keyset_pages_follow_entry_time_and_id(api, sqlite_db):
+    """Test cursor pages continue after (entry_time, id), including visits entered at the same time"""
+    start = datetime(2025, 3, 10, 8, tzinfo=timezone.utc)
+    await add_visits(sqlite_db, *[(start + timedelta(minutes=10 * (index // 2)), "north", None) for index in range(5)])
+    newest_first = [visit["id"] for visit in await log(api)]
+
+    pages, cursor = [], ""
+    while cursor is not None:
+        page = await log(api, limit=2, cursor=cursor)
+        pages.append([visit["id"] for visit in page["items"]])
+        cursor = page["next_cursor"]
+
+    assert newest_first == [5, 4, 3, 2, 1]
+    assert [len(page) for page in pages] == [2, 2, 1]
+    assert sum(pages, []) == newest_first
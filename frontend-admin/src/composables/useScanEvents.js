@@ -0,0 +1,55 @@
+import { ref, onMounted, onUnmounted } from 'vue'
+
+const RECONNECT_MAX_MS = 30000
+
+// Live scan events pushed by the backend (/api/events/ws)
+export function useScanEvents(onEvent) {
+  const connected = ref(false)
+  let socket = null
+  let retryMs = 1000
+  let retryTimer = null
+  let closed = false
+
+  const url = () => {
+    const protocol = window.location.protocol === 'https:' ? 'wss' : 'ws'
+    const token = localStorage.getItem('token') || ''
+    return `${protocol}://${window.location.host}/api/events/ws?token=${encodeURIComponent(token)}`
+  }
+
+  const connect = () => {
+    socket = new WebSocket(url())
+
+    socket.onopen = () => {
+      connected.value = true
+      retryMs = 1000
+    }
+
+    socket.onmessage = (message) => {
+      const event = JSON.parse(message.data)
+      if (event.type !== 'ping') {
+        onEvent(event)
+      }
+    }
+
+    socket.onclose = () => {
+      connected.value = false
+      if (closed) return
+      // Events missed while disconnected are recovered with a resync
+      retryTimer = setTimeout(() => {
+        onEvent({ type: 'resync' })
+        connect()
+      }, retryMs)
+      retryMs = Math.min(retryMs * 2, RECONNECT_MAX_MS)
+    }
+  }
+
+  onMounted(connect)
+
+  onUnmounted(() => {
+    closed = true
+    clearTimeout(retryTimer)
+    socket?.close()
+  })
+
+  return { connected }
+}
@@ -9,6 +9,7 @@ export default defineConfig({
       '/api': {
         target: process.env.VITE_API_URL || 'http://localhost:8000',
         changeOrigin: true,
+        ws: true,
         rewrite: (path) => path
       }
     }
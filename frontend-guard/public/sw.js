@@ -18,6 +18,11 @@ self.addEventListener('fetch', (event) => {
     return
   }
 
+  // API responses (pass feed, scan results) must never be served from cache
+  if (new URL(event.request.url).pathname.startsWith('/api/')) {
+    return
+  }
+
   event.respondWith(
     caches.match(event.request).then((response) => {
       if (response) {
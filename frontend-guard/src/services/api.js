@@ -20,15 +20,48 @@ apiClient.interceptors.request.use((config) => {
   return Promise.reject(error)
 })
 
+// Одно обновление токена на все запросы, получившие 401 одновременно
+let refreshing = null
+
+const refreshTokens = () => {
+  if (!refreshing) {
+    const refreshToken = localStorage.getItem('refresh_token')
+    refreshing = axios.post(`${API_BASE_URL}/api/auth/refresh`, { refresh_token: refreshToken })
+      .then((response) => {
+        localStorage.setItem('token', response.data.access_token)
+        localStorage.setItem('refresh_token', response.data.refresh_token)
+        localStorage.setItem('user', JSON.stringify(response.data.user))
+        return response.data.access_token
+      })
+      .finally(() => {
+        refreshing = null
+      })
+  }
+  return refreshing
+}
+
 // Response interceptor для обработки ошибок
 apiClient.interceptors.response.use(
   (response) => response,
-  (error) => {
+  async (error) => {
     console.error('API Error:', error.response?.status, error.response?.data)
     
+    const request = error.config
+    if (error.response?.status === 401 && request && !request._retried && localStorage.getItem('refresh_token')) {
+      request._retried = true
+      try {
+        const token = await refreshTokens()
+        request.headers.Authorization = `Bearer ${token}`
+        return apiClient(request)
+      } catch (refreshError) {
+        console.warn('Token refresh failed')
+      }
+    }
+
     if (error.response?.status === 401) {
       console.warn('Unauthorized - clearing tokens')
       localStorage.removeItem('token')
+      localStorage.removeItem('refresh_token')
       localStorage.removeItem('user')
       // Don't redirect here - let component handle it
     }
@@ -23,6 +23,7 @@ export const useAuthStore = defineStore('auth', () => {
       user.value = response.data.user
       
       localStorage.setItem('token', token.value)
+      localStorage.setItem('refresh_token', response.data.refresh_token)
       localStorage.setItem('user', JSON.stringify(user.value))
       
       axios.defaults.headers.common['Authorization'] = `Bearer ${token.value}`
@@ -37,9 +38,15 @@ export const useAuthStore = defineStore('auth', () => {
   }
 
   const logout = () => {
+    const refreshToken = localStorage.getItem('refresh_token')
+    if (refreshToken) {
+      // Ends the session on the server too; signing out locally must not wait on it
+      axios.post('/api/auth/logout', { refresh_token: refreshToken }).catch(() => {})
+    }
     token.value = null
     user.value = null
     localStorage.removeItem('token')
+    localStorage.removeItem('refresh_token')
     localStorage.removeItem('user')
     delete axios.defaults.headers.common['Authorization']
   }
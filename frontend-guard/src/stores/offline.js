@@ -0,0 +1,146 @@
+import { defineStore } from 'pinia'
+import { ref, computed } from 'vue'
+import { apiClient } from '../services/api'
+
+const QUEUE_KEY = 'offlineScanQueue'
+
+const sha256Hex = async (text) => {
+  const digest = await crypto.subtle.digest('SHA-256', new TextEncoder().encode(text))
+  return Array.from(new Uint8Array(digest))
+    .map((byte) => byte.toString(16).padStart(2, '0'))
+    .join('')
+}
+
+// Локальная проверка пропусков, когда backend недоступен
+export const useOfflineStore = defineStore('offline', () => {
+  const version = ref(null)
+  const passes = ref(new Map())     // qr_hash -> { validFrom, validUntil, guestName }
+  const onSite = ref(new Set())     // qr_hash гостей, вошедших в офлайн-режиме
+  const queue = ref(JSON.parse(localStorage.getItem(QUEUE_KEY) || '[]'))
+  const lastSync = ref(null)
+  const syncing = ref(false)
+
+  const isReady = computed(() => version.value !== null)
+  const pendingCount = computed(() => queue.value.length)
+
+  const saveQueue = () => {
+    localStorage.setItem(QUEUE_KEY, JSON.stringify(queue.value))
+  }
+
+  const loadSnapshot = async () => {
+    const response = await apiClient.get('/api/scan/offline/snapshot', {
+      responseType: 'text',
+      transformResponse: (data) => data
+    })
+    const lines = response.data.split('\n').filter(Boolean)
+    const header = JSON.parse(lines[0])
+    const loaded = new Map()
+
+    for (const line of lines.slice(1)) {
+      const [hash, validFrom, validUntil, guestName] = JSON.parse(line)
+      loaded.set(hash, { validFrom, validUntil, guestName })
+    }
+
+    passes.value = loaded
+    version.value = header.version
+  }
+
+  const applyDelta = async () => {
+    let hasMore = true
+    while (hasMore) {
+      const { data } = await apiClient.get('/api/scan/offline/delta', {
+        params: { since: version.value }
+      })
+
+      if (data.reset) {
+        await loadSnapshot()
+        return
+      }
+
+      for (const change of data.changes) {
+        if (change.op === 'delete') {
+          passes.value.delete(change.qr_hash)
+        } else {
+          passes.value.set(change.qr_hash, {
+            validFrom: change.valid_from,
+            validUntil: change.valid_until,
+            guestName: change.guest_name
+          })
+        }
+      }
+
+      version.value = data.version
+      hasMore = data.has_more && data.changes.length > 0
+    }
+  }
+
+  const sync = async () => {
+    if (syncing.value) return
+    syncing.value = true
+    try {
+      if (version.value === null) {
+        await loadSnapshot()
+      } else {
+        await applyDelta()
+      }
+      lastSync.value = new Date().toISOString()
+      await flushQueue()
+    } catch (error) {
+      console.warn('Offline sync failed:', error.message)
+    } finally {
+      syncing.value = false
+    }
+  }
+
+  const verifyLocally = async (qrCode, gateId = null) => {
+    const hash = await sha256Hex(qrCode)
+    const pass = passes.value.get(hash)
+    const now = Math.floor(Date.now() / 1000)
+
+    let result
+    if (!pass) {
+      result = { status: 'DENIED', reason: 'Pass not found', guest_name: null }
+    } else if (now < pass.validFrom) {
+      result = { status: 'DENIED', reason: 'Pass not yet valid', guest_name: pass.guestName }
+    } else if (now > pass.validUntil) {
+      result = { status: 'DENIED', reason: 'Pass expired', guest_name: pass.guestName }
+    } else {
+      const exiting = onSite.value.has(hash)
+      exiting ? onSite.value.delete(hash) : onSite.value.add(hash)
+      result = {
+        status: exiting ? 'EXIT' : 'ALLOWED',
+        reason: 'Valid pass (offline)',
+        guest_name: pass.guestName,
+        valid_until: new Date(pass.validUntil * 1000).toISOString()
+      }
+    }
+
+    // Все сканы синхронизируются позже, сервер принимает окончательное решение
+    queue.value.push({ qr_code: qrCode, scanned_at: new Date().toISOString(), gate_id: gateId })
+    saveQueue()
+
+    return { ...result, offline: true }
+  }
+
+  const flushQueue = async () => {
+    if (queue.value.length === 0) return
+
+    const events = queue.value.slice(0, 1000)
+    await apiClient.post('/api/scan/verify-batch', { events })
+
+    queue.value = queue.value.slice(events.length)
+    onSite.value = new Set()
+    saveQueue()
+  }
+
+  return {
+    version,
+    lastSync,
+    syncing,
+    isReady,
+    pendingCount,
+    sync,
+    verifyLocally,
+    flushQueue
+  }
+})